@@ -49,37 +49,43 @@ class MarkdownWidget(TextArea):
                                 var input = document.createElement('input');
                                 input.type = 'file';
                                 input.accept = 'image/*';
+                                input.multiple = true;
                                 input.onchange = function(e) {{
-                                    var file = e.target.files[0];
-                                    if (!file) return;
+                                    var files = e.target.files;
+                                    if (!files.length) return;
                                     
                                     // 显示上传提示
                                     var cm = editor.codemirror;
-                                    var stat = editor.getState(cm);
                                     var text = '![上传中...]()';
                                     cm.replaceSelection(text);
                                     
-                                    // 上传文件
+                                    // 多张图片在一个请求中批量上传
                                     var formData = new FormData();
-                                    formData.append('file', file);
+                                    for (var i = 0; i < files.length; i++) {{
+                                        formData.append('files', files[i]);
+                                    }}
                                     
-                                    fetch('/api/upload/image?type=event', {{
+                                    fetch('/api/upload/images?type=event', {{
                                         method: 'POST',
                                         body: formData
                                     }})
                                     .then(response => response.json())
                                     .then(data => {{
                                         if (data.code === 200) {{
-                                            // 替换上传中的文本为实际的图片链接
+                                            // 按选择顺序把上传中的文本替换为图片链接
+                                            var markdown = data.data.items
+                                                .filter(item => item.success)
+                                                .map(item => '![图片](' + item.data.url + ')')
+                                                .join('\\n\\n');
                                             var content = cm.getValue();
-                                            var newContent = content.replace(
-                                                '![上传中...]()',
-                                                '![图片](' + data.data.url + ')'
-                                            );
-                                            cm.setValue(newContent);
+                                            cm.setValue(content.replace('![上传中...]()', markdown));
                                             
-                                            // 显示成功提示
-                                            alert('图片上传成功！');
+                                            var failed = data.data.items.filter(item => !item.success);
+                                            if (failed.length) {{
+                                                alert(data.message + '\\n' + failed.map(item => item.filename + ': ' + item.error).join('\\n'));
+                                            }} else {{
+                                                alert('图片上传成功！');
+                                            }}
                                         }} else {{
                                             alert('上传失败: ' + (data.message || '未知错误'));
                                             // 删除上传中的文本
@@ -204,14 +210,25 @@ class EventAdmin(ModelView, model=Event):
     async def on_model_change(self, data: dict, model: Event, is_created: bool, request: Request) -> None:
         """
         在模型保存前的钩子函数
-        自动从内容中提取封面图
+        自动从内容中提取封面图，并生成预渲染的 HTML
         """
-        from app.utils.markdown_helper import extract_first_image
+        from app.services.event_service import EventService
+        from app.utils.database import SessionLocal
+        from app.utils.markdown_helper import extract_first_image, RENDER_VERSION
         
         # 如果有内容，提取第一张图片作为封面
         if 'content' in data and data['content']:
             model.cover_image = extract_first_image(data['content'])
         
+        # 预渲染内容 HTML，详情接口直接返回
+        if 'content' in data:
+            db = SessionLocal()
+            try:
+                model.content_html = EventService.render_content(db, data['content'])
+            finally:
+                db.close()
+            model.content_render_version = RENDER_VERSION
+        
         await super().on_model_change(data, model, is_created, request)
 
 
@@ -257,6 +274,16 @@ class UserAdmin(ModelView, model=User):
         User.created_at: "注册时间",
         User.last_login_at: "最后登录"
     }
+    
+    async def after_model_change(self, data: dict, model: User, is_created: bool, request: Request) -> None:
+        """后台修改用户后清空用户资料缓存(OpenID 也可能被修改,直接整体清空)"""
+        from app.services.user_service import UserService
+        UserService.profile_cache.clear()
+    
+    async def after_model_delete(self, model: User, request: Request) -> None:
+        """后台删除用户后清空用户资料缓存"""
+        from app.services.user_service import UserService
+        UserService.profile_cache.clear()
 
 
 class CustomerServiceAdmin(ModelView, model=CustomerService):
@@ -372,6 +399,7 @@ class UploadedImageAdmin(ModelView, model=UploadedImage):
         UploadedImage.url,
         UploadedImage.type,
         UploadedImage.size,
+        UploadedImage.ref_count,
         UploadedImage.created_at
     ]
     
@@ -409,6 +437,7 @@ class UploadedImageAdmin(ModelView, model=UploadedImage):
         UploadedImage.url: "访问URL",
         UploadedImage.type: "类型",
         UploadedImage.size: "大小(字节)",
+        UploadedImage.ref_count: "引用次数",
         UploadedImage.created_at: "上传时间"
     }
     
@@ -441,90 +470,65 @@ class ImageUploadView(BaseView):
         
         # 处理上传请求
         if request.method == "POST":
+            from fastapi import HTTPException
             from app.routes.upload import (
                 ensure_upload_dir, 
                 get_file_extension, 
-                generate_filename,
                 ALLOWED_EXTENSIONS,
                 MAX_FILE_SIZE,
                 UPLOAD_DIR
             )
-            from app.models.uploaded_image import UploadedImage
+            from app.services.upload_service import UploadService
             from app.utils.database import SessionLocal
-            from datetime import datetime
-            
-            form = await request.form()
-            file = form.get("file")
-            upload_type = form.get("type", "event")
+            from app.utils.multipart_stream import MultipartStream
             
             error_message = None
             success_data = None
             
-            if file and hasattr(file, 'filename'):
-                # 验证文件扩展名
-                ext = get_file_extension(file.filename)
-                if ext not in ALLOWED_EXTENSIONS:
+            try:
+                # 边接收边写入磁盘,超过大小限制立即中止
+                UploadService.check_content_length(request, MAX_FILE_SIZE)
+                upload = MultipartStream(request)
+                original_filename = await upload.next_file()
+                # 表单中类型字段位于文件之前,此时已解析完成
+                upload_type = upload.fields.get("type", "event")
+                
+                if not original_filename:
+                    error_message = "请选择要上传的图片文件"
+                elif get_file_extension(original_filename) not in ALLOWED_EXTENSIONS:
+                    # 验证文件扩展名
                     error_message = f"不支持的文件格式。允许的格式: {', '.join(ALLOWED_EXTENSIONS)}"
                 else:
-                    # 读取文件内容
-                    contents = await file.read()
+                    # 确保上传目录存在
+                    ensure_upload_dir()
                     
-                    # 验证文件大小
-                    if len(contents) > MAX_FILE_SIZE:
-                        error_message = f"文件太大。最大允许 {MAX_FILE_SIZE / 1024 / 1024}MB"
-                    else:
-                        # 确保上传目录存在
-                        ensure_upload_dir()
-                        
-                        # 生成文件名
-                        filename = generate_filename(file.filename)
-                        
-                        # 确定保存路径
-                        if upload_type == "thumbnail":
-                            save_dir = UPLOAD_DIR / "thumbnails"
-                        else:
-                            save_dir = UPLOAD_DIR / "events"
-                        
-                        file_path = save_dir / filename
+                    # 保存文件,相同内容只保存一份
+                    db = SessionLocal()
+                    try:
+                        uploaded_image = (await UploadService.store_image(
+                            db,
+                            upload.iter_file(),
+                            UPLOAD_DIR,
+                            get_file_extension(original_filename),
+                            upload_type,
+                            MAX_FILE_SIZE
+                        )).image
                         
-                        # 保存文件
-                        try:
-                            with open(file_path, "wb") as f:
-                                f.write(contents)
-                            
-                            # 返回访问URL
-                            url = f"/uploads/{upload_type}s/{filename}"
-                            
-                            # 保存到数据库
-                            db = SessionLocal()
-                            try:
-                                uploaded_image = UploadedImage(
-                                    filename=filename,
-                                    url=url,
-                                    size=len(contents),
-                                    type=upload_type,
-                                    created_at=datetime.utcnow()
-                                )
-                                db.add(uploaded_image)
-                                db.commit()
-                                db.refresh(uploaded_image)
-                                
-                                success_data = {
-                                    "id": uploaded_image.id,
-                                    "url": url,
-                                    "filename": filename,
-                                    "size": len(contents),
-                                    "size_kb": round(len(contents) / 1024, 2),
-                                    "type": upload_type,
-                                    "markdown": f"![图片描述]({url})"
-                                }
-                            finally:
-                                db.close()
-                                
-                        except Exception as e:
-                            error_message = f"保存文件失败: {str(e)}"
-            else:
-                error_message = "请选择要上传的图片文件"
+                        success_data = {
+                            "id": uploaded_image.id,
+                            "url": uploaded_image.url,
+                            "filename": uploaded_image.filename,
+                            "size": uploaded_image.size,
+                            "size_kb": uploaded_image.size_kb,
+                            "type": uploaded_image.type,
+                            "markdown": f"![图片描述]({uploaded_image.url})"
+                        }
+                    finally:
+                        db.close()
+            except HTTPException as e:
+                error_message = e.detail
+            except Exception as e:
+                error_message = f"保存文件失败: {str(e)}"
             
             # 返回结果页面
             return self._render_upload_page(error_message, success_data)
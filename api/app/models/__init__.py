@@ -4,6 +4,10 @@ from .user import User
 from .customer_service import CustomerService
 from .uploaded_image import UploadedImage
 from .banner import Banner
+from .event_viewer_sketch import EventViewerSketch
+from .job import Job
+from .image_reference import ImageReference
+from .upload_session import UploadSession
 
 __all__ = [
     "Event",
@@ -11,4 +15,8 @@ __all__ = [
     "CustomerService",
     "UploadedImage",
     "Banner",
+    "EventViewerSketch",
+    "Job",
+    "ImageReference",
+    "UploadSession",
 ]
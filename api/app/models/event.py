@@ -1,5 +1,5 @@
 # 赛事数据模型
-from sqlalchemy import Column, Integer, String, Date, DateTime
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime
 from datetime import datetime
 from app.utils.database import Base
 
@@ -17,14 +17,21 @@ class Event(Base):
     
     # 基本信息
     title = Column(String(200), nullable=False, comment="赛事标题")
+    # SQLite 中 id 即 rowid,已隐含在 date 索引末尾,列表按 (date, id) 降序的游标分页直接使用该索引;
+    # 其他数据库需另建 (date, id) 复合索引
     date = Column(Date, nullable=False, index=True, comment="赛事日期")
     content = Column(String(50000), nullable=True, comment="赛事内容(Markdown格式)")
     
+    # 保存时预渲染的 HTML(小程序 rich-text 直接使用)
+    content_html = Column(Text, nullable=True, comment="预渲染的内容HTML")
+    content_render_version = Column(Integer, nullable=True, comment="内容HTML的渲染版本")
+    
     # 自动提取的封面图（从content中的第一张图片）
     cover_image = Column(String(500), nullable=True, comment="封面图URL(自动提取)")
     
     # 统计信息
     view_count = Column(Integer, default=0, nullable=False, comment="浏览量")
+    unique_viewers = Column(Integer, default=0, server_default="0", nullable=False, comment="独立访客数(估计值)")
     
     # 时间戳
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, comment="创建时间")
@@ -47,8 +54,10 @@ class Event(Base):
             "title": self.title,
             "date": self.date.isoformat() if self.date else None,
             "content": self.content,
+            "content_html": self.content_html,
             "cover_image": self.cover_image,
             "view_count": self.view_count,
+            "unique_viewers": self.unique_viewers,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
@@ -0,0 +1,43 @@
+# 赛事独立访客估计数据模型
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, UniqueConstraint
+from datetime import datetime
+from app.utils.database import Base
+
+
+class EventViewerSketch(Base):
+    """
+    赛事独立访客 HyperLogLog 表
+
+    每个赛事每天一行,另有一行 period 为 "all" 的累计数据,
+    寄存器大小固定,与访问量无关
+    """
+    __tablename__ = "event_viewer_sketches"
+    __table_args__ = (
+        UniqueConstraint("event_id", "period", name="uq_event_viewer_sketches_event_period"),
+    )
+
+    # 累计数据的 period 取值
+    ALL_PERIOD = "all"
+
+    # 主键
+    id = Column(Integer, primary_key=True, comment="记录ID")
+
+    # 赛事和统计周期
+    event_id = Column(Integer, nullable=False, comment="赛事ID")
+    period = Column(String(10), nullable=False, comment="统计周期(日期 YYYY-MM-DD 或 all)")
+
+    # HyperLogLog 寄存器(压缩后)
+    registers = Column(LargeBinary, nullable=False, comment="HyperLogLog 寄存器")
+
+    # 时间戳
+    updated_at = Column(
+        DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False,
+        comment="更新时间"
+    )
+
+    def __repr__(self):
+        """字符串表示"""
+        return f"<EventViewerSketch(event_id={self.event_id}, period='{self.period}')>"
@@ -0,0 +1,34 @@
+# 图片引用数据模型
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from datetime import datetime
+from app.utils.database import Base
+
+
+class ImageReference(Base):
+    """
+    图片引用表
+
+    记录赛事内容、封面、轮播图和客服二维码用到的上传文件URL,
+    保存这些数据时自动更新,清理未使用的图片时据此判断
+    """
+    __tablename__ = "image_references"
+    __table_args__ = (
+        UniqueConstraint("owner_type", "owner_id", "url", name="uq_image_references_owner_url"),
+    )
+
+    # 主键
+    id = Column(Integer, primary_key=True, comment="记录ID")
+
+    # 引用的文件
+    url = Column(String(500), nullable=False, index=True, comment="上传文件URL")
+
+    # 引用方
+    owner_type = Column(String(30), nullable=False, comment="引用方类型(event/banner/customer_service)")
+    owner_id = Column(Integer, nullable=False, comment="引用方ID")
+
+    # 时间戳
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, comment="创建时间")
+
+    def __repr__(self):
+        """字符串表示"""
+        return f"<ImageReference(url='{self.url}', owner={self.owner_type}:{self.owner_id})>"
@@ -0,0 +1,48 @@
+# 后台任务数据模型
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Index
+from datetime import datetime
+from app.utils.database import Base
+
+
+class Job(Base):
+    """
+    后台任务表
+
+    上传后处理等耗时工作写入此表,由后台工作协程领取执行,
+    应用重启后未完成的任务会继续执行
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # 工作协程按状态和计划时间领取任务
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+    # 任务状态
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    # 主键
+    id = Column(Integer, primary_key=True, comment="任务ID")
+
+    # 任务内容
+    kind = Column(String(50), nullable=False, comment="任务类型")
+    key = Column(String(200), nullable=False, unique=True, comment="幂等键(相同键的任务只保留一个)")
+    payload = Column(JSON, nullable=True, comment="任务参数")
+
+    # 执行状态
+    status = Column(String(20), default=PENDING, nullable=False, comment="状态(pending/running/done/failed)")
+    attempts = Column(Integer, default=0, nullable=False, comment="已执行次数")
+    max_attempts = Column(Integer, default=5, nullable=False, comment="最多执行次数")
+    run_at = Column(DateTime, default=datetime.utcnow, nullable=False, comment="计划执行时间")
+    locked_until = Column(DateTime, nullable=True, comment="执行租约到期时间,过期未完成的任务会被重新领取")
+    last_error = Column(Text, nullable=True, comment="最近一次失败原因")
+
+    # 时间戳
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, comment="创建时间")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, comment="更新时间")
+
+    def __repr__(self):
+        """字符串表示"""
+        return f"<Job(id={self.id}, kind='{self.kind}', status='{self.status}')>"
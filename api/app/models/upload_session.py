@@ -0,0 +1,42 @@
+# 分块上传会话数据模型
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from datetime import datetime
+from app.utils.database import Base
+
+
+class UploadSession(Base):
+    """
+    分块上传会话表
+
+    大文件分块上传时记录文件信息和已收到的分块,
+    网络中断后客户端查询会话,只重传缺少的分块
+    """
+    __tablename__ = "upload_sessions"
+
+    # 主键(随机生成,同时作为后续请求的凭据)
+    id = Column(String(32), primary_key=True, comment="上传会话ID")
+
+    # 文件信息
+    filename = Column(String(200), nullable=False, comment="原始文件名")
+    ext = Column(String(10), nullable=False, comment="扩展名")
+    type = Column(String(50), nullable=False, comment="图片类型(event/thumbnail/banner)")
+    size = Column(Integer, nullable=False, comment="文件大小(字节)")
+    sha256 = Column(String(64), nullable=False, comment="客户端声明的文件 SHA-256,完成时校验")
+
+    # 分块信息
+    chunk_size = Column(Integer, nullable=False, comment="分块大小(字节,最后一块可以更小)")
+    total_chunks = Column(Integer, nullable=False, comment="分块总数")
+    received = Column(Text, nullable=False, comment="分块接收状态,每个分块一个字符(0 未收到/1 已收到)")
+
+    # 时间戳
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, comment="创建时间")
+    expires_at = Column(DateTime, nullable=False, index=True, comment="过期时间(每收到一个分块顺延)")
+
+    def __repr__(self):
+        """字符串表示"""
+        return f"<UploadSession(id='{self.id}', filename='{self.filename}')>"
+
+    @property
+    def missing_chunks(self):
+        """返回尚未收到的分块序号"""
+        return [index for index, flag in enumerate(self.received) if flag != "1"]
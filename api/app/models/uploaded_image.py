@@ -1,5 +1,5 @@
 # 上传图片记录模型
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Index
 from datetime import datetime
 from app.utils.database import Base
 
@@ -9,17 +9,31 @@ class UploadedImage(Base):
     上传图片记录表
     
     记录所有上传的图片，方便管理和引用
+    新上传的图片按内容哈希保存,相同内容只有一条记录
     """
     __tablename__ = "uploaded_images"
+    __table_args__ = (
+        # 相同内容只保存一份;旧记录的 sha256 为空,不受约束
+        Index("uq_uploaded_images_sha256", "sha256", unique=True),
+    )
     
     # 主键
     id = Column(Integer, primary_key=True, index=True, comment="图片ID")
     
     # 图片信息
     filename = Column(String(200), nullable=False, comment="文件名")
-    url = Column(String(500), nullable=False, comment="访问URL")
+    url = Column(String(500), nullable=False, index=True, comment="访问URL")
     size = Column(Integer, nullable=False, comment="文件大小(字节)")
     type = Column(String(50), nullable=False, comment="图片类型(event/thumbnail)")
+    sha256 = Column(String(64), nullable=True, comment="文件内容 SHA-256")
+    variants = Column(JSON(none_as_null=True), nullable=True, comment="缩略图URL {宽度: URL}")
+    ref_count = Column(Integer, default=1, server_default="1", nullable=False, comment="引用次数(重复上传相同内容时增加)")
+    
+    # 图片信息(上传时提取,用于客户端预留空间和显示占位图)
+    width = Column(Integer, nullable=True, comment="宽度(像素)")
+    height = Column(Integer, nullable=True, comment="高度(像素)")
+    dominant_color = Column(String(7), nullable=True, comment="主色(#rrggbb)")
+    placeholder = Column(Text, nullable=True, comment="低质量占位图(data URI)")
     
     # 时间戳
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, comment="上传时间")
@@ -33,6 +47,16 @@ class UploadedImage(Base):
         """返回 Markdown 语法"""
         return f"![图片]({self.url})"
     
+    @property
+    def meta(self):
+        """返回图片尺寸、主色和占位图"""
+        return {
+            "width": self.width,
+            "height": self.height,
+            "dominant_color": self.dominant_color,
+            "placeholder": self.placeholder
+        }
+    
     @property
     def size_kb(self):
         """返回文件大小(KB)"""
@@ -6,7 +6,8 @@ from app.utils.database import get_db
 from app.schemas.base import ApiResponse
 from app.schemas.event import EventCreate, EventUpdate, EventResponse
 from app.models.event import Event
-from app.utils.markdown_helper import extract_first_image
+from app.services.event_service import EventService
+from app.utils.markdown_helper import extract_first_image, RENDER_VERSION
 from datetime import datetime
 
 router = APIRouter()
@@ -33,6 +34,8 @@ def create_event(
         date=event_data.date,
         content=event_data.content,
         cover_image=cover_image,
+        content_html=EventService.render_content(db, event_data.content),
+        content_render_version=RENDER_VERSION,
         view_count=0,
         created_at=datetime.utcnow(),
         updated_at=datetime.utcnow()
@@ -78,6 +81,11 @@ def update_event(
     if 'content' in update_data and update_data['content']:
         event.cover_image = extract_first_image(update_data['content'])
     
+    # 如果内容更新了，重新生成预渲染的 HTML
+    if 'content' in update_data:
+        event.content_html = EventService.render_content(db, update_data['content'])
+        event.content_render_version = RENDER_VERSION
+    
     event.updated_at = datetime.utcnow()
     
     db.commit()
@@ -1,17 +1,20 @@
 # 用户认证相关路由
+import asyncio
+from datetime import datetime
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.utils.database import get_db
 from app.schemas.base import ApiResponse
-from app.schemas.user import WxLoginRequest, UserResponse
+from app.schemas.user import WxLoginRequest, UserResponse, LoginResponse
 from app.services.user_service import UserService
-from app.schemas.user import UserCreate, UserUpdate
+from app.utils.session_token import SessionClaims, get_current_session, session_tokens
 
 router = APIRouter()
 
 
-@router.post("/login", response_model=ApiResponse[UserResponse])
+@router.post("/login", response_model=ApiResponse[LoginResponse])
 async def wx_login(
     login_data: WxLoginRequest,
     db: Session = Depends(get_db)
@@ -19,7 +22,8 @@ async def wx_login(
     """
     微信登录
     
-    接收微信code,调用微信API获取openid,创建或更新用户记录
+    接收微信code,调用微信API获取openid,创建或更新用户记录,
+    并签发会话令牌。之后的请求在 Authorization: Bearer 请求头中携带令牌
     
     - **code**: 微信登录凭证
     - **nick_name**: 用户昵称(可选)
@@ -32,66 +36,54 @@ async def wx_login(
     if not open_id:
         raise HTTPException(status_code=400, detail="获取openid失败")
     
-    # 查询用户是否存在
-    user = UserService.get_user_by_openid(db, open_id)
-    
-    if user:
-        # 用户已存在,更新信息
-        update_data = UserUpdate(
-            nick_name=login_data.nick_name,
-            avatar_url=login_data.avatar_url
-        )
-        user = UserService.update_user(db, user, update_data)
-    else:
-        # 创建新用户
-        create_data = UserCreate(
-            open_id=open_id,
-            nick_name=login_data.nick_name,
-            avatar_url=login_data.avatar_url
-        )
-        user = UserService.create_user(db, create_data)
+    # 数据库操作放到线程中执行: 同步的连接池等待不能阻塞事件循环,
+    # 否则并发登录时归还连接的清理步骤无法执行,连接池会被耗尽
+    user = await asyncio.to_thread(UserService.login_user, db, open_id, login_data)
+    token, expires_at = session_tokens.issue(user.id, user.open_id)
     
     return ApiResponse(
         code=200,
         message="登录成功",
-        data=UserResponse.model_validate(user)
+        data=LoginResponse(
+            **UserResponse.model_validate(user).model_dump(),
+            token=token,
+            token_expires_at=datetime.utcfromtimestamp(expires_at)
+        )
     )
 
 
 @router.get("/user", response_model=ApiResponse[UserResponse])
 def get_user_info(
-    open_id: str,
+    session: SessionClaims = Depends(get_current_session),
     db: Session = Depends(get_db)
 ):
     """
-    获取用户信息
+    获取当前登录用户的信息
     
-    根据openid获取用户详细信息
-    
-    - **open_id**: 微信OpenID
+    需要在 Authorization 请求头中携带登录时返回的令牌。
+    用户资料有内存缓存,修改昵称或重新登录后立即失效
     """
-    user = UserService.get_user_by_openid(db, open_id)
+    profile = UserService.get_profile(db, session.user_id, session.open_id)
     
-    if not user:
-        raise HTTPException(status_code=404, detail=f"用户不存在 (OpenID: {open_id})")
+    if not profile:
+        raise HTTPException(status_code=404, detail="用户不存在")
     
     return ApiResponse(
         code=200,
         message="获取用户信息成功",
-        data=UserResponse.model_validate(user)
+        data=profile
     )
 
 
 @router.put("/user/nickname", response_model=ApiResponse[UserResponse])
 def update_nickname(
-    open_id: str,
     nick_name: str,
+    session: SessionClaims = Depends(get_current_session),
     db: Session = Depends(get_db)
 ):
     """
-    修改用户昵称
+    修改当前登录用户的昵称
     
-    - **open_id**: 微信OpenID
     - **nick_name**: 新昵称
     """
     # 验证昵称
@@ -101,15 +93,11 @@ def update_nickname(
     if len(nick_name) > 20:
         raise HTTPException(status_code=400, detail="昵称长度不能超过20个字符")
     
-    # 获取用户
-    user = UserService.get_user_by_openid(db, open_id)
+    # 令牌已经确认了用户身份,直接按用户ID更新
+    user = UserService.update_nickname(db, session.user_id, nick_name.strip())
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
     
-    # 更新昵称
-    update_data = UserUpdate(nick_name=nick_name.strip())
-    user = UserService.update_user(db, user, update_data)
-    
     return ApiResponse(
         code=200,
         message="昵称修改成功",
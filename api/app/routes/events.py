@@ -1,54 +1,167 @@
 # 赛事相关路由
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response, status
 from sqlalchemy.orm import Session
 from typing import Optional
 
 from app.utils.database import get_db
 from app.schemas.base import ApiResponse, PaginatedResponse
-from app.schemas.event import EventResponse, EventCreate, EventUpdate
+from app.schemas.event import (
+    EventResponse,
+    EventSummary,
+    ImageMeta,
+    EventSearchResult,
+    EventViewBeacon,
+    EventCreate,
+    EventUpdate
+)
 from app.services.event_service import EventService
+from app.services.image_service import ImageService, COVER_WIDTH
+from app.services.search_service import highlight, SNIPPET_RADIUS
+from app.utils.pagination import encode_cursor
 
 router = APIRouter()
 
 
-@router.get("", response_model=ApiResponse[PaginatedResponse[EventResponse]])
+def _with_live_views(item):
+    """合并尚未写回数据库的浏览量增量"""
+    item.view_count += EventService.pending_views(item.id)
+    return item
+
+
+def _with_cover(item, covers):
+    """把封面图替换为适合列表展示的缩略图,并附上图片信息"""
+    cover = covers.get(item.cover_image)
+    if cover is not None:
+        item.cover_image = cover.url
+        item.cover_meta = ImageMeta(**cover.meta) if cover.meta else None
+    return item
+
+
+@router.get("", response_model=ApiResponse[PaginatedResponse[EventSummary]])
 def get_events(
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(10, ge=1, le=100, description="每页大小"),
     keyword: Optional[str] = Query(None, max_length=100, description="搜索关键词"),
+    cursor: Optional[str] = Query(None, max_length=200, description="分页游标"),
+    include_total: bool = Query(True, description="是否返回总数"),
+    cover_width: int = Query(COVER_WIDTH, ge=1, le=4096, description="封面图显示宽度(像素)"),
     db: Session = Depends(get_db)
 ):
     """
     获取赛事列表
     
-    支持分页和关键词搜索
+    支持分页和关键词搜索。传入 cursor 时使用游标分页,忽略 page 参数。
+    列表项不包含 content,完整内容请通过详情接口获取
     
     - **page**: 页码,从1开始
     - **page_size**: 每页大小,最大100
-    - **keyword**: 搜索关键词,匹配赛事标题
+    - **keyword**: 搜索关键词,匹配赛事标题和正文
+    - **cursor**: 上一页响应中的 next_cursor
+    - **include_total**: 是否返回总数。has_more 不依赖总数,只需判断是否还有下一页时传 false,
+      可省去 COUNT 查询。total_source 标明总数是实时统计(exact)还是缓存值(cached)
+    - **cover_width**: 封面图显示宽度,cover_image 返回不小于该宽度的最小缩略图,没有缩略图时返回原图
     """
-    # 获取赛事列表
-    events, total = EventService.get_events(
-        db=db,
+    if cursor:
+        # 游标分页
+        events, next_cursor = EventService.get_events_by_cursor(
+            db=db,
+            cursor=cursor,
+            page_size=page_size,
+            keyword=keyword
+        )
+        has_more = next_cursor is not None
+    else:
+        # 页码分页(兼容旧版小程序)
+        events, has_more = EventService.get_events(
+            db=db,
+            page=page,
+            page_size=page_size,
+            keyword=keyword
+        )
+        
+        # 同时返回游标,客户端可从任意页切换到游标分页
+        next_cursor = None
+        if has_more and events:
+            next_cursor = encode_cursor(events[-1].date, events[-1].id)
+    
+    # 总数优先取缓存
+    total = None
+    total_source = None
+    if include_total:
+        total, is_cached = EventService.count_events(db, keyword)
+        total_source = "cached" if is_cached else "exact"
+    
+    # 封面图替换为缩略图,附上尺寸、主色和占位图
+    covers = ImageService.cover_images(db, (event.cover_image for event in events), cover_width)
+    
+    # 构建分页响应
+    paginated_data = PaginatedResponse(
+        items=[
+            _with_cover(_with_live_views(EventSummary.model_validate(event)), covers)
+            for event in events
+        ],
+        total=total,
+        total_source=total_source,
         page=page,
         page_size=page_size,
-        keyword=keyword
+        has_more=has_more,
+        next_cursor=next_cursor
     )
     
-    # 构建分页响应
-    has_more = (page * page_size) < total
+    return ApiResponse(
+        code=200,
+        message="获取赛事列表成功",
+        data=paginated_data
+    )
+
+
+@router.get("/search", response_model=ApiResponse[PaginatedResponse[EventSearchResult]])
+def search_events(
+    q: str = Query(..., min_length=1, max_length=100, description="搜索关键词"),
+    page: int = Query(1, ge=1, description="页码"),
+    page_size: int = Query(10, ge=1, le=50, description="每页大小"),
+    cover_width: int = Query(COVER_WIDTH, ge=1, le=4096, description="封面图显示宽度(像素)"),
+    db: Session = Depends(get_db)
+):
+    """
+    全文搜索赛事
+    
+    同时搜索标题和正文,按相关度排序,返回高亮后的标题和正文摘要
+    
+    - **q**: 搜索关键词,多个关键词用空格分隔
+    - **page**: 页码,从1开始
+    - **page_size**: 每页大小,最大50
+    - **cover_width**: 封面图显示宽度,含义同列表接口
+    """
+    events, total = EventService.search_events(
+        db=db,
+        keyword=q,
+        page=page,
+        page_size=page_size
+    )
+    
+    covers = ImageService.cover_images(db, (event.cover_image for event in events), cover_width)
+    items = [
+        EventSearchResult(
+            **_with_cover(_with_live_views(EventSummary.model_validate(event)), covers).model_dump(),
+            title_highlight=highlight(event.title, q),
+            snippet=highlight(event.content, q, SNIPPET_RADIUS)
+        )
+        for event in events
+    ]
     
     paginated_data = PaginatedResponse(
-        items=[EventResponse.model_validate(event) for event in events],
+        items=items,
         total=total,
+        total_source="exact",
         page=page,
         page_size=page_size,
-        has_more=has_more
+        has_more=(page * page_size) < total
     )
     
     return ApiResponse(
         code=200,
-        message="获取赛事列表成功",
+        message="搜索赛事成功",
         data=paginated_data
     )
 
@@ -56,41 +169,72 @@ def get_events(
 @router.get("/{event_id}", response_model=ApiResponse[EventResponse])
 def get_event_detail(
     event_id: int,
+    include_content: bool = Query(True, description="是否返回 Markdown 原文"),
     db: Session = Depends(get_db)
 ):
     """
     获取赛事详情
     
+    content_html 为保存时预渲染的 HTML,可直接交给 rich-text 展示
+    
     - **event_id**: 赛事ID
+    - **include_content**: 是否返回 Markdown 原文。为 false 且已有预渲染 HTML 时不返回 content,
+      避免同一内容传输两次;尚未预渲染的赛事仍返回 content
     """
     event = EventService.get_event_by_id(db, event_id)
     
+    data = _with_live_views(EventResponse.model_validate(event))
+    if not include_content and data.content_html is not None:
+        data.content = None
+    
     return ApiResponse(
         code=200,
         message="获取赛事详情成功",
-        data=EventResponse.model_validate(event)
+        data=data
     )
 
 
 @router.post("/{event_id}/view", response_model=ApiResponse[EventResponse])
 def increase_view_count(
     event_id: int,
+    viewer_id: Optional[str] = Query(None, max_length=100, description="访客标识"),
     db: Session = Depends(get_db)
 ):
     """
     增加赛事浏览量
     
+    兼容旧版小程序,会返回完整赛事内容;新版请使用 POST /views 上报
+    
     - **event_id**: 赛事ID
+    - **viewer_id**: 访客标识(可选),用于统计独立访客
     """
-    event = EventService.increase_view_count(db, event_id)
+    event = EventService.increase_view_count(db, event_id, viewer_id)
     
     return ApiResponse(
         code=200,
         message="浏览量增加成功",
-        data=EventResponse.model_validate(event)
+        data=_with_live_views(EventResponse.model_validate(event))
     )
 
 
+@router.post("/views", status_code=status.HTTP_204_NO_CONTENT, response_class=Response)
+def record_views(
+    beacon: EventViewBeacon,
+    db: Session = Depends(get_db)
+):
+    """
+    上报浏览量
+    
+    一次请求可上报一个或多个赛事的浏览,与单条增加浏览量共用同一计数缓冲。
+    无响应体,返回 204
+    
+    - **event_ids**: 浏览的赛事ID列表,最多100个
+    - **viewer_id**: 访客标识(可选),用于统计独立访客
+    """
+    EventService.record_views(db, beacon.event_ids, beacon.viewer_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
 @router.post("", response_model=ApiResponse[EventResponse])
 def create_event(
     event_data: EventCreate,
@@ -1,5 +1,9 @@
 from fastapi import APIRouter
 from app.schemas.base import ApiResponse
+from app.services.view_count_service import view_count_buffer
+from app.services.unique_viewer_service import unique_viewer_tracker
+from app.services.last_login_service import last_login_buffer
+from app.services.user_service import UserService
 
 router = APIRouter()
 
@@ -17,6 +21,10 @@ def health_check():
         message="服务运行正常",
         data={
             "status": "ok",
-            "service": "宝利足球赛事通 API"
+            "service": "宝利足球赛事通 API",
+            "view_count_buffer": view_count_buffer.stats(),
+            "unique_viewer_tracker": unique_viewer_tracker.stats(),
+            "last_login_buffer": last_login_buffer.stats(),
+            "user_profile_cache": UserService.profile_cache.stats()
         }
     )
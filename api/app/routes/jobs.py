@@ -0,0 +1,31 @@
+# 后台任务相关路由
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.utils.database import get_db
+from app.models.job import Job
+from app.schemas.base import ApiResponse
+from app.schemas.job import JobResponse
+from app.utils.exceptions import NotFoundException
+
+router = APIRouter()
+
+
+@router.get("/{job_id}", response_model=ApiResponse[JobResponse])
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    查询后台任务状态
+    
+    上传图片等接口返回 job_id,可轮询此接口直到 status 为 done 或 failed
+    
+    - **job_id**: 任务ID
+    """
+    job = db.get(Job, job_id)
+    if job is None:
+        raise NotFoundException(f"任务 {job_id} 不存在")
+    
+    return ApiResponse(
+        code=200,
+        message="获取任务状态成功",
+        data=JobResponse.model_validate(job)
+    )
@@ -1,14 +1,20 @@
 # 文件上传相关路由
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Depends, Request
 from sqlalchemy.orm import Session
 import os
-import uuid
-from datetime import datetime
 from pathlib import Path
 
 from app.utils.database import get_db
+from app.models.job import Job
 from app.models.uploaded_image import UploadedImage
+from app.models.upload_session import UploadSession
+from app.schemas.upload import UploadSessionCreate
+from app.services.upload_service import UploadService, StoredImage
+from app.services.image_reference_service import ImageReferenceService
+from app.services.chunked_upload_service import ChunkedUploadService
+from app.utils.exceptions import PayloadTooLargeException
+from app.utils.multipart_stream import MultipartStream
+from app.utils.static_files import webp_sibling
 
 router = APIRouter()
 
@@ -16,6 +22,7 @@ router = APIRouter()
 UPLOAD_DIR = Path("uploads")
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+MAX_BATCH_FILES = 50  # 批量上传一次最多的文件数
 
 
 def ensure_upload_dir():
@@ -31,17 +38,75 @@ def get_file_extension(filename: str) -> str:
     return Path(filename).suffix.lower()
 
 
-def generate_filename(original_filename: str) -> str:
-    """生成唯一文件名"""
-    ext = get_file_extension(original_filename)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_id = str(uuid.uuid4())[:8]
-    return f"{timestamp}_{unique_id}{ext}"
+def image_data(stored: StoredImage) -> dict:
+    """上传结果中单张图片的数据"""
+    uploaded_image, created, job = stored
+    url = uploaded_image.url
+    return {
+        "id": uploaded_image.id,
+        "url": url,
+        "filename": uploaded_image.filename,
+        "size": uploaded_image.size,
+        "type": uploaded_image.type,
+        "sha256": uploaded_image.sha256,
+        "variants": uploaded_image.variants,
+        "width": uploaded_image.width,
+        "height": uploaded_image.height,
+        "dominant_color": uploaded_image.dominant_color,
+        "placeholder": uploaded_image.placeholder,
+        "ref_count": uploaded_image.ref_count,
+        "deduplicated": not created,
+        "job_id": job.id if job is not None else None,
+        "processing": job is not None and job.status in (Job.PENDING, Job.RUNNING),
+        "markdown": f"![图片描述]({url})",
+        "html": f'<img src="{url}" alt="图片" />'
+    }
+
+
+# 请求体由 MultipartStream 流式解析,这里只用于生成接口文档
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}}
+                }
+            }
+        }
+    }
+}
+
+CHUNK_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/octet-stream": {"schema": {"type": "string", "format": "binary"}}}
+    }
+}
+
+BATCH_UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files"],
+                    "properties": {
+                        "files": {"type": "array", "items": {"type": "string", "format": "binary"}}
+                    }
+                }
+            }
+        }
+    }
+}
 
 
-@router.post("/image")
+@router.post("/image", openapi_extra=UPLOAD_REQUEST_BODY)
 async def upload_image(
-    file: UploadFile = File(...),
+    request: Request,
     type: str = "event",  # event, thumbnail, 或 banner
     db: Session = Depends(get_db)
 ):
@@ -51,87 +116,219 @@ async def upload_image(
     - **file**: 图片文件
     - **type**: 图片类型 (event: 赛事图片, thumbnail: 缩略图, banner: 轮播图)
     
+    文件边接收边写入磁盘,超过大小限制立即中止(413),不会整体读入内存。
+    文件按内容哈希保存在 /uploads/ab/cd/<sha256>.<ext>,重复上传相同内容时
+    返回已有的图片记录(deduplicated 为 true)并增加引用计数
+    
+    尺寸、主色、占位图和缩略图由后台任务生成,新图片返回时这些字段可能为空,
+    processing 为 true,可通过 /api/jobs/{job_id} 查询处理进度
+    
     返回图片访问URL和Markdown语法
     """
+    # 按 Content-Length 提前拒绝过大的请求
+    UploadService.check_content_length(request, MAX_FILE_SIZE)
+    
+    upload = MultipartStream(request)
+    original_filename = await upload.next_file()
+    if original_filename is None:
+        raise HTTPException(status_code=400, detail="请选择要上传的图片文件")
+    
     # 验证文件扩展名
-    ext = get_file_extension(file.filename)
+    ext = get_file_extension(original_filename)
     if ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
             detail=f"不支持的文件格式。允许的格式: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # 读取文件内容
-    contents = await file.read()
+    # 确保上传目录存在
+    ensure_upload_dir()
     
-    # 验证文件大小
-    if len(contents) > MAX_FILE_SIZE:
+    # 流式保存文件,相同内容只保存一份
+    try:
+        stored = await UploadService.store_image(
+            db, upload.iter_file(), UPLOAD_DIR, ext, type, MAX_FILE_SIZE
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
         raise HTTPException(
-            status_code=400,
-            detail=f"文件太大。最大允许 {MAX_FILE_SIZE / 1024 / 1024}MB"
+            status_code=500,
+            detail=f"保存文件失败: {str(e)}"
         )
     
-    # 确保上传目录存在
-    ensure_upload_dir()
+    return {
+        "code": 200,
+        "message": "上传成功" if stored.created else "图片已存在,返回已有图片",
+        "data": image_data(stored)
+    }
+
+
+@router.post("/images", openapi_extra=BATCH_UPLOAD_REQUEST_BODY)
+async def upload_images(
+    request: Request,
+    type: str = "event",  # event, thumbnail, 或 banner
+    db: Session = Depends(get_db)
+):
+    """
+    批量上传图片
     
-    # 生成文件名
-    filename = generate_filename(file.filename)
+    - **files**: 图片文件(可多个,一次最多 50 个)
+    - **type**: 图片类型 (event: 赛事图片, thumbnail: 缩略图, banner: 轮播图)
     
-    # 确定保存路径
-    if type == "thumbnail":
-        save_dir = UPLOAD_DIR / "thumbnails"
-    elif type == "banner":
-        save_dir = UPLOAD_DIR / "banners"
-    else:
-        save_dir = UPLOAD_DIR / "events"
+    所有文件在一个请求中依次流式写入磁盘,接收完后在同一事务中保存全部记录;
+    缩略图等由后台任务并行生成。单个文件格式不支持或过大只影响该文件,
+    items 按上传顺序返回每个文件的结果
+    """
+    UploadService.check_content_length(request, MAX_FILE_SIZE * MAX_BATCH_FILES)
     
-    file_path = save_dir / filename
+    upload = MultipartStream(request)
+    ensure_upload_dir()
     
-    # 保存文件
     try:
-        with open(file_path, "wb") as f:
-            f.write(contents)
+        items = await UploadService.store_images(
+            db, upload, UPLOAD_DIR, ALLOWED_EXTENSIONS, type, MAX_FILE_SIZE, MAX_BATCH_FILES
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"保存文件失败: {str(e)}"
         )
     
-    # 返回访问URL
-    url = f"/uploads/{type}s/{filename}"
+    results = []
+    for item in items:
+        results.append({
+            "filename": item.filename,
+            "success": item.error is None,
+            "error": item.error,
+            "data": image_data(item.result) if item.result is not None else None
+        })
+    succeeded = sum(1 for result in results if result["success"])
+    return {
+        "code": 200,
+        "message": f"上传完成: 成功 {succeeded} 张,失败 {len(results) - succeeded} 张",
+        "data": {
+            "items": results,
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded
+        }
+    }
+
+
+def session_data(session: UploadSession) -> dict:
+    """分块上传会话的状态"""
+    missing = session.missing_chunks
+    return {
+        "upload_id": session.id,
+        "filename": session.filename,
+        "size": session.size,
+        "chunk_size": session.chunk_size,
+        "total_chunks": session.total_chunks,
+        "received_chunks": session.total_chunks - len(missing),
+        "missing_chunks": missing,
+        "expires_at": session.expires_at.isoformat()
+    }
+
+
+@router.post("/sessions")
+async def create_upload_session(data: UploadSessionCreate, db: Session = Depends(get_db)):
+    """
+    创建分块上传会话
+    
+    适合网络不稳定时上传大图: 按返回的 chunk_size 把文件切成若干块,
+    逐块 PUT 到 /sessions/{upload_id}/chunks/{index},全部上传后调用 complete。
+    中断后用 GET /sessions/{upload_id} 查询 missing_chunks,只重传缺少的分块
+    
+    - **filename**: 原始文件名
+    - **size**: 文件大小(字节)
+    - **sha256**: 文件内容的 SHA-256,完成时校验
+    - **type**: 图片类型 (event: 赛事图片, thumbnail: 缩略图, banner: 轮播图)
+    """
+    ext = get_file_extension(data.filename)
+    if ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的文件格式。允许的格式: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+    if data.size > MAX_FILE_SIZE:
+        raise PayloadTooLargeException(UploadService.too_large_message(MAX_FILE_SIZE))
     
-    # 保存到数据库
-    uploaded_image = UploadedImage(
-        filename=filename,
-        url=url,
-        size=len(contents),
-        type=type,
-        created_at=datetime.utcnow()
+    ensure_upload_dir()
+    session = ChunkedUploadService.create_session(
+        db, UPLOAD_DIR, data.filename, ext, data.size, data.sha256, data.type
     )
-    db.add(uploaded_image)
-    db.commit()
-    db.refresh(uploaded_image)
+    return {"code": 200, "message": "上传会话已创建", "data": session_data(session)}
+
+
+@router.get("/sessions/{upload_id}")
+async def get_upload_session(upload_id: str, db: Session = Depends(get_db)):
+    """
+    查询分块上传进度
+    
+    - **upload_id**: 上传会话ID
+    """
+    session = ChunkedUploadService.get_session(db, upload_id)
+    return {"code": 200, "message": "获取上传进度成功", "data": session_data(session)}
+
+
+@router.put("/sessions/{upload_id}/chunks/{index}", openapi_extra=CHUNK_REQUEST_BODY)
+async def upload_chunk(upload_id: str, index: int, request: Request, db: Session = Depends(get_db)):
+    """
+    上传一个分块
+    
+    请求体为分块的原始字节(application/octet-stream)。除最后一块外,
+    每块大小必须等于 chunk_size;重复上传同一分块会覆盖之前的数据
+    
+    - **upload_id**: 上传会话ID
+    - **index**: 分块序号(从 0 开始)
+    """
+    session = ChunkedUploadService.get_session(db, upload_id)
+    session = await ChunkedUploadService.write_chunk(db, session, index, request.stream(), UPLOAD_DIR)
+    return {"code": 200, "message": f"分块 {index} 上传成功", "data": session_data(session)}
+
+
+@router.post("/sessions/{upload_id}/complete")
+async def complete_upload_session(upload_id: str, db: Session = Depends(get_db)):
+    """
+    完成分块上传
+    
+    校验文件 SHA-256 后保存图片,返回内容与 /image 接口相同。
+    校验失败时会话作废,需要重新上传
     
+    - **upload_id**: 上传会话ID
+    """
+    session = ChunkedUploadService.get_session(db, upload_id)
+    stored = await ChunkedUploadService.complete(db, session, UPLOAD_DIR)
     return {
         "code": 200,
-        "message": "上传成功",
-        "data": {
-            "id": uploaded_image.id,
-            "url": url,
-            "filename": filename,
-            "size": len(contents),
-            "type": type,
-            "markdown": f"![图片描述]({url})",
-            "html": f'<img src="{url}" alt="图片" />'
-        }
+        "message": "上传成功" if stored.created else "图片已存在,返回已有图片",
+        "data": image_data(stored)
     }
 
 
+@router.delete("/sessions/{upload_id}")
+async def abort_upload_session(upload_id: str, db: Session = Depends(get_db)):
+    """
+    取消分块上传,删除已上传的分块
+    
+    - **upload_id**: 上传会话ID
+    """
+    session = ChunkedUploadService.get_session(db, upload_id)
+    ChunkedUploadService.abort(db, session, UPLOAD_DIR)
+    return {"code": 200, "message": "上传已取消", "data": {"upload_id": upload_id}}
+
+
 @router.delete("/image")
-async def delete_image(url: str):
+async def delete_image(url: str, db: Session = Depends(get_db)):
     """
     删除图片
     
+    同时删除该图片的缩略图和 WebP 版本。图片被多次上传时,
+    每次删除只减少一次引用,引用全部释放后才删除文件。
+    仍被赛事、轮播图或客服配置使用的图片不能删除(409)
+    
     - **url**: 图片URL
     """
     # 从URL提取文件路径
@@ -145,13 +342,37 @@ async def delete_image(url: str):
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="文件不存在")
     
+    if ImageReferenceService.is_referenced(db, url):
+        raise HTTPException(status_code=409, detail="图片正在被赛事、轮播图或客服配置使用,无法删除")
+    
+    # 相同内容被多次上传时只减少引用计数,最后一次引用释放后才删除文件
+    uploaded_image = db.query(UploadedImage).filter(UploadedImage.url == url).first()
+    variants = {}
+    if uploaded_image is not None:
+        variants = uploaded_image.variants or {}
+        remaining = UploadService.release_image(db, uploaded_image)
+        if remaining:
+            return {
+                "code": 200,
+                "message": "图片仍被其他上传引用,已减少引用次数",
+                "data": {"url": url, "ref_count": remaining}
+            }
+    
     # 删除文件
     try:
         file_path.unlink()
+        
+        # 删除缩略图,以及原图和缩略图的 WebP 版本
+        paths = [file_path] + [Path(variant_url[1:]) for variant_url in variants.values()]
+        for path in paths:
+            path.unlink(missing_ok=True)
+            webp_path = webp_sibling(str(path))
+            if webp_path:
+                Path(webp_path).unlink(missing_ok=True)
         return {
             "code": 200,
             "message": "删除成功",
-            "data": {"url": url}
+            "data": {"url": url, "ref_count": 0}
         }
     except Exception as e:
         raise HTTPException(
@@ -1,13 +1,15 @@
 # Pydantic 模式
 from .base import ApiResponse, PaginatedResponse, ErrorDetail
-from .event import EventBase, EventCreate, EventUpdate, EventResponse, EventListQuery
-from .user import UserBase, UserCreate, UserUpdate, UserResponse, WxLoginRequest
+from .event import EventBase, EventCreate, EventUpdate, EventResponse, EventSummary, EventSearchResult, EventViewBeacon, EventListQuery
+from .user import UserBase, UserCreate, UserUpdate, UserResponse, LoginResponse, WxLoginRequest
 from .customer_service import (
     CustomerServiceBase,
     CustomerServiceCreate,
     CustomerServiceUpdate,
     CustomerServiceResponse
 )
+from .job import JobResponse
+from .upload import UploadSessionCreate
 
 __all__ = [
     "ApiResponse",
@@ -17,14 +19,20 @@ __all__ = [
     "EventCreate",
     "EventUpdate",
     "EventResponse",
+    "EventSummary",
+    "EventSearchResult",
+    "EventViewBeacon",
     "EventListQuery",
     "UserBase",
     "UserCreate",
     "UserUpdate",
     "UserResponse",
+    "LoginResponse",
     "WxLoginRequest",
     "CustomerServiceBase",
     "CustomerServiceCreate",
     "CustomerServiceUpdate",
     "CustomerServiceResponse",
+    "JobResponse",
+    "UploadSessionCreate",
 ]
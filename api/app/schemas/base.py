@@ -1,5 +1,5 @@
 # 基础响应模型
-from typing import Generic, TypeVar, Optional, Any, List
+from typing import Generic, TypeVar, Optional, Any, List, Literal
 from pydantic import BaseModel
 
 # 泛型类型变量
@@ -35,25 +35,34 @@ class PaginatedResponse(BaseModel, Generic[T]):
     
     Attributes:
         items: 数据项列表
-        total: 总数据量
+        total: 总数据量(客户端未请求总数时为空)
+        total_source: 总数来源
+            - exact: 本次请求实时统计的精确值
+            - cached: 缓存值,可能滞后于最近的写入(最长为缓存有效期)
+            - 为空: 未返回总数
         page: 当前页码
         page_size: 每页大小
-        has_more: 是否有更多数据
+        has_more: 是否有更多数据(始终精确,不依赖 total)
+        next_cursor: 下一页游标(游标分页使用,没有更多数据时为空)
     """
     items: List[T]
-    total: int
+    total: Optional[int] = None
+    total_source: Optional[Literal["exact", "cached"]] = None
     page: int
     page_size: int
     has_more: bool
+    next_cursor: Optional[str] = None
 
     class Config:
         json_schema_extra = {
             "example": {
                 "items": [],
                 "total": 0,
+                "total_source": "exact",
                 "page": 1,
                 "page_size": 10,
-                "has_more": False
+                "has_more": False,
+                "next_cursor": None
             }
         }
 
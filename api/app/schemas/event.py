@@ -1,7 +1,7 @@
 # 赛事数据模式
 from pydantic import BaseModel, Field
 from datetime import date as DateType, datetime as DateTimeType
-from typing import Optional
+from typing import List, Optional
 
 
 class EventBase(BaseModel):
@@ -26,8 +26,10 @@ class EventUpdate(BaseModel):
 class EventResponse(EventBase):
     """赛事响应模式"""
     id: int = Field(description="赛事ID")
+    content_html: Optional[str] = Field(None, description="预渲染的内容HTML,可直接用于 rich-text")
     cover_image: Optional[str] = Field(None, description="封面图URL")
     view_count: int = Field(description="浏览量")
+    unique_viewers: int = Field(0, description="独立访客数(估计值)")
     created_at: DateTimeType = Field(description="创建时间")
     updated_at: DateTimeType = Field(description="更新时间")
     
@@ -35,6 +37,41 @@ class EventResponse(EventBase):
         from_attributes = True
 
 
+class ImageMeta(BaseModel):
+    """图片尺寸、主色和占位图,客户端据此预留空间并先显示占位"""
+    width: int = Field(description="宽度(像素)")
+    height: int = Field(description="高度(像素)")
+    dominant_color: Optional[str] = Field(None, description="主色(#rrggbb),透明图片为空")
+    placeholder: Optional[str] = Field(None, description="低质量占位图(data URI),透明图片为空")
+
+
+class EventSummary(BaseModel):
+    """赛事列表项模式(不包含 Markdown 内容)"""
+    id: int = Field(description="赛事ID")
+    title: str = Field(description="赛事标题")
+    date: DateType = Field(description="赛事日期")
+    cover_image: Optional[str] = Field(None, description="封面图URL")
+    cover_meta: Optional[ImageMeta] = Field(None, description="封面图信息,封面不是通过上传接口上传时为空")
+    view_count: int = Field(description="浏览量")
+    unique_viewers: int = Field(0, description="独立访客数(估计值)")
+    updated_at: DateTimeType = Field(description="更新时间")
+    
+    class Config:
+        from_attributes = True
+
+
+class EventSearchResult(EventSummary):
+    """赛事搜索结果模式"""
+    title_highlight: str = Field(description="高亮关键词后的标题(HTML)")
+    snippet: str = Field(description="命中关键词的正文摘要(HTML)")
+
+
+class EventViewBeacon(BaseModel):
+    """浏览量上报模式"""
+    event_ids: List[int] = Field(description="浏览的赛事ID列表,同一ID出现多次计为多次浏览", min_length=1, max_length=100)
+    viewer_id: Optional[str] = Field(None, description="访客标识(openid 或客户端ID),用于统计独立访客", max_length=100)
+
+
 class EventListQuery(BaseModel):
     """赛事列表查询参数"""
     page: int = Field(1, ge=1, description="页码")
@@ -0,0 +1,20 @@
+# 后台任务相关的 Pydantic 模型
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional
+
+
+class JobResponse(BaseModel):
+    """后台任务状态响应模型"""
+    id: int = Field(..., description="任务ID")
+    kind: str = Field(..., description="任务类型")
+    status: str = Field(..., description="状态(pending/running/done/failed)")
+    attempts: int = Field(..., description="已执行次数")
+    max_attempts: int = Field(..., description="最多执行次数")
+    run_at: datetime = Field(..., description="计划执行时间(失败重试时为下次重试时间)")
+    last_error: Optional[str] = Field(None, description="最近一次失败原因")
+    created_at: datetime = Field(..., description="创建时间")
+    updated_at: datetime = Field(..., description="更新时间")
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,10 @@
+# 上传相关的 Pydantic 模型
+from pydantic import BaseModel, Field
+
+
+class UploadSessionCreate(BaseModel):
+    """创建分块上传会话请求模型"""
+    filename: str = Field(..., min_length=1, max_length=200, description="原始文件名")
+    size: int = Field(..., gt=0, description="文件大小(字节)")
+    sha256: str = Field(..., pattern=r"^[0-9a-fA-F]{64}$", description="文件内容 SHA-256,完成时校验")
+    type: str = Field(default="event", max_length=50, description="图片类型 (event/thumbnail/banner)")
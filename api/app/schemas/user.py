@@ -32,6 +32,12 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
+class LoginResponse(UserResponse):
+    """登录响应模型"""
+    token: str = Field(..., description="会话令牌,之后的请求放在 Authorization: Bearer 请求头中")
+    token_expires_at: datetime = Field(..., description="令牌过期时间(UTC)")
+
+
 class WxLoginRequest(BaseModel):
     """微信登录请求模型"""
     code: str = Field(..., min_length=1, description="微信登录凭证code")
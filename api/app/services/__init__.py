@@ -1,10 +1,37 @@
 # 业务逻辑服务
 from .event_service import EventService
 from .user_service import UserService
+from .wechat_client import WeChatClient, wechat_client
 from .customer_service import CustomerServiceService
+from .search_service import SearchService
+from .view_count_service import ViewCountBuffer, view_count_buffer
+from .unique_viewer_service import UniqueViewerTracker, unique_viewer_tracker
+from .last_login_service import LastLoginBuffer, last_login_buffer
+from .job_queue import JobQueue, job_queue
+from .upload_service import UploadService, StoredUpload, StoredImage
+from .image_service import ImageService
+from .image_reference_service import ImageReferenceService
+from .chunked_upload_service import ChunkedUploadService
 
 __all__ = [
     "EventService",
     "UserService",
+    "WeChatClient",
+    "wechat_client",
     "CustomerServiceService",
+    "SearchService",
+    "ViewCountBuffer",
+    "view_count_buffer",
+    "UniqueViewerTracker",
+    "unique_viewer_tracker",
+    "LastLoginBuffer",
+    "last_login_buffer",
+    "JobQueue",
+    "job_queue",
+    "UploadService",
+    "StoredUpload",
+    "StoredImage",
+    "ImageService",
+    "ImageReferenceService",
+    "ChunkedUploadService",
 ]
@@ -0,0 +1,265 @@
+# 分块上传服务
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator
+
+from sqlalchemy import String, func
+from sqlalchemy.orm import Session
+
+from app.models.upload_session import UploadSession
+from app.services.job_queue import job_queue
+from app.services.upload_service import StoredImage, StoredUpload, UploadService
+from app.utils.database import SessionLocal
+from app.utils.exceptions import BadRequestException, NotFoundException
+
+logger = logging.getLogger(__name__)
+
+# 分块大小(字节)、会话有效期和过期会话清理间隔(秒),从环境变量读取
+CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(256 * 1024)))
+SESSION_TTL = float(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))
+SWEEP_INTERVAL = float(os.getenv("UPLOAD_SESSION_SWEEP_INTERVAL", "600"))
+
+
+def session_path(upload_dir: Path, upload_id: str) -> Path:
+    """分块上传的临时文件路径(与最终位置在同一文件系统,完成后原子移动)"""
+    return upload_dir / f".chunked-{upload_id}.part"
+
+
+class ChunkedUploadService:
+    """
+    分块上传服务
+
+    创建会话时按文件大小建立稀疏临时文件,每个分块直接写入对应偏移,
+    接收状态保存在数据库中,应用重启后也能继续上传。全部分块收到后
+    校验整个文件的 SHA-256,再按普通上传的方式登记图片记录。
+    超过有效期没有新分块的会话由后台任务清理
+    """
+
+    @staticmethod
+    def create_session(
+        db: Session,
+        upload_dir: Path,
+        filename: str,
+        ext: str,
+        size: int,
+        sha256: str,
+        type: str
+    ) -> UploadSession:
+        """
+        创建分块上传会话
+
+        Args:
+            db: 数据库会话
+            upload_dir: 上传根目录
+            filename: 原始文件名
+            ext: 扩展名(含点)
+            size: 文件大小
+            sha256: 文件内容 SHA-256
+            type: 图片类型
+
+        Returns:
+            上传会话
+        """
+        total_chunks = (size + CHUNK_SIZE - 1) // CHUNK_SIZE
+        now = datetime.utcnow()
+        session = UploadSession(
+            id=uuid.uuid4().hex,
+            filename=filename,
+            ext=ext,
+            type=type,
+            size=size,
+            sha256=sha256.lower(),
+            chunk_size=CHUNK_SIZE,
+            total_chunks=total_chunks,
+            received="0" * total_chunks,
+            created_at=now,
+            expires_at=now + timedelta(seconds=SESSION_TTL)
+        )
+        # 稀疏文件: 只占用实际写入的分块
+        with open(session_path(upload_dir, session.id), "wb") as file:
+            file.truncate(size)
+        db.add(session)
+        db.commit()
+        db.refresh(session)
+        return session
+
+    @staticmethod
+    def get_session(db: Session, upload_id: str) -> UploadSession:
+        """
+        获取未过期的上传会话
+
+        Raises:
+            NotFoundException: 会话不存在或已过期
+        """
+        session = db.get(UploadSession, upload_id)
+        if session is None or session.expires_at < datetime.utcnow():
+            raise NotFoundException("上传会话不存在或已过期,请重新上传")
+        return session
+
+    @staticmethod
+    async def write_chunk(
+        db: Session,
+        session: UploadSession,
+        index: int,
+        chunks: AsyncIterator[bytes],
+        upload_dir: Path
+    ) -> UploadSession:
+        """
+        写入一个分块
+
+        数据直接写入临时文件的对应偏移,完整收到后才标记为已接收,
+        中途断开的分块重传即可。同一分块重复上传会覆盖之前的数据
+
+        Args:
+            db: 数据库会话
+            session: 上传会话
+            index: 分块序号(从 0 开始)
+            chunks: 分块数据
+            upload_dir: 上传根目录
+
+        Returns:
+            更新后的上传会话
+
+        Raises:
+            BadRequestException: 分块序号无效或大小不符
+        """
+        if not 0 <= index < session.total_chunks:
+            raise BadRequestException(f"分块序号应在 0 到 {session.total_chunks - 1} 之间")
+        offset = index * session.chunk_size
+        expected = min(session.chunk_size, session.size - offset)
+
+        try:
+            file = await asyncio.to_thread(open, session_path(upload_dir, session.id), "r+b")
+        except FileNotFoundError:
+            raise NotFoundException("上传会话不存在或已过期,请重新上传")
+        try:
+            await asyncio.to_thread(file.seek, offset)
+            written = 0
+            async for data in chunks:
+                written += len(data)
+                if written > expected:
+                    raise BadRequestException(f"分块 {index} 的大小应为 {expected} 字节")
+                await asyncio.to_thread(file.write, data)
+            if written != expected:
+                raise BadRequestException(f"分块 {index} 的大小应为 {expected} 字节,实际收到 {written} 字节")
+        finally:
+            await asyncio.to_thread(file.close)
+
+        # 单条 UPDATE 修改对应位置的状态字符,并发上传不同分块时不会互相覆盖
+        received = UploadSession.received
+        db.query(UploadSession).filter(UploadSession.id == session.id).update({
+            UploadSession.received: func.substr(received, 1, index, type_=String)
+            .concat("1")
+            .concat(func.substr(received, index + 2, type_=String)),
+            UploadSession.expires_at: datetime.utcnow() + timedelta(seconds=SESSION_TTL)
+        }, synchronize_session=False)
+        db.commit()
+        db.refresh(session)
+        return session
+
+    @staticmethod
+    async def complete(db: Session, session: UploadSession, upload_dir: Path) -> StoredImage:
+        """
+        完成上传: 校验文件哈希并登记图片记录
+
+        Args:
+            db: 数据库会话
+            session: 上传会话
+            upload_dir: 上传根目录
+
+        Returns:
+            图片记录、是否为新图片,以及图片处理任务
+
+        Raises:
+            BadRequestException: 还有分块未上传,或文件哈希与创建会话时声明的不一致
+        """
+        missing = session.missing_chunks
+        if missing:
+            raise BadRequestException(f"还有 {len(missing)} 个分块未上传")
+
+        path = session_path(upload_dir, session.id)
+        try:
+            sha256 = await asyncio.to_thread(ChunkedUploadService._hash_file, path)
+        except FileNotFoundError:
+            raise NotFoundException("上传会话不存在或已过期,请重新上传")
+        if sha256 != session.sha256:
+            ChunkedUploadService.abort(db, session, upload_dir)
+            raise BadRequestException("文件校验失败(SHA-256 不一致),请重新上传")
+
+        # 条件删除会话,同一会话被并发完成时只有一个请求继续
+        claimed = db.query(UploadSession).filter(UploadSession.id == session.id).delete(synchronize_session=False)
+        if not claimed:
+            db.rollback()
+            raise NotFoundException("上传会话不存在或已过期,请重新上传")
+        try:
+            result = UploadService.register(
+                db, StoredUpload(path=path, size=session.size, sha256=sha256), upload_dir, session.ext, session.type
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        db.refresh(result.image)
+        if result.job is not None:
+            job_queue.notify()
+        return result
+
+    @staticmethod
+    def abort(db: Session, session: UploadSession, upload_dir: Path) -> None:
+        """取消上传,删除会话和临时文件"""
+        db.delete(session)
+        db.commit()
+        session_path(upload_dir, session.id).unlink(missing_ok=True)
+
+    @staticmethod
+    def expire(upload_dir: Path) -> int:
+        """
+        清理过期的上传会话
+
+        Returns:
+            清理的会话数
+        """
+        db = SessionLocal()
+        try:
+            expired_ids = [
+                upload_id for (upload_id,) in
+                db.query(UploadSession.id).filter(UploadSession.expires_at < datetime.utcnow())
+            ]
+            if not expired_ids:
+                return 0
+            db.query(UploadSession).filter(UploadSession.id.in_(expired_ids)).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        for upload_id in expired_ids:
+            session_path(upload_dir, upload_id).unlink(missing_ok=True)
+        return len(expired_ids)
+
+    @staticmethod
+    async def run(upload_dir: Path) -> None:
+        """后台定期清理过期会话,由应用生命周期启动"""
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            # 单次清理失败(数据库锁定、删除文件无权限等)不终止任务,下个周期重试
+            try:
+                expired = await asyncio.to_thread(ChunkedUploadService.expire, upload_dir)
+            except Exception:
+                logger.exception("清理过期的分块上传会话失败,将在下个周期重试")
+                continue
+            if expired:
+                logger.info(f"已清理 {expired} 个过期的分块上传会话")
+
+    @staticmethod
+    def _hash_file(path: Path) -> str:
+        """落盘后计算文件的 SHA-256"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            os.fsync(file.fileno())
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
@@ -1,25 +1,172 @@
 # 赛事业务逻辑服务
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import Optional, Tuple, List
+from sqlalchemy.orm import Session, Query, load_only, object_session
+from sqlalchemy import event as sa_event, func, inspect, or_, select, text, tuple_
+from typing import Dict, Optional, Tuple, List
+import os
 from app.models.event import Event
+from app.models.image_reference import ImageReference
 from app.schemas.event import EventCreate, EventUpdate
 from app.utils.exceptions import NotFoundException
+from app.utils.markdown_helper import (
+    render_content_html,
+    content_image_urls,
+    annotate_images,
+    RENDER_VERSION
+)
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.services.search_service import SearchService, build_match_query
+from app.services.image_service import ImageService
+from app.services.view_count_service import view_count_buffer
+from app.services.unique_viewer_service import unique_viewer_tracker
+from app.utils.count_cache import CountCache
 
 
 class EventService:
     """赛事服务类"""
     
+    # 列表总数缓存,赛事增删改提交后失效 (有效期从环境变量读取,单位秒)
+    count_cache = CountCache(ttl=float(os.getenv("EVENT_COUNT_CACHE_TTL", "60")))
+    
+    @staticmethod
+    def _list_query(db: Session, keyword: Optional[str] = None) -> Query:
+        """
+        构建列表查询
+        
+        只加载列表展示需要的列,content 等大字段延迟加载,
+        详情接口是唯一会读取 content 的地方
+        
+        Args:
+            db: 数据库会话
+            keyword: 搜索关键词
+            
+        Returns:
+            列表查询对象
+        """
+        query = db.query(Event).options(
+            load_only(
+                Event.id,
+                Event.title,
+                Event.date,
+                Event.cover_image,
+                Event.view_count,
+                Event.unique_viewers,
+                Event.updated_at
+            )
+        )
+        
+        return EventService._filter_keyword(db, query, keyword)
+    
+    @staticmethod
+    def _filter_keyword(db: Session, query: Query, keyword: Optional[str]) -> Query:
+        """为查询添加关键词过滤条件"""
+        if keyword:
+            match_query = EventService._match_query(db, keyword)
+            if match_query:
+                query = query.filter(Event.id.in_(SearchService.match_ids(match_query)))
+            else:
+                search_pattern = f"%{keyword}%"
+                query = query.filter(Event.title.like(search_pattern))
+        
+        return query
+    
+    @staticmethod
+    def _match_query(db: Session, keyword: str) -> Optional[str]:
+        """
+        获取关键词对应的 FTS 查询表达式
+        
+        FTS 索引不可用或关键词中没有可索引内容时返回 None,调用方回退为 LIKE
+        """
+        if not SearchService.is_enabled(db.connection()):
+            return None
+        return build_match_query(keyword)
+    
+    @staticmethod
+    def search_events(
+        db: Session,
+        keyword: str,
+        page: int = 1,
+        page_size: int = 10
+    ) -> Tuple[List[Event], int]:
+        """
+        全文搜索赛事(按相关度排序)
+        
+        同时搜索标题和正文,标题命中的排名更靠前
+        
+        Args:
+            db: 数据库会话
+            keyword: 搜索关键词
+            page: 页码
+            page_size: 每页大小
+            
+        Returns:
+            (按相关度排序的赛事列表, 总数量)
+        """
+        offset = (page - 1) * page_size
+        match_query = EventService._match_query(db, keyword)
+        
+        if not match_query:
+            # 回退为 LIKE 搜索,按日期排序
+            search_pattern = f"%{keyword}%"
+            query = db.query(Event).filter(
+                or_(Event.title.like(search_pattern), Event.content.like(search_pattern))
+            )
+            total = query.count()
+            events = query.order_by(Event.date.desc(), Event.id.desc()).offset(offset).limit(page_size).all()
+            return events, total
+        
+        ids, total = SearchService.search_ranked(db.connection(), match_query, offset, page_size)
+        if not ids:
+            return [], total
+        
+        # 按相关度顺序返回
+        events_by_id = {event.id: event for event in db.query(Event).filter(Event.id.in_(ids)).all()}
+        events = [events_by_id[event_id] for event_id in ids if event_id in events_by_id]
+        return events, total
+    
+    @staticmethod
+    def count_events(
+        db: Session,
+        keyword: Optional[str] = None,
+        use_cache: bool = True
+    ) -> Tuple[int, bool]:
+        """
+        统计赛事数量
+        
+        优先返回缓存的计数,缓存未命中时执行 COUNT 并写入缓存
+        
+        Args:
+            db: 数据库会话
+            keyword: 搜索关键词
+            use_cache: 是否允许使用缓存
+            
+        Returns:
+            (总数量, 是否来自缓存)
+        """
+        cache_key = keyword or ""
+        if use_cache:
+            cached = EventService.count_cache.get(cache_key)
+            if cached is not None:
+                return cached, True
+        
+        generation = EventService.count_cache.generation
+        query = EventService._filter_keyword(db, db.query(func.count(Event.id)), keyword)
+        total = query.scalar()
+        EventService.count_cache.set(cache_key, total, generation)
+        return total, False
+    
     @staticmethod
     def get_events(
         db: Session,
         page: int = 1,
         page_size: int = 10,
         keyword: Optional[str] = None
-    ) -> Tuple[List[Event], int]:
+    ) -> Tuple[List[Event], bool]:
         """
         获取赛事列表(支持分页和搜索)
         
+        多取一条记录判断是否还有下一页,不执行 COUNT 查询,
+        需要总数时调用 count_events
+        
         Args:
             db: 数据库会话
             page: 页码
@@ -27,27 +174,63 @@ class EventService:
             keyword: 搜索关键词
             
         Returns:
-            (赛事列表, 总数量)
+            (赛事列表, 是否还有更多)
         """
         # 构建查询
-        query = db.query(Event)
+        query = EventService._list_query(db, keyword)
         
-        # 搜索过滤
-        if keyword:
-            search_pattern = f"%{keyword}%"
-            query = query.filter(Event.title.like(search_pattern))
-        
-        # 按日期降序排序
-        query = query.order_by(Event.date.desc())
-        
-        # 获取总数
-        total = query.count()
+        # 按日期降序排序,ID 作为同日期内的稳定排序
+        query = query.order_by(Event.date.desc(), Event.id.desc())
         
         # 分页
         offset = (page - 1) * page_size
-        events = query.offset(offset).limit(page_size).all()
+        rows = query.offset(offset).limit(page_size + 1).all()
         
-        return events, total
+        return rows[:page_size], len(rows) > page_size
+    
+    @staticmethod
+    def get_events_by_cursor(
+        db: Session,
+        cursor: Optional[str] = None,
+        page_size: int = 10,
+        keyword: Optional[str] = None
+    ) -> Tuple[List[Event], Optional[str]]:
+        """
+        获取赛事列表(游标分页)
+        
+        按 (date, id) 键集定位到游标之后的记录,翻到任意深度的页面开销都与第一页相同。
+        这依赖 SQLite 中 id 即 rowid,已隐含在 ix_events_date 索引末尾;
+        换用其他数据库时需另建 (date, id) 复合索引,否则每页都要排序
+        
+        Args:
+            db: 数据库会话
+            cursor: 上一页返回的游标,为空时从第一页开始
+            page_size: 每页大小
+            keyword: 搜索关键词
+            
+        Returns:
+            (赛事列表, 下一页游标)
+            
+        Raises:
+            BadRequestException: 游标格式无效
+        """
+        query = EventService._list_query(db, keyword)
+        
+        # 从游标位置之后继续读取
+        if cursor:
+            cursor_date, cursor_id = decode_cursor(cursor)
+            query = query.filter(tuple_(Event.date, Event.id) < tuple_(cursor_date, cursor_id))
+        
+        # 多取一条用于判断是否还有下一页
+        rows = query.order_by(Event.date.desc(), Event.id.desc()).limit(page_size + 1).all()
+        events = rows[:page_size]
+        
+        next_cursor = None
+        if len(rows) > page_size:
+            last = events[-1]
+            next_cursor = encode_cursor(last.date, last.id)
+        
+        return events, next_cursor
     
     @staticmethod
     def get_event_by_id(db: Session, event_id: int) -> Event:
@@ -71,6 +254,67 @@ class EventService:
         
         return event
     
+    @staticmethod
+    def render_content(db: Session, content: Optional[str]) -> Optional[str]:
+        """
+        生成预渲染的内容 HTML
+        
+        已上传的图片会加上尺寸和占位图,详情页加载图片时不会跳动
+        
+        Args:
+            db: 数据库会话
+            content: Markdown 内容
+            
+        Returns:
+            HTML 内容,内容为空时返回 None
+        """
+        content_html = render_content_html(content)
+        if content_html:
+            image_meta = ImageService.image_meta(db, content_image_urls(content_html))
+            content_html = annotate_images(content_html, image_meta)
+        return content_html
+    
+    @staticmethod
+    def rerender_image_owners(db: Session, url: str) -> int:
+        """
+        重新生成引用了某张图片的赛事内容 HTML
+        
+        图片尺寸和占位图由后台任务写入,任务完成前保存的赛事没有这些信息,
+        写入处理结果后调用。直接执行 SQL,不触发 updated_at 自动更新;
+        期间内容被再次修改的赛事跳过,保存时已按最新内容渲染
+        
+        Args:
+            db: 数据库会话
+            url: 图片URL
+            
+        Returns:
+            重新渲染的赛事数
+        """
+        rows = db.execute(
+            select(Event.id, Event.content)
+            .join(ImageReference, ImageReference.owner_id == Event.id)
+            .where(ImageReference.owner_type == "event", ImageReference.url == url)
+        ).all()
+        if not rows:
+            return 0
+        db.execute(
+            text(
+                "UPDATE events SET content_html = :content_html, "
+                "content_render_version = :version WHERE id = :id AND content = :content"
+            ),
+            [
+                {
+                    "id": row.id,
+                    "content": row.content,
+                    "content_html": EventService.render_content(db, row.content),
+                    "version": RENDER_VERSION
+                }
+                for row in rows
+            ]
+        )
+        db.commit()
+        return len(rows)
+    
     @staticmethod
     def create_event(db: Session, event_data: EventCreate) -> Event:
         """
@@ -84,6 +328,8 @@ class EventService:
             创建的赛事对象
         """
         event = Event(**event_data.model_dump())
+        event.content_html = EventService.render_content(db, event.content)
+        event.content_render_version = RENDER_VERSION
         db.add(event)
         db.commit()
         db.refresh(event)
@@ -112,6 +358,11 @@ class EventService:
         for field, value in update_data.items():
             setattr(event, field, value)
         
+        # 内容变化时重新生成预渲染的 HTML
+        if 'content' in update_data:
+            event.content_html = EventService.render_content(db, event.content)
+            event.content_render_version = RENDER_VERSION
+        
         db.commit()
         db.refresh(event)
         return event
@@ -133,22 +384,106 @@ class EventService:
         db.commit()
     
     @staticmethod
-    def increase_view_count(db: Session, event_id: int) -> Event:
+    def increase_view_count(db: Session, event_id: int, viewer_id: Optional[str] = None) -> Event:
         """
         增加赛事浏览量
         
+        增量先写入内存缓冲,由后台任务批量写回数据库,
+        返回的赛事对象中 view_count 为数据库中的值,展示时需加上 pending_views
+        
         Args:
             db: 数据库会话
             event_id: 赛事ID
+            viewer_id: 访客标识,提供时计入独立访客
             
         Returns:
-            更新后的赛事对象
+            赛事对象
             
         Raises:
             NotFoundException: 赛事不存在
         """
         event = EventService.get_event_by_id(db, event_id)
-        event.view_count += 1
-        db.commit()
-        db.refresh(event)
+        view_count_buffer.record(event.id)
+        if viewer_id:
+            unique_viewer_tracker.record(event.id, viewer_id)
         return event
+    
+    @staticmethod
+    def record_views(db: Session, event_ids: List[int], viewer_id: Optional[str] = None) -> int:
+        """
+        批量记录浏览量
+        
+        只做一次 ID 存在性查询,增量写入内存缓冲,不存在的赛事ID被忽略
+        
+        Args:
+            db: 数据库会话
+            event_ids: 浏览的赛事ID列表
+            viewer_id: 访客标识,提供时计入独立访客
+            
+        Returns:
+            记录的浏览次数
+        """
+        existing = set(db.scalars(select(Event.id).where(Event.id.in_(set(event_ids)))))
+        
+        counts: Dict[int, int] = {}
+        for event_id in event_ids:
+            if event_id in existing:
+                counts[event_id] = counts.get(event_id, 0) + 1
+        
+        recorded = 0
+        for event_id, count in counts.items():
+            if view_count_buffer.record(event_id, count):
+                recorded += count
+            if viewer_id:
+                unique_viewer_tracker.record(event_id, viewer_id)
+        return recorded
+    
+    @staticmethod
+    def pending_views(event_id: int) -> int:
+        """
+        获取尚未写回数据库的浏览量增量
+        
+        Args:
+            event_id: 赛事ID
+            
+        Returns:
+            缓冲中的浏览量增量
+        """
+        return view_count_buffer.pending(event_id)
+
+
+# 赛事增删或标题、内容变化时,在事务提交后使计数缓存失效。
+# 只在 flush 时标记会话,提交后才清空缓存,避免其他请求在提交前把旧计数写回缓存
+
+def _mark_counts_dirty(target: Event) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info["event_counts_dirty"] = True
+
+
+@sa_event.listens_for(Event, "after_insert")
+def _count_after_insert(mapper, connection, target: Event) -> None:
+    _mark_counts_dirty(target)
+
+
+@sa_event.listens_for(Event, "after_update")
+def _count_after_update(mapper, connection, target: Event) -> None:
+    state = inspect(target)
+    if state.attrs.title.history.has_changes() or state.attrs.content.history.has_changes():
+        _mark_counts_dirty(target)
+
+
+@sa_event.listens_for(Event, "after_delete")
+def _count_after_delete(mapper, connection, target: Event) -> None:
+    _mark_counts_dirty(target)
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _invalidate_counts_after_commit(session: Session) -> None:
+    if session.info.pop("event_counts_dirty", False):
+        EventService.count_cache.invalidate()
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _discard_counts_after_rollback(session: Session) -> None:
+    session.info.pop("event_counts_dirty", None)
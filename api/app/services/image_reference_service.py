@@ -0,0 +1,264 @@
+# 图片引用和未使用文件清理服务
+import os
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy import delete, event as sa_event, inspect, insert, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.models.banner import Banner
+from app.models.customer_service import CustomerService
+from app.models.event import Event
+from app.models.image_reference import ImageReference
+from app.models.upload_session import UploadSession
+from app.models.uploaded_image import UploadedImage
+from app.services.chunked_upload_service import session_path
+from app.utils.static_files import webp_sibling
+
+# 文本中的上传文件路径(Markdown 图片、HTML 标签或完整URL中的 /uploads/ 部分)
+_UPLOAD_URL = re.compile(r"/uploads/[^\s\"'()<>\[\]?#\\]+")
+
+# 引用上传文件的模型: 引用方类型 -> (模型, 可能包含上传文件URL的字段)
+REFERENCE_OWNERS = {
+    "event": (Event, ("content", "cover_image")),
+    "banner": (Banner, ("image_url",)),
+    "customer_service": (CustomerService, ("qr_code_url",)),
+}
+
+# 内容哈希的两级目录名(ab/cd),清理后为空时删除
+_FANOUT_DIR = re.compile(r"^[0-9a-f]{2}$")
+
+
+def upload_urls(texts: Iterable[Optional[str]]) -> Set[str]:
+    """
+    提取文本中引用的上传文件URL
+
+    宁多勿少: 正文里以链接或 HTML 形式出现的上传文件也算引用,避免被误删
+
+    Args:
+        texts: Markdown 正文、图片URL等
+
+    Returns:
+        /uploads/ 开头的URL集合
+    """
+    urls = set()
+    for text in texts:
+        if text:
+            urls.update(_UPLOAD_URL.findall(text))
+    return urls
+
+
+class ImageReferenceService:
+    """
+    图片引用服务
+
+    赛事、轮播图和客服配置写入数据库时(同一事务内)解析其中的上传文件URL,
+    更新 image_references 表;清理未使用的图片时按此表批量查找
+    """
+
+    @staticmethod
+    def sync(connection: Connection, owner_type: str, owner_id: int, urls: Set[str]) -> None:
+        """
+        把某个引用方的引用更新为 urls
+
+        Args:
+            connection: 数据库连接(与业务数据同一事务)
+            owner_type: 引用方类型
+            owner_id: 引用方ID
+            urls: 当前引用的URL
+        """
+        table = ImageReference.__table__
+        owner = (table.c.owner_type == owner_type) & (table.c.owner_id == owner_id)
+        existing = set(connection.execute(select(table.c.url).where(owner)).scalars())
+        stale = existing - urls
+        added = urls - existing
+        if stale:
+            connection.execute(delete(table).where(owner, table.c.url.in_(stale)))
+        if added:
+            now = datetime.utcnow()
+            connection.execute(insert(table), [
+                {"url": url, "owner_type": owner_type, "owner_id": owner_id, "created_at": now}
+                for url in sorted(added)
+            ])
+
+    @staticmethod
+    def rebuild(connection: Connection) -> int:
+        """
+        按现有数据重建全部引用
+
+        Returns:
+            引用记录数
+        """
+        table = ImageReference.__table__
+        connection.execute(delete(table))
+        now = datetime.utcnow()
+        rows = []
+        for owner_type, (model, fields) in REFERENCE_OWNERS.items():
+            columns = [getattr(model, field) for field in fields]
+            for owner_id, *texts in connection.execute(select(model.id, *columns)):
+                rows.extend(
+                    {"url": url, "owner_type": owner_type, "owner_id": owner_id, "created_at": now}
+                    for url in sorted(upload_urls(texts))
+                )
+        if rows:
+            connection.execute(insert(table), rows)
+        return len(rows)
+
+    @staticmethod
+    def ensure_index(engine: Engine) -> Optional[int]:
+        """
+        旧数据库首次启用时回填引用表
+
+        引用表为空而已有赛事、轮播图或客服配置时重建
+
+        Returns:
+            回填的引用记录数,无需回填时返回 None
+        """
+        with engine.begin() as conn:
+            if conn.execute(select(ImageReference.id).limit(1)).first() is not None:
+                return None
+            has_owners = any(
+                conn.execute(select(model.id).limit(1)).first() is not None
+                for model, _ in REFERENCE_OWNERS.values()
+            )
+            if not has_owners:
+                return None
+            return ImageReferenceService.rebuild(conn)
+
+    @staticmethod
+    def is_referenced(db: Session, url: str) -> bool:
+        """判断上传文件是否被赛事、轮播图或客服配置引用"""
+        return db.query(ImageReference.id).filter(ImageReference.url == url).first() is not None
+
+    @staticmethod
+    def collect_garbage(
+        db: Session,
+        upload_dir: Path,
+        grace_seconds: float = 24 * 3600,
+        batch_size: int = 500,
+        dry_run: bool = False
+    ) -> Dict[str, int]:
+        """
+        清理未被引用的图片记录和文件
+
+        1. 分批扫描 uploaded_images,原图和缩略图都未被引用的记录按批删除
+        2. 遍历上传目录,删除不属于保留记录、也未被直接引用的文件
+           (包括缩略图、WebP 版本和中断上传留下的临时文件)
+        3. 删除清理后为空的内容哈希目录
+
+        最近 grace_seconds 内上传或修改的记录和文件不清理,
+        避免删除刚上传、还没保存到赛事中的图片
+
+        Args:
+            db: 数据库会话
+            upload_dir: 上传根目录
+            grace_seconds: 保护期(秒)
+            batch_size: 每批删除的记录数
+            dry_run: 只统计不删除
+
+        Returns:
+            {"rows": 删除的记录数, "files": 删除的文件数, "bytes": 释放的字节数}
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        referenced = set(db.execute(select(ImageReference.url).distinct()).scalars())
+        result = {"rows": 0, "files": 0, "bytes": 0}
+
+        # 1. 未被引用的图片记录
+        keep = set(referenced)
+        last_id = 0
+        while True:
+            batch = db.execute(
+                select(UploadedImage.id, UploadedImage.url, UploadedImage.variants, UploadedImage.created_at)
+                .where(UploadedImage.id > last_id)
+                .order_by(UploadedImage.id)
+                .limit(batch_size)
+            ).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+            orphan_ids = []
+            for image_id, url, variants, created_at in batch:
+                urls = {url, *(variants or {}).values()}
+                if urls & referenced or created_at > cutoff:
+                    keep |= urls
+                else:
+                    orphan_ids.append(image_id)
+            if orphan_ids and not dry_run:
+                db.execute(delete(UploadedImage).where(UploadedImage.id.in_(orphan_ids)))
+                db.commit()
+            result["rows"] += len(orphan_ids)
+
+        # 2. 磁盘上未使用的文件(进行中的分块上传文件由会话过期清理)
+        keep |= {sibling for sibling in map(webp_sibling, keep) if sibling}
+        keep |= {
+            f"/{session_path(upload_dir, upload_id).as_posix()}"
+            for upload_id in db.execute(select(UploadSession.id)).scalars()
+        }
+        cutoff_timestamp = (cutoff - datetime(1970, 1, 1)).total_seconds()
+        for root, dirs, files in os.walk(upload_dir, topdown=False):
+            for name in files:
+                path = Path(root) / name
+                if f"/{path.as_posix()}" in keep:
+                    continue
+                stat_result = path.stat()
+                if stat_result.st_mtime > cutoff_timestamp:
+                    continue
+                if not dry_run:
+                    path.unlink()
+                result["files"] += 1
+                result["bytes"] += stat_result.st_size
+
+            # 3. 空的内容哈希目录
+            directory = Path(root)
+            if not dry_run and _FANOUT_DIR.match(directory.name) and not any(directory.iterdir()):
+                directory.rmdir()
+
+        return result
+
+    @staticmethod
+    def disk_usage(upload_dir: Path) -> Dict[str, int]:
+        """
+        统计上传目录下各一级目录占用的字节数
+
+        Returns:
+            {目录名: 字节数},内容哈希目录合计为 "*",直接位于上传根目录下的文件计入 "."
+        """
+        usage: Dict[str, int] = {}
+        for root, _, files in os.walk(upload_dir):
+            relative = Path(root).relative_to(upload_dir)
+            top = relative.parts[0] if relative.parts else "."
+            if _FANOUT_DIR.match(top):
+                top = "*"
+            usage[top] = usage.get(top, 0) + sum((Path(root) / name).stat().st_size for name in files)
+        return usage
+
+
+def _listen(owner_type: str, model, fields) -> None:
+    """为引用方模型注册写入时更新引用的事件"""
+    columns = [getattr(model, field) for field in fields]
+
+    def sync(connection: Connection, owner_id: int) -> None:
+        # 从本事务中刚写入的行读取,部分字段未加载(如列表查询只加载了部分列)时也能拿到完整内容
+        texts = connection.execute(select(*columns).where(model.id == owner_id)).first() or ()
+        ImageReferenceService.sync(connection, owner_type, owner_id, upload_urls(texts))
+
+    @sa_event.listens_for(model, "after_insert")
+    def _after_insert(mapper, connection, target) -> None:
+        sync(connection, target.id)
+
+    @sa_event.listens_for(model, "after_update")
+    def _after_update(mapper, connection, target) -> None:
+        state = inspect(target)
+        if any(state.attrs[field].history.has_changes() for field in fields):
+            sync(connection, target.id)
+
+    @sa_event.listens_for(model, "after_delete")
+    def _after_delete(mapper, connection, target) -> None:
+        ImageReferenceService.sync(connection, owner_type, target.id, set())
+
+
+for _owner_type, (_model, _fields) in REFERENCE_OWNERS.items():
+    _listen(_owner_type, _model, _fields)
@@ -0,0 +1,270 @@
+# 图片处理服务
+import asyncio
+import base64
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.uploaded_image import UploadedImage
+from app.utils.static_files import webp_sibling
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # 未安装 Pillow 时不处理图片
+    Image = None
+
+# 缩略图宽度(像素),从环境变量读取,逗号分隔
+VARIANT_WIDTHS: Tuple[int, ...] = tuple(sorted(
+    int(width) for width in os.getenv("IMAGE_VARIANT_WIDTHS", "160,320,640,1280").split(",") if width.strip()
+))
+# 列表封面默认使用的宽度
+COVER_WIDTH = int(os.getenv("EVENT_COVER_WIDTH", "320"))
+# JPEG 缩略图质量
+VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", "85"))
+# WebP 质量
+WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+# 占位图的最大边长(像素)
+PLACEHOLDER_SIZE = 16
+# 处理图片的进程数
+VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", "2"))
+
+
+def _save_atomic(img, path: str, fmt: str, **params) -> int:
+    """先写临时文件再重命名,返回文件大小"""
+    directory, filename = os.path.split(path)
+    tmp_path = os.path.join(directory, f".{filename}.part")
+    img.save(tmp_path, format=fmt, **params)
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+def _save_webp(img, path: str, reference_size: int, lossless: bool) -> None:
+    """保存 WebP 版本,不比原格式小时不保留"""
+    directory, filename = os.path.split(path)
+    tmp_path = os.path.join(directory, f".{filename}.part")
+    img.save(tmp_path, format="WEBP", quality=WEBP_QUALITY, lossless=lossless)
+    if os.path.getsize(tmp_path) < reference_size:
+        os.replace(tmp_path, path)
+    else:
+        os.unlink(tmp_path)
+
+
+def _has_transparency(img) -> bool:
+    """图片是否有透明像素"""
+    return img.mode in ("RGBA", "LA") and img.getchannel("A").getextrema()[0] < 255
+
+
+def _dominant_color(img) -> str:
+    """把缩小后的图片量化为少量颜色,返回占比最多的颜色(#rrggbb)"""
+    small = img.convert("RGB")
+    small.thumbnail((64, 64))
+    quantized = small.quantize(colors=5)
+    _, index = max(quantized.getcolors())
+    r, g, b = quantized.getpalette()[index * 3:index * 3 + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def _placeholder(img) -> str:
+    """生成极小的低质量预览图(LQIP),以 data URI 返回"""
+    tiny = img.convert("RGB")
+    tiny.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    # 这个尺寸下 JPEG 的文件头比像素数据还大,PNG 更小且所有客户端都能解码
+    buffer = io.BytesIO()
+    tiny.save(buffer, format="PNG", optimize=True)
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def process_image(source: str, out_dir: str, widths: Tuple[int, ...]) -> dict:
+    """
+    提取图片信息并生成缩略图和 WebP 版本(在子进程中执行)
+
+    原图和每个缩略图旁边各生成一个同名的 .webp 文件,只在比原格式小时保留,
+    由 UploadStaticFiles 按 Accept 请求头选择返回。JPEG 有损编码,
+    PNG/GIF 无损编码,避免文字和线条图变糊。
+    缩略图从大到小依次缩放,每一档以上一档的结果为输入,
+    主色和占位图取自最小的一档。
+    不放大图片:宽度不小于原图的档位跳过;动图只提取尺寸,不做其他处理。
+    有透明像素的图片不生成主色和占位图,避免透过图片显示出来
+
+    Args:
+        source: 原图路径
+        out_dir: 缩略图保存目录
+        widths: 缩略图宽度
+
+    Returns:
+        {"width", "height", "dominant_color", "placeholder", "variants": {宽度: 缩略图文件名}}
+    """
+    stem, ext = os.path.splitext(os.path.basename(source))
+    make_webp = webp_sibling(source) is not None
+    lossless = ext.lower() in (".png", ".gif")
+    info = {"width": None, "height": None, "dominant_color": None, "placeholder": None, "variants": {}}
+    with Image.open(source) as original:
+        if getattr(original, "is_animated", False):
+            info["width"], info["height"] = original.size
+            return info
+        fmt = original.format
+        img = ImageOps.exif_transpose(original)
+        if img.mode == "P":
+            img = img.convert("RGBA")
+        if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        # 尺寸按显示方向记录
+        info["width"], info["height"] = img.size
+        transparent = _has_transparency(img)
+
+        if make_webp:
+            _save_webp(img, webp_sibling(source), os.path.getsize(source), lossless)
+
+        for width in sorted((width for width in widths if width < img.width), reverse=True):
+            height = max(1, round(img.height * width / img.width))
+            img = img.resize((width, height), Image.Resampling.LANCZOS)
+
+            filename = f"{stem}_{width}w{ext}"
+            path = os.path.join(out_dir, filename)
+            size = _save_atomic(img, path, fmt, quality=VARIANT_QUALITY, optimize=True)
+            if make_webp:
+                _save_webp(img, webp_sibling(path), size, lossless)
+            info["variants"][width] = filename
+
+        if not transparent:
+            info["dominant_color"] = _dominant_color(img)
+            info["placeholder"] = _placeholder(img)
+    return info
+
+
+class ProcessedImage(NamedTuple):
+    """图片处理结果"""
+    width: Optional[int]
+    height: Optional[int]
+    dominant_color: Optional[str]
+    placeholder: Optional[str]
+    variants: Optional[Dict[str, str]]  # {宽度: 缩略图URL}
+
+
+class CoverImage(NamedTuple):
+    """列表展示用的封面图"""
+    url: str
+    meta: Optional[dict]  # 尺寸、主色和占位图,没有记录时为 None
+
+
+class ImageService:
+    """
+    图片处理服务
+
+    图片在进程池中处理,不占用事件循环,也不受 GIL 限制
+    """
+
+    _pool: Optional[ProcessPoolExecutor] = None
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """是否可以处理图片(需要安装 Pillow)"""
+        return Image is not None
+
+    @staticmethod
+    def _get_pool() -> ProcessPoolExecutor:
+        """获取进程池,首次使用时创建"""
+        if ImageService._pool is None:
+            ImageService._pool = ProcessPoolExecutor(max_workers=VARIANT_WORKERS)
+        return ImageService._pool
+
+    @staticmethod
+    def shutdown() -> None:
+        """关闭进程池,由应用生命周期调用"""
+        if ImageService._pool is not None:
+            ImageService._pool.shutdown(wait=True, cancel_futures=True)
+            ImageService._pool = None
+
+    @staticmethod
+    async def process(source: Path, out_dir: Path) -> Optional[ProcessedImage]:
+        """
+        提取上传图片的尺寸、主色和占位图,并生成各尺寸缩略图
+
+        处理失败时抛出异常,由后台任务队列重试
+
+        Args:
+            source: 原图路径
+            out_dir: 缩略图保存目录
+
+        Returns:
+            处理结果,未安装 Pillow 时返回 None
+        """
+        if not ImageService.is_enabled():
+            return None
+        loop = asyncio.get_running_loop()
+        info = await loop.run_in_executor(
+            ImageService._get_pool(), process_image, str(source), str(out_dir), VARIANT_WIDTHS
+        )
+        variants = {
+            str(width): f"/{(out_dir / filename).as_posix()}" for width, filename in info["variants"].items()
+        }
+        return ProcessedImage(
+            width=info["width"],
+            height=info["height"],
+            dominant_color=info["dominant_color"],
+            placeholder=info["placeholder"],
+            variants=variants or None
+        )
+
+    @staticmethod
+    def image_meta(db: Session, urls: Iterable[str]) -> Dict[str, dict]:
+        """
+        批量查询图片的尺寸、主色和占位图
+
+        Args:
+            db: 数据库会话
+            urls: 图片URL
+
+        Returns:
+            {URL: 图片信息},没有记录或没有尺寸信息的URL不在结果中
+        """
+        urls = {url for url in urls if url}
+        if not urls:
+            return {}
+        rows = db.query(UploadedImage).filter(
+            UploadedImage.url.in_(urls),
+            UploadedImage.width.isnot(None)
+        )
+        return {image.url: image.meta for image in rows}
+
+    @staticmethod
+    def cover_images(db: Session, urls: Iterable[str], width: int = COVER_WIDTH) -> Dict[str, CoverImage]:
+        """
+        批量查找封面图对应的缩略图和图片信息
+
+        Args:
+            db: 数据库会话
+            urls: 原图URL
+            width: 需要的显示宽度(像素)
+
+        Returns:
+            {原图URL: 封面图},没有上传记录的URL不在结果中
+        """
+        urls = {url for url in urls if url}
+        if not urls:
+            return {}
+        result = {}
+        for image in db.query(UploadedImage).filter(UploadedImage.url.in_(urls)):
+            result[image.url] = CoverImage(
+                url=pick_variant(image.variants, width) or image.url,
+                meta=image.meta if image.width is not None else None
+            )
+        return result
+
+
+def pick_variant(variants: Optional[Dict[str, str]], width: int) -> Optional[str]:
+    """
+    选择不小于指定宽度的最小缩略图
+
+    所有缩略图都比指定宽度小时返回 None,此时应使用原图
+    """
+    if not variants:
+        return None
+    candidates: List[Tuple[int, str]] = sorted(
+        (int(w), url) for w, url in variants.items() if int(w) >= width
+    )
+    return candidates[0][1] if candidates else None
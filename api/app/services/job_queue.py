@@ -0,0 +1,272 @@
+# 后台任务队列服务
+import asyncio
+import logging
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.job import Job
+from app.utils.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# 任务处理函数,参数为任务的 payload
+JobHandler = Callable[[dict], Awaitable[None]]
+
+
+class JobQueue:
+    """
+    持久化的后台任务队列
+
+    任务保存在 jobs 表中,与业务数据在同一事务里登记,应用重启后继续执行。
+    工作协程领取任务时加执行租约,进程异常退出后租约过期的任务会被重新领取;
+    失败的任务按指数退避重试,超过最多次数后标记为 failed。
+    相同幂等键的任务只有一条记录,未完成时重复登记不会产生重复工作
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        poll_interval: float,
+        lease_seconds: float,
+        retry_base: float,
+        retry_max: float
+    ):
+        """
+        Args:
+            workers: 工作协程数量
+            poll_interval: 空闲时检查新任务的间隔(秒),同一进程内登记的任务会立即唤醒
+            lease_seconds: 执行租约时长(秒)
+            retry_base: 首次重试的等待时间(秒),之后每次翻倍
+            retry_max: 重试等待时间上限(秒)
+        """
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self._handlers: Dict[str, JobHandler] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """
+        注册任务处理函数
+
+        Args:
+            kind: 任务类型
+            handler: 处理函数,抛出异常表示失败,会按退避策略重试
+        """
+        self._handlers[kind] = handler
+
+    def enqueue(
+        self,
+        db: Session,
+        kind: str,
+        key: str,
+        payload: Optional[dict] = None,
+        max_attempts: int = 5
+    ) -> Job:
+        """
+        登记任务
+
+        在调用方的事务中执行,调用方提交后再调用 notify() 唤醒工作协程。
+        相同键的任务未完成时保持不变;已完成或已失败时重新排队
+
+        Args:
+            db: 数据库会话
+            kind: 任务类型
+            key: 幂等键
+            payload: 任务参数
+            max_attempts: 最多执行次数
+
+        Returns:
+            任务记录
+        """
+        now = datetime.utcnow()
+        insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        stmt = insert(Job).values(
+            kind=kind,
+            key=key,
+            payload=payload,
+            status=Job.PENDING,
+            attempts=0,
+            max_attempts=max_attempts,
+            run_at=now,
+            created_at=now,
+            updated_at=now
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Job.key],
+            set_={
+                "payload": stmt.excluded.payload,
+                "status": Job.PENDING,
+                "attempts": 0,
+                "max_attempts": max_attempts,
+                "run_at": now,
+                "locked_until": None,
+                "last_error": None,
+                "updated_at": now
+            },
+            where=Job.status.in_((Job.DONE, Job.FAILED))
+        )
+        db.execute(stmt)
+        return db.query(Job).populate_existing().filter(Job.key == key).one()
+
+    def notify(self) -> None:
+        """唤醒空闲的工作协程(可在任意线程调用)"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _ready(self, now: datetime):
+        """可领取的任务: 到期的待执行任务,以及租约已过期的执行中任务"""
+        return or_(
+            and_(Job.status == Job.PENDING, Job.run_at <= now),
+            and_(Job.status == Job.RUNNING, Job.locked_until < now)
+        )
+
+    def _claim(self):
+        """
+        领取一个任务
+
+        先查询候选任务,再用带条件的 UPDATE 抢占,
+        多个工作协程或进程同时领取时只有一个会成功
+
+        Returns:
+            (任务ID, 类型, 参数),没有可执行的任务时返回 None
+        """
+        db = SessionLocal()
+        try:
+            while True:
+                now = datetime.utcnow()
+                job = db.execute(
+                    select(Job.id, Job.kind, Job.payload)
+                    .where(self._ready(now))
+                    .order_by(Job.run_at)
+                    .limit(1)
+                ).first()
+                if job is None:
+                    return None
+                claimed = db.execute(
+                    update(Job)
+                    .where(Job.id == job.id, self._ready(now))
+                    .values(
+                        status=Job.RUNNING,
+                        attempts=Job.attempts + 1,
+                        locked_until=now + timedelta(seconds=self.lease_seconds),
+                        updated_at=now
+                    )
+                ).rowcount
+                db.commit()
+                if claimed:
+                    return job
+        finally:
+            db.close()
+
+    def _finish(self, job_id: int, error: Optional[str]) -> None:
+        """记录执行结果,失败时安排重试或标记为 failed"""
+        db = SessionLocal()
+        try:
+            job = db.get(Job, job_id)
+            if job is None:
+                return
+            job.locked_until = None
+            job.last_error = error
+            if error is None:
+                job.status = Job.DONE
+            elif job.attempts >= job.max_attempts:
+                job.status = Job.FAILED
+            else:
+                job.status = Job.PENDING
+                job.run_at = datetime.utcnow() + timedelta(seconds=self._backoff(job.attempts))
+            db.commit()
+        finally:
+            db.close()
+
+    def _release(self, job_id: int) -> None:
+        """应用关闭时放回正在执行的任务,不计入执行次数"""
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == Job.RUNNING)
+                .values(status=Job.PENDING, attempts=Job.attempts - 1, locked_until=None)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _backoff(self, attempts: int) -> float:
+        """第 attempts 次失败后的等待时间(秒),带随机抖动"""
+        delay = min(self.retry_base * 2 ** (attempts - 1), self.retry_max)
+        return delay * random.uniform(0.8, 1.2)
+
+    async def _execute(self, job) -> None:
+        """执行一个已领取的任务"""
+        handler = self._handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise LookupError(f"未注册的任务类型: {job.kind}")
+            await handler(job.payload or {})
+        except asyncio.CancelledError:
+            self._release(job.id)
+            raise
+        except Exception as e:
+            logger.warning(f"后台任务 {job.id} ({job.kind}) 执行失败: {e}")
+            await asyncio.to_thread(self._finish, job.id, f"{type(e).__name__}: {e}")
+        else:
+            await asyncio.to_thread(self._finish, job.id, None)
+
+    async def _worker(self) -> None:
+        """
+        工作协程: 循环领取并执行任务
+
+        领取或记录结果时的数据库错误(如 SQLite 的 database is locked)不会终止协程,
+        记录日志后按退避等待再继续;未能记录结果的任务在租约过期后被重新领取
+        """
+        failures = 0
+        while True:
+            try:
+                # 先清除唤醒标记再领取,领取期间登记的任务不会被错过
+                self._wakeup.clear()
+                job = await asyncio.to_thread(self._claim)
+                failures = 0
+                if job is not None:
+                    await self._execute(job)
+                    continue
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                failures += 1
+                logger.exception(f"后台任务工作协程出错(连续 {failures} 次),稍后重试")
+                await asyncio.sleep(self._backoff(failures))
+
+    async def run(self) -> None:
+        """启动工作协程,由应用生命周期启动"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            await asyncio.gather(*(self._worker() for _ in range(self.workers)))
+        finally:
+            self._loop = None
+            self._wakeup = None
+
+
+# 全局任务队列 (参数从环境变量读取)
+job_queue = JobQueue(
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    poll_interval=float(os.getenv("JOB_POLL_INTERVAL", "2")),
+    lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "300")),
+    retry_base=float(os.getenv("JOB_RETRY_BASE", "5")),
+    retry_max=float(os.getenv("JOB_RETRY_MAX", "600"))
+)
@@ -0,0 +1,147 @@
+# 最后登录时间写回缓冲服务
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import DateTime, bindparam, text
+
+from app.utils.database import engine
+
+logger = logging.getLogger(__name__)
+
+
+class LastLoginBuffer:
+    """
+    最后登录时间写回缓冲
+
+    登录时只在内存中记录时间,由后台任务定期合并为一条
+    UPDATE users SET last_login_at = ? WHERE id = ? 的 executemany 批量写入,
+    每个周期只占用一次数据库写锁。同一用户在 min_interval 秒内的多次登录
+    只记录第一次,最后登录时间的精度以此为准
+    """
+
+    def __init__(self, flush_interval: float, min_interval: float, max_pending_users: int):
+        """
+        Args:
+            flush_interval: 写回间隔(秒)
+            min_interval: 同一用户两次记录的最小间隔(秒)
+            max_pending_users: 缓冲中最多容纳的用户数量,超出后新用户的登录时间被丢弃
+        """
+        self.flush_interval = flush_interval
+        self.min_interval = min_interval
+        self.max_pending_users = max_pending_users
+        self._pending: Dict[int, datetime] = {}
+        # 用户最近一次被记录的时间(time.monotonic()),用于跳过间隔内的重复登录
+        self._recorded: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.flushed_total = 0
+        self.skipped_total = 0
+        self.dropped_total = 0
+
+    def record(self, user_id: int, login_at: datetime) -> bool:
+        """
+        记录一次登录
+
+        Args:
+            user_id: 用户ID
+            login_at: 登录时间
+
+        Returns:
+            是否需要写回(间隔内的重复登录和缓冲已满时返回 False)
+        """
+        now = time.monotonic()
+        with self._lock:
+            recorded = self._recorded.get(user_id)
+            if recorded is not None and now - recorded < self.min_interval:
+                self.skipped_total += 1
+                return False
+            if user_id not in self._pending and len(self._pending) >= self.max_pending_users:
+                self.dropped_total += 1
+                return False
+            self._pending[user_id] = login_at
+            self._recorded[user_id] = now
+            return True
+
+    def pending(self, user_id: int) -> Optional[datetime]:
+        """返回用户尚未写入数据库的登录时间"""
+        with self._lock:
+            return self._pending.get(user_id)
+
+    def stats(self) -> dict:
+        """返回缓冲统计信息"""
+        with self._lock:
+            return {
+                "pending_users": len(self._pending),
+                "flushed_logins": self.flushed_total,
+                "skipped_logins": self.skipped_total,
+                "dropped_logins": self.dropped_total,
+            }
+
+    def flush(self) -> int:
+        """
+        将缓冲中的登录时间批量写入数据库
+
+        只写入比数据库中更晚的时间;写入失败时登录时间回到缓冲,等待下次写回
+
+        Returns:
+            本次写入的用户数
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                # 间隔已过的用户不再需要记录,避免长期运行时无限增长
+                cutoff = time.monotonic() - self.min_interval
+                self._recorded = {
+                    user_id: recorded for user_id, recorded in self._recorded.items() if recorded > cutoff
+                }
+            if not batch:
+                return 0
+
+            params = [{"user_id": user_id, "login_at": login_at} for user_id, login_at in batch.items()]
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text(
+                            "UPDATE users SET last_login_at = :login_at "
+                            "WHERE id = :user_id AND last_login_at < :login_at"
+                        ).bindparams(bindparam("login_at", type_=DateTime)),
+                        params
+                    )
+            except Exception as e:
+                logger.error(f"最后登录时间写回失败,将在下次重试: {e}")
+                self._restore(batch)
+                return 0
+
+            with self._lock:
+                self.flushed_total += len(batch)
+            return len(batch)
+
+    def _restore(self, batch: Dict[int, datetime]) -> None:
+        """写回失败时把登录时间放回缓冲(缓冲中已有更新的时间时保留新的)"""
+        with self._lock:
+            for user_id, login_at in batch.items():
+                if user_id in self._pending:
+                    continue
+                if len(self._pending) >= self.max_pending_users:
+                    self.dropped_total += 1
+                    continue
+                self._pending[user_id] = login_at
+
+    async def run(self) -> None:
+        """后台定期写回,由应用生命周期启动"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await asyncio.to_thread(self.flush)
+
+
+# 全局最后登录时间缓冲 (参数从环境变量读取)
+last_login_buffer = LastLoginBuffer(
+    flush_interval=float(os.getenv("LAST_LOGIN_FLUSH_INTERVAL", "5")),
+    min_interval=float(os.getenv("LAST_LOGIN_MIN_INTERVAL", "300")),
+    max_pending_users=int(os.getenv("LAST_LOGIN_MAX_PENDING", "100000"))
+)
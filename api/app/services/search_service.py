@@ -0,0 +1,323 @@
+# 赛事全文搜索服务
+import html
+import logging
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Integer, column, event as sa_event, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+
+from app.models.event import Event
+
+logger = logging.getLogger(__name__)
+
+# FTS5 虚拟表名
+FTS_TABLE = "events_fts"
+
+# 中日韩统一表意文字(含扩展A区和兼容区)
+_CJK_RUN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+
+# 非 CJK 的词(与 unicode61 分词器的切分方式保持一致)
+_WORD = re.compile(r"[^\W_]+")
+
+# 摘要窗口大小(字符数)
+SNIPPET_RADIUS = 40
+
+
+def _bigrams(run: str) -> List[str]:
+    """将一段连续的中文切分为重叠的二元组"""
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize_for_index(value: Optional[str]) -> str:
+    """
+    将文本转换为写入 FTS 表的形式
+
+    中文按二元组切分,每段中文末尾额外补一个单字,
+    使单字前缀查询也能命中位于段尾的字;其余文本原样交给 unicode61 分词
+
+    Args:
+        value: 原始文本
+
+    Returns:
+        以空格分隔的分词结果
+    """
+    if not value:
+        return ""
+
+    def replace(match: re.Match) -> str:
+        run = match.group(0)
+        tokens = _bigrams(run)
+        if len(run) > 1:
+            tokens.append(run[-1])
+        return " " + " ".join(tokens) + " "
+
+    return _CJK_RUN.sub(replace, value)
+
+
+def _tokenize_term(term: str) -> List[str]:
+    """将单个查询词切分为与索引一致的词元序列"""
+    tokens: List[str] = []
+    pos = 0
+    for match in _CJK_RUN.finditer(term):
+        tokens.extend(_WORD.findall(term[pos:match.start()]))
+        tokens.extend(_bigrams(match.group(0)))
+        pos = match.end()
+    tokens.extend(_WORD.findall(term[pos:]))
+    return tokens
+
+
+def build_match_query(keyword: Optional[str]) -> Optional[str]:
+    """
+    将搜索关键词转换为 FTS5 MATCH 表达式
+
+    每个以空格分隔的词转换为一个短语(相邻二元组必须连续出现,等价于子串匹配),
+    最后一个词元按前缀匹配,多个词之间为 AND 关系
+
+    Args:
+        keyword: 用户输入的关键词
+
+    Returns:
+        MATCH 表达式,关键词中没有可索引的内容时返回 None
+    """
+    if not keyword:
+        return None
+
+    phrases = []
+    for term in keyword.split():
+        tokens = _tokenize_term(term)
+        if tokens:
+            phrase = " ".join(tokens).replace('"', '""')
+            phrases.append(f'"{phrase}" *')
+
+    return " AND ".join(phrases) if phrases else None
+
+
+def highlight(value: Optional[str], keyword: str, radius: Optional[int] = None) -> str:
+    """
+    生成带 <em> 高亮标记的文本片段
+
+    Args:
+        value: 原始文本
+        keyword: 搜索关键词
+        radius: 摘要半径,为空时返回全文
+
+    Returns:
+        HTML 转义后并高亮关键词的文本
+    """
+    if not value:
+        return ""
+
+    terms = [re.escape(term) for term in keyword.split() if term]
+    pattern = re.compile("|".join(terms), re.IGNORECASE) if terms else None
+
+    start, end = 0, len(value)
+    if radius is not None:
+        first = pattern.search(value) if pattern else None
+        center = first.start() if first else 0
+        start = max(0, center - radius)
+        end = min(len(value), center + radius)
+
+    fragment = value[start:end]
+    if pattern is None:
+        result = html.escape(fragment)
+    else:
+        parts = []
+        pos = 0
+        for match in pattern.finditer(fragment):
+            parts.append(html.escape(fragment[pos:match.start()]))
+            parts.append(f"<em>{html.escape(match.group(0))}</em>")
+            pos = match.end()
+        parts.append(html.escape(fragment[pos:]))
+        result = "".join(parts)
+
+    if start > 0:
+        result = "…" + result
+    if end < len(value):
+        result = result + "…"
+    return result
+
+
+class SearchService:
+    """赛事全文搜索服务类"""
+
+    # 是否启用 FTS 索引(None 表示尚未检测)
+    _enabled: Optional[bool] = None
+
+    @staticmethod
+    def ensure_index(engine: Engine) -> bool:
+        """
+        确保 FTS5 索引表存在
+
+        新建索引表时会自动从 events 表回填数据。
+        非 SQLite 数据库或 SQLite 未编译 FTS5 时禁用索引,搜索回退为 LIKE
+
+        Args:
+            engine: 数据库引擎
+
+        Returns:
+            是否启用了 FTS 索引
+        """
+        if engine.dialect.name != "sqlite":
+            SearchService._enabled = False
+            return False
+
+        try:
+            with engine.begin() as conn:
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {"name": FTS_TABLE}
+                ).first()
+                if not exists:
+                    conn.execute(text(
+                        f"CREATE VIRTUAL TABLE {FTS_TABLE} "
+                        "USING fts5(title, content, tokenize = 'unicode61')"
+                    ))
+                    SearchService._rebuild(conn)
+        except OperationalError as e:
+            logger.warning(f"FTS5 不可用,关键词搜索将使用 LIKE: {e}")
+            SearchService._enabled = False
+            return False
+
+        SearchService._enabled = True
+        return True
+
+    @staticmethod
+    def is_enabled(conn: Connection) -> bool:
+        """检测当前数据库是否存在 FTS 索引表(结果按进程缓存)"""
+        if SearchService._enabled is None:
+            if conn.dialect.name != "sqlite":
+                SearchService._enabled = False
+            else:
+                SearchService._enabled = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {"name": FTS_TABLE}
+                ).first() is not None
+        return SearchService._enabled
+
+    @staticmethod
+    def rebuild(engine: Engine) -> int:
+        """
+        重建 FTS 索引
+
+        Args:
+            engine: 数据库引擎
+
+        Returns:
+            写入索引的赛事数量
+        """
+        if not SearchService.ensure_index(engine):
+            return 0
+        with engine.begin() as conn:
+            return SearchService._rebuild(conn)
+
+    @staticmethod
+    def _rebuild(conn: Connection, batch_size: int = 500) -> int:
+        """清空并分批回填 FTS 索引"""
+        conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
+
+        count = 0
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                text("SELECT id, title, content FROM events WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                {"last_id": last_id, "limit": batch_size}
+            ).fetchall()
+            if not rows:
+                break
+            conn.execute(
+                text(f"INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (:id, :title, :content)"),
+                [
+                    {
+                        "id": row.id,
+                        "title": tokenize_for_index(row.title),
+                        "content": tokenize_for_index(row.content)
+                    }
+                    for row in rows
+                ]
+            )
+            count += len(rows)
+            last_id = rows[-1].id
+        return count
+
+    @staticmethod
+    def index_event(conn: Connection, event_id: int, title: Optional[str], content: Optional[str]) -> None:
+        """写入或更新单条赛事的索引"""
+        conn.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": event_id})
+        conn.execute(
+            text(f"INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (:id, :title, :content)"),
+            {"id": event_id, "title": tokenize_for_index(title), "content": tokenize_for_index(content)}
+        )
+
+    @staticmethod
+    def remove_event(conn: Connection, event_id: int) -> None:
+        """删除单条赛事的索引"""
+        conn.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": event_id})
+
+    @staticmethod
+    def match_ids(match_query: str):
+        """返回匹配 MATCH 表达式的赛事 ID 子查询"""
+        return text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match").bindparams(
+            match=match_query
+        ).columns(column("rowid", Integer))
+
+    @staticmethod
+    def search_ranked(
+        conn: Connection,
+        match_query: str,
+        offset: int,
+        limit: int
+    ) -> Tuple[List[int], int]:
+        """
+        按相关度排序搜索
+
+        标题命中的权重高于正文
+
+        Args:
+            conn: 数据库连接
+            match_query: MATCH 表达式
+            offset: 偏移量
+            limit: 数量
+
+        Returns:
+            (按相关度排序的赛事ID列表, 匹配总数)
+        """
+        total = conn.execute(
+            text(f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"),
+            {"match": match_query}
+        ).scalar()
+        rows = conn.execute(
+            text(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match "
+                f"ORDER BY bm25({FTS_TABLE}, 10.0, 1.0) LIMIT :limit OFFSET :offset"
+            ),
+            {"match": match_query, "limit": limit, "offset": offset}
+        ).fetchall()
+        return [row[0] for row in rows], total
+
+
+# 通过 ORM 事件同步索引:EventService、后台 API 路由和 sqladmin 后台
+# 都通过 ORM 写入 events 表,在映射层挂钩即可覆盖全部写入路径
+
+@sa_event.listens_for(Event, "after_insert")
+def _index_after_insert(mapper, connection, target: Event) -> None:
+    if SearchService.is_enabled(connection):
+        SearchService.index_event(connection, target.id, target.title, target.content)
+
+
+@sa_event.listens_for(Event, "after_update")
+def _index_after_update(mapper, connection, target: Event) -> None:
+    if not SearchService.is_enabled(connection):
+        return
+    state = inspect(target)
+    if state.attrs.title.history.has_changes() or state.attrs.content.history.has_changes():
+        SearchService.index_event(connection, target.id, target.title, target.content)
+
+
+@sa_event.listens_for(Event, "after_delete")
+def _index_after_delete(mapper, connection, target: Event) -> None:
+    if SearchService.is_enabled(connection):
+        SearchService.remove_event(connection, target.id)
@@ -0,0 +1,169 @@
+# 独立访客统计服务
+import asyncio
+import logging
+import os
+import threading
+from datetime import date
+from typing import Dict, Tuple
+
+from sqlalchemy import select, text
+
+from app.models.event import Event
+from app.models.event_viewer_sketch import EventViewerSketch
+from app.utils.database import SessionLocal
+from app.utils.hyperloglog import HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+
+class UniqueViewerTracker:
+    """
+    独立访客统计
+
+    每个赛事每天在内存中维护一个 HyperLogLog,定期合并到数据库中的
+    当日数据和累计数据,并把累计估计值写入 events.unique_viewers。
+    无论访问量多大,每个赛事占用的内存都固定为一个寄存器数组
+    """
+
+    def __init__(self, flush_interval: float, max_pending_sketches: int, precision: int = 11):
+        """
+        Args:
+            flush_interval: 写回间隔(秒)
+            max_pending_sketches: 内存中最多容纳的 (赛事, 日期) 数量,超出后新访客被丢弃
+            precision: HyperLogLog 精度
+        """
+        self.flush_interval = flush_interval
+        self.max_pending_sketches = max_pending_sketches
+        self.precision = precision
+        self._pending: Dict[Tuple[int, date], HyperLogLog] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.dropped_total = 0
+
+    def record(self, event_id: int, viewer_id: str) -> bool:
+        """
+        记录一次访问
+
+        Args:
+            event_id: 赛事ID
+            viewer_id: 访客标识(openid 或客户端ID)
+
+        Returns:
+            是否已记录(缓冲已满时丢弃并返回 False)
+        """
+        key = (event_id, date.today())
+        with self._lock:
+            sketch = self._pending.get(key)
+            if sketch is None:
+                if len(self._pending) >= self.max_pending_sketches:
+                    self.dropped_total += 1
+                    return False
+                sketch = self._pending[key] = HyperLogLog(self.precision)
+            sketch.add(viewer_id)
+            return True
+
+    def stats(self) -> dict:
+        """返回统计信息"""
+        with self._lock:
+            return {
+                "pending_sketches": len(self._pending),
+                "dropped_viewers": self.dropped_total,
+            }
+
+    def flush(self) -> int:
+        """
+        将内存中的访客数据合并写入数据库
+
+        Returns:
+            更新了独立访客数的赛事数量
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            db = SessionLocal()
+            try:
+                updated = self._merge(db, batch)
+                db.commit()
+                return updated
+            except Exception as e:
+                db.rollback()
+                logger.error(f"独立访客数据写回失败,将在下次重试: {e}")
+                self._restore(batch)
+                return 0
+            finally:
+                db.close()
+
+    def _merge(self, db, batch: Dict[Tuple[int, date], HyperLogLog]) -> int:
+        """把一批内存数据合并到当日和累计记录中"""
+        event_ids = {event_id for event_id, _ in batch}
+        existing = set(db.scalars(select(Event.id).where(Event.id.in_(event_ids))))
+        periods = {day.isoformat() for _, day in batch} | {EventViewerSketch.ALL_PERIOD}
+
+        rows = {
+            (row.event_id, row.period): row
+            for row in db.query(EventViewerSketch).filter(
+                EventViewerSketch.event_id.in_(existing),
+                EventViewerSketch.period.in_(periods)
+            )
+        }
+        merged: Dict[Tuple[int, str], HyperLogLog] = {
+            key: HyperLogLog.from_bytes(row.registers) for key, row in rows.items()
+        }
+
+        for (event_id, day), sketch in batch.items():
+            # 赛事已被删除
+            if event_id not in existing:
+                continue
+            for period in (day.isoformat(), EventViewerSketch.ALL_PERIOD):
+                key = (event_id, period)
+                if key in merged:
+                    merged[key].merge(sketch)
+                else:
+                    merged[key] = HyperLogLog(self.precision, sketch.registers)
+
+        for (event_id, period), sketch in merged.items():
+            row = rows.get((event_id, period))
+            if row is None:
+                db.add(EventViewerSketch(event_id=event_id, period=period, registers=sketch.to_bytes()))
+            else:
+                row.registers = sketch.to_bytes()
+
+        totals = [
+            {"event_id": event_id, "unique_viewers": sketch.count()}
+            for (event_id, period), sketch in merged.items()
+            if period == EventViewerSketch.ALL_PERIOD
+        ]
+        if totals:
+            db.execute(
+                text("UPDATE events SET unique_viewers = :unique_viewers WHERE id = :event_id"),
+                totals
+            )
+        return len(totals)
+
+    def _restore(self, batch: Dict[Tuple[int, date], HyperLogLog]) -> None:
+        """写回失败时把数据放回内存"""
+        with self._lock:
+            for key, sketch in batch.items():
+                current = self._pending.get(key)
+                if current is not None:
+                    current.merge(sketch)
+                elif len(self._pending) < self.max_pending_sketches:
+                    self._pending[key] = sketch
+                else:
+                    self.dropped_total += 1
+
+    async def run(self) -> None:
+        """后台定期写回,由应用生命周期启动"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await asyncio.to_thread(self.flush)
+
+
+# 全局独立访客统计 (参数从环境变量读取)
+unique_viewer_tracker = UniqueViewerTracker(
+    flush_interval=float(os.getenv("UNIQUE_VIEWER_FLUSH_INTERVAL", "30")),
+    max_pending_sketches=int(os.getenv("UNIQUE_VIEWER_MAX_PENDING", "5000"))
+)
@@ -0,0 +1,436 @@
+# 文件上传服务
+import asyncio
+import hashlib
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.models.job import Job
+from app.models.uploaded_image import UploadedImage
+from app.services.event_service import EventService
+from app.services.image_service import ImageService, ProcessedImage
+from app.services.job_queue import job_queue
+from app.utils.database import SessionLocal
+from app.utils.exceptions import BadRequestException, PayloadTooLargeException
+from app.utils.multipart_stream import MultipartStream
+
+# multipart 边界、字段头和普通字段允许占用的额外字节
+MULTIPART_OVERHEAD = 16 * 1024
+
+# 图片处理任务类型
+IMAGE_PROCESS_JOB = "image.process"
+
+
+class StoredUpload(NamedTuple):
+    """已写入临时文件的上传数据"""
+    path: Path
+    size: int
+    sha256: str
+
+
+class StoredImage(NamedTuple):
+    """保存上传图片的结果"""
+    image: UploadedImage
+    created: bool
+    job: Optional[Job]
+
+
+class BatchItem(NamedTuple):
+    """批量上传中单个文件的结果"""
+    filename: str
+    result: Optional[StoredImage]
+    error: Optional[str]
+
+
+def content_path(upload_dir: Path, sha256: str, ext: str) -> Path:
+    """
+    按内容哈希确定文件保存路径
+
+    前两级目录取哈希的前 4 位,避免单个目录下文件过多
+
+    Args:
+        upload_dir: 上传根目录
+        sha256: 文件内容的 SHA-256
+        ext: 扩展名(含点)
+
+    Returns:
+        形如 uploads/ab/cd/<sha256>.<ext> 的路径
+    """
+    return upload_dir / sha256[:2] / sha256[2:4] / f"{sha256}{ext}"
+
+
+class UploadService:
+    """
+    文件上传服务
+
+    文件按块写入上传目录下的临时文件,边写边计算 SHA-256,
+    超过大小限制立即中止;写完后按内容哈希原子地移动到最终位置,
+    不会留下写了一半的文件。内容相同的图片只保存一份,
+    数据库中只有一条记录,ref_count 记录被上传(引用)的次数
+    """
+
+    @staticmethod
+    def check_content_length(request: Request, max_size: int) -> None:
+        """
+        在读取请求体之前按 Content-Length 拒绝明显过大的请求
+
+        Args:
+            request: 请求对象
+            max_size: 单个文件的最大字节数
+
+        Raises:
+            PayloadTooLargeException: 请求体超过限制
+        """
+        content_length = request.headers.get("content-length")
+        if content_length is None:
+            return
+        try:
+            length = int(content_length)
+        except ValueError:
+            raise BadRequestException("Content-Length 无效")
+        if length > max_size + MULTIPART_OVERHEAD:
+            raise PayloadTooLargeException(UploadService.too_large_message(max_size))
+
+    @staticmethod
+    def too_large_message(max_size: int) -> str:
+        """文件过大时的提示信息"""
+        return f"文件太大。最大允许 {max_size / 1024 / 1024}MB"
+
+    @staticmethod
+    async def save_stream(
+        chunks: AsyncIterator[bytes],
+        upload_dir: Path,
+        max_size: int
+    ) -> StoredUpload:
+        """
+        把数据流保存为上传目录下的临时文件
+
+        Args:
+            chunks: 文件数据块
+            upload_dir: 上传根目录
+            max_size: 最大字节数
+
+        Returns:
+            临时文件路径、大小和 SHA-256,由调用方移动到最终位置或删除
+
+        Raises:
+            PayloadTooLargeException: 文件超过大小限制,临时文件会被删除
+        """
+        # 临时文件与目标在同一文件系统,保证 os.replace 是原子操作
+        tmp = tempfile.NamedTemporaryFile(
+            dir=upload_dir, prefix=".upload-", suffix=".part", delete=False
+        )
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_size:
+                    raise PayloadTooLargeException(UploadService.too_large_message(max_size))
+                digest.update(chunk)
+                await asyncio.to_thread(tmp.write, chunk)
+            await asyncio.to_thread(UploadService._sync_and_close, tmp)
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+        return StoredUpload(path=Path(tmp.name), size=size, sha256=digest.hexdigest())
+
+    @staticmethod
+    def _place(tmp_path: Path, file_path: Path) -> bool:
+        """
+        把临时文件移动到最终位置
+
+        Returns:
+            是否写入了新文件,相同内容已存在时丢弃临时文件并返回 False
+        """
+        if file_path.exists():
+            tmp_path.unlink()
+            return False
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, file_path)
+        return True
+
+    @staticmethod
+    async def store_image(
+        db: Session,
+        chunks: AsyncIterator[bytes],
+        upload_dir: Path,
+        ext: str,
+        type: str,
+        max_size: int
+    ) -> StoredImage:
+        """
+        保存上传的图片
+
+        请求内只写入文件和数据库记录,尺寸、主色和缩略图由后台任务生成,
+        任务与记录在同一事务中登记。内容已存在时返回已有记录并增加引用计数,
+        不再重复保存文件和生成缩略图
+
+        Args:
+            db: 数据库会话
+            chunks: 文件数据块
+            upload_dir: 上传根目录
+            ext: 扩展名(含点)
+            type: 图片类型
+            max_size: 最大字节数
+
+        Returns:
+            图片记录、是否为新图片,以及图片处理任务(无需处理时为 None)
+        """
+        stored = await UploadService.save_stream(chunks, upload_dir, max_size)
+        try:
+            result = UploadService.register(db, stored, upload_dir, ext, type)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        db.refresh(result.image)
+        if result.job is not None:
+            job_queue.notify()
+        return result
+
+    @staticmethod
+    async def store_images(
+        db: Session,
+        upload: MultipartStream,
+        upload_dir: Path,
+        allowed_extensions: Set[str],
+        type: str,
+        max_size: int,
+        max_files: int
+    ) -> List[BatchItem]:
+        """
+        批量保存上传的图片
+
+        按顺序把每个文件流式写入临时文件,全部接收完后在一个事务中登记所有记录。
+        单个文件格式不支持或过大时只记为该文件失败,不影响其他文件
+
+        Args:
+            db: 数据库会话
+            upload: multipart 请求体
+            upload_dir: 上传根目录
+            allowed_extensions: 允许的扩展名
+            type: 图片类型
+            max_size: 单个文件的最大字节数
+            max_files: 最多文件数
+
+        Returns:
+            与上传顺序一致的结果列表
+
+        Raises:
+            BadRequestException: 没有文件或文件数超过限制
+        """
+        items: List[BatchItem] = []
+        pending: List[Tuple[int, StoredUpload, str]] = []
+        try:
+            while (filename := await upload.next_file()) is not None:
+                if len(items) >= max_files:
+                    raise BadRequestException(f"一次最多上传 {max_files} 张图片")
+                ext = Path(filename).suffix.lower()
+                if ext not in allowed_extensions:
+                    items.append(BatchItem(filename=filename, result=None, error="不支持的文件格式"))
+                    continue
+                try:
+                    stored = await UploadService.save_stream(upload.iter_file(), upload_dir, max_size)
+                except PayloadTooLargeException as e:
+                    items.append(BatchItem(filename=filename, result=None, error=e.detail))
+                    continue
+                pending.append((len(items), stored, ext))
+                items.append(BatchItem(filename=filename, result=None, error=None))
+            if not items:
+                raise BadRequestException("请选择要上传的图片文件")
+
+            for index, stored, ext in pending:
+                items[index] = items[index]._replace(
+                    result=UploadService.register(db, stored, upload_dir, ext, type)
+                )
+            db.commit()
+        except BaseException:
+            db.rollback()
+            for _, stored, _ in pending:
+                stored.path.unlink(missing_ok=True)
+            raise
+
+        for item in items:
+            if item.result is not None:
+                db.refresh(item.result.image)
+        if any(item.result is not None and item.result.job is not None for item in items):
+            job_queue.notify()
+        return items
+
+    @staticmethod
+    def register(
+        db: Session,
+        stored: StoredUpload,
+        upload_dir: Path,
+        ext: str,
+        type: str
+    ) -> StoredImage:
+        """
+        把临时文件移动到最终位置并登记图片记录,不提交事务
+
+        记录用 INSERT ... ON CONFLICT 写入,相同内容被并发上传或在同一批中
+        出现多次时只增加引用计数
+
+        Args:
+            db: 数据库会话
+            stored: 已保存的临时文件
+            upload_dir: 上传根目录
+            ext: 扩展名(含点)
+            type: 图片类型
+
+        Returns:
+            图片记录、是否为新图片,以及图片处理任务(无需处理时为 None)
+        """
+        try:
+            image = UploadService.find_by_hash(db, stored.sha256)
+            # 已有记录时沿用其路径,扩展名不同(如 .jpg/.jpeg)的相同内容也只保存一份
+            if image is not None:
+                file_path = Path(image.url.lstrip("/"))
+            else:
+                file_path = content_path(upload_dir, stored.sha256, ext.lower())
+            placed = UploadService._place(stored.path, file_path)
+        finally:
+            if stored.path.exists():
+                stored.path.unlink()
+
+        if image is None:
+            insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+            stmt = insert(UploadedImage).values(
+                filename=file_path.name,
+                url=f"/{file_path.as_posix()}",
+                size=stored.size,
+                type=type,
+                sha256=stored.sha256,
+                ref_count=1,
+                created_at=datetime.utcnow()
+            )
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[UploadedImage.sha256],
+                set_={"ref_count": UploadedImage.ref_count + 1}
+            ))
+        else:
+            db.execute(
+                update(UploadedImage)
+                .where(UploadedImage.id == image.id)
+                .values(ref_count=UploadedImage.ref_count + 1)
+            )
+
+        # SQLite 写事务持有写锁直到提交,ref_count 为 1 说明记录由本次插入
+        image = db.query(UploadedImage).populate_existing().filter(
+            UploadedImage.sha256 == stored.sha256
+        ).one()
+        created = image.ref_count == 1
+        # 新图片,或记录还在但文件被手动删除过,需要(重新)处理图片
+        job = UploadService._enqueue_processing(db, image) if created or placed else None
+        return StoredImage(image=image, created=created, job=job)
+
+    @staticmethod
+    def _enqueue_processing(db: Session, image: UploadedImage) -> Job:
+        """登记图片处理任务,同一内容只有一个任务"""
+        return job_queue.enqueue(
+            db, IMAGE_PROCESS_JOB, f"{IMAGE_PROCESS_JOB}:{image.sha256}", {"image_id": image.id}
+        )
+
+    @staticmethod
+    async def process_image_job(payload: dict) -> None:
+        """
+        执行图片处理任务: 生成缩略图并写入尺寸、主色和占位图
+
+        记录或文件已被删除时直接结束;处理失败抛出异常,由任务队列重试
+
+        Args:
+            payload: 任务参数,包含 image_id
+        """
+        file_path = await asyncio.to_thread(UploadService._image_path, payload["image_id"])
+        if file_path is None:
+            return
+        processed = await ImageService.process(file_path, file_path.parent)
+        if processed is not None:
+            await asyncio.to_thread(UploadService._save_processed, payload["image_id"], processed)
+
+    @staticmethod
+    def _image_path(image_id: int) -> Optional[Path]:
+        """图片记录对应的文件路径,记录或文件不存在时返回 None"""
+        db = SessionLocal()
+        try:
+            image = db.get(UploadedImage, image_id)
+            if image is None:
+                return None
+            file_path = Path(image.url.lstrip("/"))
+            return file_path if file_path.exists() else None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _save_processed(image_id: int, processed: ProcessedImage) -> None:
+        """把图片处理结果写回记录,并重新渲染处理完成前已保存的引用该图片的赛事"""
+        db = SessionLocal()
+        try:
+            image = db.get(UploadedImage, image_id)
+            if image is None:
+                return
+            UploadService._apply_processed(image, processed)
+            db.commit()
+            EventService.rerender_image_owners(db, image.url)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _apply_processed(image: UploadedImage, processed: ProcessedImage) -> None:
+        """把图片处理结果写入记录"""
+        image.width = processed.width
+        image.height = processed.height
+        image.dominant_color = processed.dominant_color
+        image.placeholder = processed.placeholder
+        image.variants = processed.variants
+
+    @staticmethod
+    def find_by_hash(db: Session, sha256: str) -> Optional[UploadedImage]:
+        """按内容哈希查找图片记录"""
+        return db.query(UploadedImage).filter(UploadedImage.sha256 == sha256).first()
+
+    @staticmethod
+    def release_image(db: Session, image: UploadedImage) -> int:
+        """
+        减少一次引用,引用计数归零时删除记录
+
+        Args:
+            db: 数据库会话
+            image: 图片记录
+
+        Returns:
+            剩余引用次数,为 0 时调用方应删除文件
+        """
+        # 条件更新,并发释放时不会把计数减到 0 以下
+        decremented = db.query(UploadedImage).filter(
+            UploadedImage.id == image.id,
+            UploadedImage.ref_count > 1
+        ).update({UploadedImage.ref_count: UploadedImage.ref_count - 1}, synchronize_session=False)
+        if decremented:
+            db.commit()
+            db.refresh(image)
+            return image.ref_count
+        db.delete(image)
+        db.commit()
+        return 0
+
+    @staticmethod
+    def _sync_and_close(tmp) -> None:
+        """落盘后关闭临时文件"""
+        tmp.flush()
+        os.fsync(tmp.fileno())
+        tmp.close()
+
+
+
+job_queue.register(IMAGE_PROCESS_JOB, UploadService.process_image_job)
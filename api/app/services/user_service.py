@@ -1,13 +1,18 @@
 # 用户服务层
+from sqlalchemy import String, func, literal, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Optional
-import httpx
 import os
 from fastapi import HTTPException
 
 from app.models.user import User
-from app.schemas.user import UserCreate, UserUpdate
+from app.schemas.user import UserCreate, UserUpdate, UserResponse, WxLoginRequest
+from app.services.last_login_service import last_login_buffer
+from app.services.wechat_client import wechat_client
+from app.utils.ttl_cache import TTLCache
 
 
 class UserService:
@@ -16,13 +21,21 @@ class UserService:
     # 微信API配置 (从环境变量读取)
     WX_APP_ID = os.getenv("WECHAT_APP_ID", "")
     WX_APP_SECRET = os.getenv("WECHAT_APP_SECRET", "")
-    WX_API_URL = "https://api.weixin.qq.com/sns/jscode2session"
+    WX_API_PATH = "/sns/jscode2session"
+    
+    # 用户资料缓存(按 openid),修改用户信息后立即失效
+    profile_cache = TTLCache(
+        ttl=float(os.getenv("USER_PROFILE_CACHE_TTL", "300")),
+        max_entries=int(os.getenv("USER_PROFILE_CACHE_SIZE", "10000"))
+    )
     
     @staticmethod
     async def wx_code_to_session(code: str) -> dict:
         """
         调用微信API,通过code换取openid和session_key
         
+        请求经由共享的微信接口客户端发送,复用连接池中的长连接
+        
         Args:
             code: 微信登录凭证
             
@@ -39,24 +52,120 @@ class UserService:
             "grant_type": "authorization_code"
         }
         
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(UserService.WX_API_URL, params=params)
-                data = response.json()
-                
-                # 检查是否有错误
-                if "errcode" in data and data["errcode"] != 0:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"微信登录失败: {data.get('errmsg', '未知错误')}"
-                    )
-                
-                return data
-        except httpx.RequestError as e:
+        data = await wechat_client.get_json(UserService.WX_API_PATH, params)
+        
+        # 检查是否有错误
+        if "errcode" in data and data["errcode"] != 0:
             raise HTTPException(
-                status_code=500,
-                detail=f"调用微信API失败: {str(e)}"
+                status_code=400,
+                detail=f"微信登录失败: {data.get('errmsg', '未知错误')}"
             )
+        
+        return data
+    
+    @staticmethod
+    def login_user(db: Session, open_id: str, login_data: WxLoginRequest) -> User:
+        """
+        登录时创建或更新用户记录
+        
+        老用户没有修改昵称、头像时只读取一次用户,最后登录时间交给
+        last_login_buffer 合并后批量写入,登录本身不占用数据库写锁。
+        其余情况用单条 INSERT ... ON CONFLICT(open_id) DO UPDATE ... RETURNING 完成:
+        新用户插入(未提供昵称时生成随机昵称),老用户只更新提供了的昵称、头像
+        和最后登录时间。同一用户并发首次登录时由数据库裁决,不会违反唯一约束
+        (SQLite 3.35+ 和 PostgreSQL 都支持该语法)
+        
+        Args:
+            db: 数据库会话
+            open_id: 微信OpenID
+            login_data: 登录请求(昵称、头像可选)
+            
+        Returns:
+            用户对象
+        """
+        now = datetime.utcnow()
+        user = UserService.get_user_by_openid(db, open_id)
+        if (
+            user is not None
+            and login_data.nick_name in (None, user.nick_name)
+            and login_data.avatar_url in (None, user.avatar_url)
+        ):
+            # 移出会话后再修改,返回值带上本次登录时间,但不会被写入数据库
+            db.expunge(user)
+            user.last_login_at = now
+            if last_login_buffer.record(user.id, now):
+                UserService.profile_cache.invalidate(open_id)
+            return user
+        
+        insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        nick_name = login_data.nick_name
+        if not nick_name or nick_name.strip() == "":
+            nick_name = UserService._generate_random_nickname()
+        
+        stmt = insert(User).values(
+            open_id=open_id,
+            nick_name=nick_name,
+            avatar_url=login_data.avatar_url,
+            created_at=now,
+            last_login_at=now
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.open_id],
+            set_={
+                # 未提供的字段保留原值
+                "nick_name": func.coalesce(literal(login_data.nick_name, String), User.nick_name),
+                "avatar_url": func.coalesce(literal(login_data.avatar_url, String), User.avatar_url),
+                "last_login_at": now
+            }
+        ).returning(User)
+        user = db.execute(stmt).scalar_one()
+        # 移出会话,提交后不会过期,返回时无需再次查询
+        db.expunge(user)
+        db.commit()
+        UserService.profile_cache.invalidate(open_id)
+        return user
+    
+    @staticmethod
+    def get_user(db: Session, user_id: int) -> Optional[User]:
+        """
+        根据用户ID获取用户(主键查询)
+        
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            
+        Returns:
+            用户对象,如果不存在则返回None
+        """
+        return db.get(User, user_id)
+    
+    @staticmethod
+    def get_profile(db: Session, user_id: int, open_id: str) -> Optional[UserResponse]:
+        """
+        获取用户资料(优先读取缓存)
+        
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            open_id: 微信OpenID(缓存键)
+            
+        Returns:
+            用户资料,如果用户不存在则返回None
+        """
+        profile = UserService.profile_cache.get(open_id)
+        if profile is None:
+            generation = UserService.profile_cache.generation
+            user = UserService.get_user(db, user_id)
+            if not user:
+                return None
+            profile = UserResponse.model_validate(user)
+            UserService.profile_cache.set(open_id, profile, generation)
+        
+        # 合并尚未写入数据库的最后登录时间
+        pending = last_login_buffer.pending(user_id)
+        if pending is not None and pending > profile.last_login_at:
+            profile = profile.model_copy(update={"last_login_at": pending})
+        return profile
     
     @staticmethod
     def get_user_by_openid(db: Session, open_id: str) -> Optional[User]:
@@ -146,22 +255,58 @@ class UserService:
         
         user.last_login_at = datetime.utcnow()
         db.commit()
+        UserService.profile_cache.invalidate(user.open_id)
         db.refresh(user)
         return user
     
+    @staticmethod
+    def update_nickname(db: Session, user_id: int, nick_name: str) -> Optional[User]:
+        """
+        修改用户昵称
+        
+        单条 UPDATE ... RETURNING 完成修改并取回用户,不需要先查询
+        
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            nick_name: 新昵称
+            
+        Returns:
+            更新后的用户对象,如果不存在则返回None
+        """
+        user = db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(nick_name=nick_name, last_login_at=datetime.utcnow())
+            .returning(User)
+        ).scalar_one_or_none()
+        # 移出会话,提交后不会过期,返回时无需再次查询
+        if user is not None:
+            db.expunge(user)
+        db.commit()
+        if user is not None:
+            UserService.profile_cache.invalidate(user.open_id)
+        return user
+    
     @staticmethod
     def update_last_login(db: Session, user: User) -> User:
         """
         更新用户最后登录时间
         
+        只记录到 last_login_buffer,由后台任务批量写入数据库
+        
         Args:
             db: 数据库会话
             user: 用户对象
             
         Returns:
-            更新后的用户对象
+            用户对象(last_login_at 为本次登录时间)
         """
-        user.last_login_at = datetime.utcnow()
-        db.commit()
-        db.refresh(user)
+        now = datetime.utcnow()
+        if last_login_buffer.record(user.id, now):
+            UserService.profile_cache.invalidate(user.open_id)
+        # 移出会话后再修改,避免随其他写入一起提交
+        if user in db:
+            db.expunge(user)
+        user.last_login_at = now
         return user
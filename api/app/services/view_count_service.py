@@ -0,0 +1,134 @@
+# 浏览量写回缓冲服务
+import asyncio
+import logging
+import os
+import threading
+from typing import Dict, List
+
+from sqlalchemy import bindparam, select, text
+
+from app.models.event import Event
+from app.utils.database import engine
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCountBuffer:
+    """
+    浏览量写回缓冲
+
+    浏览量先在内存中累加,由后台任务定期合并为
+    UPDATE events SET view_count = view_count + n 批量写入,
+    每个周期只占用一次数据库写锁。读取时合并未落库的增量,计数看起来仍是实时的
+    """
+
+    def __init__(self, flush_interval: float, max_pending_events: int):
+        """
+        Args:
+            flush_interval: 写回间隔(秒)
+            max_pending_events: 缓冲中最多容纳的赛事数量,超出后新赛事的增量被丢弃
+        """
+        self.flush_interval = flush_interval
+        self.max_pending_events = max_pending_events
+        self._pending: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.flushed_total = 0
+        self.dropped_total = 0
+
+    def record(self, event_id: int, count: int = 1) -> bool:
+        """
+        记录浏览量增量
+
+        Args:
+            event_id: 赛事ID
+            count: 增量
+
+        Returns:
+            是否已记录(缓冲已满时丢弃并返回 False)
+        """
+        with self._lock:
+            if event_id not in self._pending and len(self._pending) >= self.max_pending_events:
+                self.dropped_total += count
+                return False
+            self._pending[event_id] = self._pending.get(event_id, 0) + count
+            return True
+
+    def pending(self, event_id: int) -> int:
+        """返回赛事尚未写入数据库的浏览量增量"""
+        with self._lock:
+            return self._pending.get(event_id, 0)
+
+    def stats(self) -> dict:
+        """返回缓冲统计信息"""
+        with self._lock:
+            return {
+                "pending_events": len(self._pending),
+                "pending_increments": sum(self._pending.values()),
+                "flushed_increments": self.flushed_total,
+                "dropped_increments": self.dropped_total,
+            }
+
+    def flush(self) -> int:
+        """
+        将缓冲中的增量批量写入数据库
+
+        写入失败时增量回到缓冲,等待下次写回;
+        赛事在写回前已被删除时,对应增量计入丢弃数
+
+        Returns:
+            本次写入的浏览量增量总数
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            params = [{"event_id": event_id, "delta": delta} for event_id, delta in batch.items()]
+            try:
+                with engine.begin() as conn:
+                    result = conn.execute(
+                        text("UPDATE events SET view_count = view_count + :delta WHERE id = :event_id"),
+                        params
+                    )
+                    missing: List[int] = []
+                    if result.rowcount != len(params):
+                        existing = set(conn.execute(
+                            select(Event.id).where(Event.id.in_(bindparam("ids", expanding=True))),
+                            {"ids": list(batch)}
+                        ).scalars())
+                        missing = [event_id for event_id in batch if event_id not in existing]
+            except Exception as e:
+                logger.error(f"浏览量写回失败,将在下次重试: {e}")
+                self._restore(batch)
+                return 0
+
+            dropped = sum(batch[event_id] for event_id in missing)
+            flushed = sum(batch.values()) - dropped
+            with self._lock:
+                self.flushed_total += flushed
+                self.dropped_total += dropped
+            return flushed
+
+    def _restore(self, batch: Dict[int, int]) -> None:
+        """写回失败时把增量放回缓冲"""
+        with self._lock:
+            for event_id, delta in batch.items():
+                if event_id not in self._pending and len(self._pending) >= self.max_pending_events:
+                    self.dropped_total += delta
+                    continue
+                self._pending[event_id] = self._pending.get(event_id, 0) + delta
+
+    async def run(self) -> None:
+        """后台定期写回,由应用生命周期启动"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await asyncio.to_thread(self.flush)
+
+
+# 全局浏览量缓冲 (参数从环境变量读取)
+view_count_buffer = ViewCountBuffer(
+    flush_interval=float(os.getenv("VIEW_COUNT_FLUSH_INTERVAL", "5")),
+    max_pending_events=int(os.getenv("VIEW_COUNT_MAX_PENDING", "10000"))
+)
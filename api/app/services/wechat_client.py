@@ -0,0 +1,126 @@
+# 微信接口共享 HTTP 客户端
+import asyncio
+import logging
+import os
+from typing import Optional
+
+import httpx
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # 未安装 h2 时使用 HTTP/1.1 长连接
+    HTTP2_AVAILABLE = False
+
+
+class WeChatClient:
+    """
+    微信接口客户端
+
+    整个应用共用一个 httpx.AsyncClient,由应用生命周期创建和关闭。
+    连接池保持长连接(安装 h2 时使用 HTTP/2 多路复用),登录时不必每次
+    重新解析域名、建立 TCP 和 TLS 连接。同时进行的请求数有上限,
+    微信接口变慢时多余的登录请求排队等待,超过等待时间直接失败,不会无限堆积
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        connect_timeout: float,
+        read_timeout: float,
+        max_connections: int,
+        max_concurrency: int,
+        acquire_timeout: float
+    ):
+        """
+        Args:
+            base_url: 微信接口地址(压测时可指向本地模拟服务)
+            connect_timeout: 建立连接的超时(秒)
+            read_timeout: 等待响应的超时(秒)
+            max_connections: 连接池最大连接数
+            max_concurrency: 同时进行的请求数上限
+            acquire_timeout: 排队等待的最长时间(秒)
+        """
+        self.base_url = base_url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def start(self) -> None:
+        """创建客户端,由应用生命周期调用"""
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(
+                self.read_timeout,
+                connect=self.connect_timeout,
+                pool=self.acquire_timeout
+            ),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=60
+            )
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        logger.info(f"微信接口客户端已创建 (HTTP/{'2' if HTTP2_AVAILABLE else '1.1'}, {self.base_url})")
+
+    async def aclose(self) -> None:
+        """关闭客户端和连接池,由应用生命周期调用"""
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+    async def get_json(self, path: str, params: dict) -> dict:
+        """
+        发送 GET 请求并解析 JSON 响应
+
+        未经应用生命周期启动时(如脚本中直接调用)首次使用会自动创建客户端
+
+        Args:
+            path: 接口路径
+            params: 查询参数
+
+        Returns:
+            响应 JSON
+
+        Raises:
+            HTTPException: 排队超时返回 503,微信接口超时返回 504,其他请求错误或响应格式错误返回 500
+        """
+        if self._client is None:
+            self.start()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="登录请求过多,请稍后重试")
+        try:
+            response = await self._client.get(path, params=params)
+            return response.json()
+        except httpx.TimeoutException:
+            raise HTTPException(status_code=504, detail="调用微信API超时")
+        except httpx.RequestError as e:
+            raise HTTPException(status_code=500, detail=f"调用微信API失败: {str(e)}")
+        except ValueError:
+            raise HTTPException(status_code=500, detail="微信API返回的数据格式错误")
+        finally:
+            self._semaphore.release()
+
+
+# 全局实例,配置从环境变量读取
+wechat_client = WeChatClient(
+    base_url=os.getenv("WECHAT_API_BASE", "https://api.weixin.qq.com"),
+    connect_timeout=float(os.getenv("WECHAT_CONNECT_TIMEOUT", "3")),
+    read_timeout=float(os.getenv("WECHAT_READ_TIMEOUT", "5")),
+    max_connections=int(os.getenv("WECHAT_MAX_CONNECTIONS", "20")),
+    max_concurrency=int(os.getenv("WECHAT_MAX_CONCURRENCY", "100")),
+    acquire_timeout=float(os.getenv("WECHAT_ACQUIRE_TIMEOUT", "5"))
+)
@@ -5,7 +5,8 @@ from .exceptions import (
     NotFoundException,
     BadRequestException,
     UnauthorizedException,
-    InternalServerException
+    InternalServerException,
+    PayloadTooLargeException
 )
 
 __all__ = [
@@ -19,4 +20,5 @@ __all__ = [
     "BadRequestException",
     "UnauthorizedException",
     "InternalServerException",
+    "PayloadTooLargeException",
 ]
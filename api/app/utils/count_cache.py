@@ -0,0 +1,76 @@
+# 计数缓存
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+
+class CountCache:
+    """
+    带过期时间的计数缓存
+
+    用于缓存列表总数,避免每次分页都执行 COUNT(*)。
+    写入数据时调用 invalidate 使缓存整体失效;写入缓存时需携带读取前的版本号,
+    版本号已变化说明期间发生过写入,此时丢弃结果,避免把旧快照的计数写回缓存
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 256):
+        """
+        Args:
+            ttl: 缓存有效期(秒)
+            max_entries: 最大缓存条目数,超出后淘汰最久未使用的条目
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[int, float]]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        """当前缓存版本号"""
+        return self._generation
+
+    def get(self, key: Hashable) -> Optional[int]:
+        """
+        读取缓存的计数
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            计数值,不存在或已过期时返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: int, generation: int) -> None:
+        """
+        写入计数
+
+        Args:
+            key: 缓存键
+            value: 计数值
+            generation: 计算该值之前读取的版本号
+        """
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """清空缓存并递增版本号"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
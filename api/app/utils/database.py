@@ -1,5 +1,6 @@
 # 数据库连接配置
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.schema import CreateColumn
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -49,3 +50,44 @@ def init_db():
     在应用启动时调用
     """
     Base.metadata.create_all(bind=engine)
+    _ensure_columns()
+    _ensure_indexes()
+
+
+def _ensure_columns():
+    """
+    为已存在的表补加新增的列
+
+    create_all 不会修改已存在的表,新增列需带默认值或允许为空
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+
+# 已从模型中移除的索引,启动时从旧数据库中删除
+_DROPPED_INDEXES = (
+    # 与 ix_events_date 重复: SQLite 中 id 即 rowid,已隐含在单列索引中
+    "ix_events_date_id",
+)
+
+
+def _ensure_indexes():
+    """
+    为已存在的表补建索引,并删除已移除的索引
+
+    create_all 只在建表时创建索引,旧数据库新增的索引需要单独补建
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        for name in _DROPPED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
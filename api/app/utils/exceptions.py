@@ -40,3 +40,11 @@ class InternalServerException(BaseAPIException):
     """
     def __init__(self, message: str = "服务器内部错误"):
         super().__init__(message=message, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class PayloadTooLargeException(BaseAPIException):
+    """
+    请求体过大异常
+    """
+    def __init__(self, message: str = "请求体过大"):
+        super().__init__(message=message, status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
@@ -1,6 +1,13 @@
 # Markdown 处理工具
 import re
-from typing import Optional
+from html import unescape
+from typing import List, Mapping, Optional
+
+# 预渲染 HTML 的版本号,渲染规则变化时递增,回填脚本会重新渲染旧版本的记录
+RENDER_VERSION = 3
+
+# 正文图片样式(与小程序详情页保持一致)
+IMAGE_STYLE = "width: 100%; height: auto; display: block; margin: 20px 0;"
 
 
 def extract_first_image(markdown_content: str) -> Optional[str]:
@@ -35,57 +42,389 @@ def extract_first_image(markdown_content: str) -> Optional[str]:
     return None
 
 
-def markdown_to_html(markdown_content: str) -> str:
+# 块级语法: 标题、代码块、分隔线、引用和列表由一个多行模式从行首匹配,
+# 不匹配的行开始一组段落
+_LIST_MARKER = r' *(?:[-+*]|\d{1,9}[.)])[ \t]'
+_RULE_LINE = r' {0,3}(?:(?:-[ \t]*){3,}|(?:\*[ \t]*){3,}|(?:_[ \t]*){3,})(?:\n|\Z)'
+# 能打断段落的行: 空行、标题、引用、代码块、分隔线、列表项
+_BLOCK_START = (
+    r'[ \t]*(?:\n|\Z)'
+    r'| {0,3}(?:#{1,6}(?:[ \t]|\n|\Z)|>|`{3,}|~{3,})'
+    r'|' + _RULE_LINE +
+    r'|' + _LIST_MARKER
+)
+_BLOCK = re.compile(
+    r'(?P<blank>(?:[ \t]*\n)+|[ \t]+\Z)'
+    r'|(?P<fence>^ {0,3}(?P<marker>`{3,}|~{3,})[ \t]*(?P<lang>[\w+#.-]*)[^\n]*(?:\n|\Z)'
+    r'(?P<code>(?s:.*?))(?:^ {0,3}(?P=marker)[`~]*[ \t]*(?:\n|\Z)|\Z))'
+    r'|(?P<heading>^ {0,3}(?P<hashes>#{1,6})(?:[ \t]+(?P<title>[^\n]*))?(?:\n|\Z))'
+    r'|(?P<rule>^' + _RULE_LINE + r')'
+    r'|(?P<quote>(?:^ {0,3}>[^\n]*(?:\n|\Z))+)'
+    # 列表: 列表项,以及其后的缩进行、空行后的列表项和不构成新块的延续行
+    r'|(?P<list>^' + _LIST_MARKER + r'[^\n]*(?:\n|\Z)'
+    r'(?:(?:[ \t]*\n)*(?:' + _LIST_MARKER + r'|[ \t]+\S)[^\n]*(?:\n|\Z)'
+    r'|(?!' + _BLOCK_START + r')[^\n]+(?:\n|\Z))*)',
+    re.MULTILINE
+)
+_LIST_ITEM = re.compile(r'( *)(?:([-+*])|(\d{1,9})[.)])[ \t]+(.*)')
+_QUOTE_PREFIX = re.compile(r'^ {0,3}>[ \t]?', re.MULTILINE)
+
+# 段落: 不以块级语法开头的行开始一组连续的段落(段落之间只隔着空行),
+# 这一组文本只做一遍行内匹配,再按空行分成段落
+# 段落组的结尾: 换行之后(跳过空行)是非空的块级语法行
+_PARAGRAPHS_END = re.compile(
+    r'\n(?=[ \t\n#>`~*_+\d-])(?:[ \t]*\n)*(?![ \t]*(?:\n|\Z))(?=' + _BLOCK_START + r')'
+)
+_BLANK_LINES = re.compile(r'\n(?:[ \t]*\n)+')
+
+# 行内语法: 强调、代码、链接等都由一个总模式匹配,
+# 匹配之间的普通文本由 re 在 C 层跳过,只有语法单元交给 Python。
+# 每个分支都以字面字符开头,re 可以直接跳到候选字符处再尝试匹配;
+# 各分组只排除自身的分隔符,匹配失败时最多扫描到下一个分隔符,耗时是线性的。
+# 强调和代码的内容可以换行,但不跨越空行(段落组中的段落分隔)
+_SOFT_BREAK = r'\n(?![ \t]*\n)'
+_LINK_TAIL = r'\]\([ \t]*<?(?P<{0}_url>[^\s()<>]*)>?(?:[ \t]+"(?P<{0}_title>[^"\n]*)")?[ \t]*\)'
+
+
+def _emphasis_text(delimiter: str, inner: str = '') -> str:
+    """强调的内容: 除分隔符、反斜杠和换行外的字符,转义字符,inner 以及不跨越空行的换行"""
+    other = r'[^' + delimiter + r'\\\n]*'
+    return other + r'(?:(?:\\.|' + inner + _SOFT_BREAK + r')' + other + r')*'
+
+
+_INLINE = re.compile(
+    r'\*(?:(?P<strong_em>\*\*(?=[^\s*])(?P<strong_em_text>' + _emphasis_text(r'*') + r')(?<=[^\s\\])\*\*\*(?!\*))'
+    r'|(?P<strong>\*(?=[^\s*])(?P<strong_text>' + _emphasis_text(r'*', r'\*(?!\*)|') + r')(?<=[^\s\\])\*\*(?!\*))'
+    r'|(?P<em>(?=[^\s*])(?P<em_text>' + _emphasis_text(r'*') + r')(?<=[^\s\\])\*(?!\*)))'
+    # 下划线不匹配单词内部,避免破坏 20251229_135053_xxx.png 这类文件名
+    r'|_(?<!\w_)(?:(?P<strong_u>_(?=[^\s_])(?P<strong_u_text>' + _emphasis_text(r'_', r'_(?!_)|') + r')(?<=[^\s\\])__(?!\w))'
+    r'|(?P<em_u>(?=[^\s_])(?P<em_u_text>' + _emphasis_text(r'_') + r')(?<=[^\s\\])_(?!\w)))'
+    r'|!(?P<image>\[(?P<alt>[^\[\]\n]*)' + _LINK_TAIL.format('image') + r')'
+    # 链接文字中允许嵌套图片: [![alt](src)](href)
+    r'|\[(?P<link>(?P<label>[^\[\]\n]*(?:!\[[^\[\]\n]*\]\([^()\s]*\)[^\[\]\n]*)*)' + _LINK_TAIL.format('link') + r')'
+    r'|`(?P<code>(?P<ticks>`*)(?=[^`])(?P<code_text>[^`\n]*(?:' + _SOFT_BREAK + r'[^`\n]*)*)`(?P=ticks)(?!`))'
+    r'|\\(?P<escaped>[!-/:-@\[-`{-~])'
+    # HTML 标签和实体原样保留,其余 < > & 转义
+    r'|<(?P<tag>/?[A-Za-z][A-Za-z0-9-]*(?:[ \t][^<>\n]*)?/?>)'
+    r'|&(?P<entity>#[0-9]{1,7};|#[xX][0-9a-fA-F]{1,6};|[A-Za-z][A-Za-z0-9]{1,31};)'
+    r'|<(?P<lt>)|>(?P<gt>)|&(?P<amp>)'
+)
+# 不含这些字符的文本无需行内渲染
+_INLINE_HINT = re.compile(r'[*_`!\[\\<>&]')
+# 按分组序号分派,比按名称取分组更快
+_GROUP = _INLINE.groupindex
+# 强调分组 -> (开始标签, 结束标签, 内容分组)
+_EMPHASIS = {
+    _GROUP['strong_em']: ('<strong><em>', '</em></strong>', _GROUP['strong_em_text']),
+    _GROUP['strong']: ('<strong>', '</strong>', _GROUP['strong_text']),
+    _GROUP['em']: ('<em>', '</em>', _GROUP['em_text']),
+    _GROUP['strong_u']: ('<strong>', '</strong>', _GROUP['strong_u_text']),
+    _GROUP['em_u']: ('<em>', '</em>', _GROUP['em_u_text']),
+}
+_SYMBOLS = {_GROUP['lt']: '&lt;', _GROUP['gt']: '&gt;', _GROUP['amp']: '&amp;'}
+_ESCAPED = {'<': '&lt;', '>': '&gt;', '&': '&amp;', '"': '&quot;'}
+_ATTR_SPECIAL = re.compile(r'[&<>"]')
+_UNSAFE_SCHEMES = ('javascript:', 'vbscript:', 'data:text')
+
+
+def _escape_text(value: str) -> str:
+    """转义文本中的 HTML 特殊字符"""
+    return value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _escape_attr(value: str) -> str:
+    """转义属性值"""
+    if _ATTR_SPECIAL.search(value) is None:
+        return value
+    return _escape_text(value).replace('"', '&quot;')
+
+
+def _safe_url(url: str) -> str:
+    """过滤可执行脚本的链接(url 已由模式保证不含空白)"""
+    if ':' in url and url.lower().startswith(_UNSAFE_SCHEMES):
+        return '#'
+    return _escape_attr(url)
+
+
+def _render_inline(text: str, image_style: Optional[str] = None) -> str:
+    """
+    渲染行内语法(强调、代码、图片、链接、转义)
+
+    Args:
+        text: 段落组、标题或列表项的文本
+        image_style: 图片的 style 属性
+
+    Returns:
+        HTML 片段
+    """
+    if _INLINE_HINT.search(text) is None:
+        return text
+    link, image = _GROUP['link'], _GROUP['image']
+    style_attr = f' style="{image_style}"' if image_style else ''
+
+    def render(m):
+        kind = m.lastindex
+        emphasis = _EMPHASIS.get(kind)
+        if emphasis is not None:
+            open_tag, close_tag, group = emphasis
+            inner = m.group(group)
+            if _INLINE_HINT.search(inner) is not None:
+                inner = _render_inline(inner, image_style)
+            return open_tag + inner + close_tag
+        if kind == link:
+            label, url, title = m.group(_GROUP['label'], _GROUP['link_url'], _GROUP['link_title'])
+            title_attr = f' title="{_escape_attr(title)}"' if title else ''
+            if _INLINE_HINT.search(label) is not None:
+                label = _render_inline(label, image_style)
+            return f'<a href="{_safe_url(url)}"{title_attr}>{label}</a>'
+        if kind == image:
+            alt, url, title = m.group(_GROUP['alt'], _GROUP['image_url'], _GROUP['image_title'])
+            title_attr = f' title="{_escape_attr(title)}"' if title else ''
+            return f'<img src="{_safe_url(url)}" alt="{_escape_attr(alt)}"{title_attr}{style_attr} />'
+        symbol = _SYMBOLS.get(kind)
+        if symbol is not None:
+            return symbol
+        if kind == _GROUP['code']:
+            return '<code>' + _escape_text(m.group(_GROUP['code_text']).strip()) + '</code>'
+        if kind == _GROUP['escaped']:
+            char = m.group(kind)
+            return _ESCAPED.get(char, char)
+        if kind == _GROUP['tag']:
+            tag = m.group()
+            # 原文中的 <img> 标签同样加上图片样式
+            if image_style and tag.startswith('<img ') and 'style=' not in tag:
+                return f'<img style="{image_style}" ' + tag[5:]
+            return tag
+        # HTML 实体
+        return m.group()
+
+    return _INLINE.sub(render, text)
+
+
+def _render_paragraphs(text: str, image_style: Optional[str]) -> str:
+    """
+    渲染一组以空行分隔的段落
+
+    整组做一遍行内渲染,再按空行切分;每段去除首尾空白,段内换行转为 <br />
+
+    Args:
+        text: 段落组的原文
+        image_style: 图片的 style 属性
+
+    Returns:
+        HTML 片段
+    """
+    html = _render_inline(text, image_style)
+    if '\n' not in html:
+        return '<p>' + html.strip() + '</p>'
+    paragraphs = [paragraph.strip().replace('\n', '<br />') for paragraph in _BLANK_LINES.split(html)]
+    return '<p>' + '</p>\n<p>'.join(paragraphs) + '</p>'
+
+
+def _render_list(block: str, image_style: Optional[str]) -> str:
+    """
+    渲染列表块,按缩进嵌套,有序/无序切换时开始新列表
+
+    Args:
+        block: 列表块的原文
+        image_style: 图片的 style 属性
+
+    Returns:
+        HTML 片段
+    """
+    parts = []
+    # 列表栈: (标签, 缩进)
+    lists = []
+    for line in block.split('\n'):
+        if not line.strip():
+            continue
+        item = _LIST_ITEM.match(line)
+        if item is None:
+            # 列表项的延续行
+            parts.append('<br />' + _render_inline(line.strip(), image_style))
+            continue
+
+        indent = len(item.group(1))
+        tag = 'ul' if item.group(2) else 'ol'
+        while lists and indent < lists[-1][1]:
+            parts.append(f'</li></{lists.pop()[0]}>')
+        if lists and indent > lists[-1][1] + 1:
+            # 更深的缩进: 在当前列表项内嵌套新列表
+            lists.append((tag, indent))
+            parts.append(f'<{tag}><li>')
+        elif lists and lists[-1][0] == tag:
+            parts.append('</li><li>')
+        else:
+            if lists:
+                parts.append(f'</li></{lists.pop()[0]}>')
+            start_attr = ''
+            if tag == 'ol' and item.group(3).lstrip('0') not in ('', '1'):
+                start_attr = f' start="{int(item.group(3))}"'
+            lists.append((tag, indent))
+            parts.append(f'<{tag}{start_attr}><li>')
+        parts.append(_render_inline(item.group(4).strip(), image_style))
+
+    while lists:
+        parts.append(f'</li></{lists.pop()[0]}>')
+    return ''.join(parts)
+
+
+def markdown_to_html(markdown_content: str, image_style: Optional[str] = None) -> str:
     """
     将 Markdown 转换为 HTML
-    
-    简单实现，支持基本语法:
-    - 标题 (# ## ###)
-    - 粗体 (**text**)
-    - 斜体 (*text*)
+
+    块级语法由一个预编译的多行模式在行首匹配,连续的段落整组做一遍行内匹配,
+    耗时与内容长度成线性关系。支持的语法:
+    - 标题 (# 到 ######)
+    - 粗体 (**text** / __text__)
+    - 斜体 (*text* / _text_)
     - 图片 (![alt](url))
     - 链接 ([text](url))
-    - 段落
-    
+    - 行内代码和围栏代码块 (```)
+    - 有序/无序列表(按缩进嵌套)
+    - 引用 (>)、分隔线 (---)
+    - 反斜杠转义,HTML 特殊字符转义(HTML 标签原样保留)
+    - 段落(空行分隔,段内换行转为 <br />)
+
     Args:
         markdown_content: Markdown 格式的内容
-        
+        image_style: 图片的 style 属性,为空时不设置
+
     Returns:
         HTML 格式的内容
     """
     if not markdown_content:
         return ""
+
+    text = markdown_content.replace('\r\n', '\n')
+    blocks = []
+    pos = 0
+    length = len(text)
+    while pos < length:
+        m = _BLOCK.match(text, pos)
+        if m is not None:
+            pos = m.end()
+            block = _render_block(m, image_style)
+            if block is not None:
+                blocks.append(block)
+            continue
+
+        # 段落组到下一个块级语法为止,文档结尾的空行不构成段落
+        end = _PARAGRAPHS_END.search(text, pos)
+        end = end.start() if end is not None else len(text.rstrip(' \t\n'))
+        blocks.append(_render_paragraphs(text[pos:end], image_style))
+        pos = end
+
+    return '\n'.join(blocks)
+
+
+def _heading_title(title: str) -> str:
+    """去掉标题末尾的空白和可选的结尾 #(前面需有空白,保留 "C#" 这类写法)"""
+    title = title.rstrip()
+    trimmed = title.rstrip('#')
+    if trimmed != title and (not trimmed or trimmed[-1] in ' \t'):
+        return trimmed.rstrip()
+    return title
+
+
+def _render_block(m, image_style: Optional[str]) -> Optional[str]:
+    """
+    渲染 _BLOCK 匹配到的一个块
+
+    Args:
+        m: _BLOCK 的匹配结果
+        image_style: 图片的 style 属性
+
+    Returns:
+        HTML 片段,空行返回 None
+    """
+    # 最后结束的分组是块的类型(外层分组在内层分组之后结束)
+    kind = m.lastgroup
+    if kind == 'blank':
+        return None
+    if kind == 'heading':
+        level = len(m.group('hashes'))
+        title = _heading_title(m.group('title') or '')
+        return f'<h{level}>' + _render_inline(title, image_style) + f'</h{level}>'
+    if kind == 'list':
+        return _render_list(m.group(kind), image_style)
+    if kind == 'quote':
+        inner = markdown_to_html(_QUOTE_PREFIX.sub('', m.group(kind)), image_style)
+        return '<blockquote>' + inner + '</blockquote>'
+    if kind == 'fence':
+        language = m.group('lang')
+        class_attr = f' class="language-{_escape_attr(language)}"' if language else ''
+        code = m.group('code')
+        if code.endswith('\n'):
+            code = code[:-1]
+        return f'<pre><code{class_attr}>' + _escape_text(code) + '</code></pre>'
+    return '<hr />'
+
+
+def render_content_html(markdown_content: Optional[str]) -> Optional[str]:
+    """
+    生成用于小程序 rich-text 展示的 HTML
     
-    html = markdown_content
-    
-    # 标题
-    html = re.sub(r'^### (.*?)$', r'<h3>\1</h3>', html, flags=re.MULTILINE)
-    html = re.sub(r'^## (.*?)$', r'<h2>\1</h2>', html, flags=re.MULTILINE)
-    html = re.sub(r'^# (.*?)$', r'<h1>\1</h1>', html, flags=re.MULTILINE)
+    在保存赛事时调用一次,结果存入数据库,详情接口直接返回
     
-    # 粗体
-    html = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', html)
-    html = re.sub(r'__(.*?)__', r'<strong>\1</strong>', html)
+    Args:
+        markdown_content: Markdown 格式的内容
+        
+    Returns:
+        HTML 格式的内容,内容为空时返回 None
+    """
+    if not markdown_content:
+        return None
     
-    # 斜体
-    html = re.sub(r'\*(.*?)\*', r'<em>\1</em>', html)
-    html = re.sub(r'_(.*?)_', r'<em>\1</em>', html)
+    return markdown_to_html(markdown_content, image_style=IMAGE_STYLE)
+
+
+# 渲染器为 Markdown 图片生成的 <img> 标签(原文中的 HTML 标签不匹配)
+_STYLED_IMAGE = re.compile(r'<img src="([^"]*)"([^>]*?) style="' + re.escape(IMAGE_STYLE) + '" />')
+
+
+def content_image_urls(content_html: str) -> List[str]:
+    """
+    返回 render_content_html 输出中 Markdown 图片的 URL
     
-    # 图片
-    html = re.sub(r'!\[(.*?)\]\((.*?)\)', r'<img src="\2" alt="\1" />', html)
+    Args:
+        content_html: 预渲染的 HTML
+        
+    Returns:
+        图片 URL 列表(按出现顺序,可能重复)
+    """
+    return [unescape(url) for url, _ in _STYLED_IMAGE.findall(content_html)]
+
+
+def annotate_images(content_html: str, image_meta: Mapping[str, dict]) -> str:
+    """
+    为预渲染 HTML 中的图片加上尺寸和占位
     
-    # 链接
-    html = re.sub(r'\[(.*?)\]\((.*?)\)', r'<a href="\2">\1</a>', html)
+    加上 width/height 属性和 aspect-ratio,图片加载前就按实际比例占位,
+    页面不会随图片加载跳动;有主色和占位图时作为背景先显示出来
     
-    # 段落（简单处理：空行分隔）
-    paragraphs = html.split('\n\n')
-    html_paragraphs = []
-    for p in paragraphs:
-        p = p.strip()
-        if p and not p.startswith('<'):
-            p = f'<p>{p}</p>'
-        html_paragraphs.append(p)
+    Args:
+        content_html: 预渲染的 HTML
+        image_meta: {图片URL: {"width", "height", "dominant_color", "placeholder"}}
+        
+    Returns:
+        加上图片信息后的 HTML
+    """
+    if not image_meta:
+        return content_html
     
-    html = '\n'.join(html_paragraphs)
+    def annotate(m):
+        meta = image_meta.get(unescape(m.group(1)))
+        if not meta:
+            return m.group()
+        width, height = meta["width"], meta["height"]
+        style = f'{IMAGE_STYLE} aspect-ratio: {width} / {height};'
+        if meta.get("placeholder"):
+            style += f' background: {meta["dominant_color"]} url({meta["placeholder"]}) center / cover no-repeat;'
+        elif meta.get("dominant_color"):
+            style += f' background-color: {meta["dominant_color"]};'
+        return (
+            f'<img src="{m.group(1)}" width="{width}" height="{height}"{m.group(2)} style="{style}" />'
+        )
     
-    return html
+    return _STYLED_IMAGE.sub(annotate, content_html)
@@ -0,0 +1,179 @@
+# 流式 multipart/form-data 解析
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from starlette.requests import ClientDisconnect, Request
+
+try:
+    import python_multipart as multipart
+    from python_multipart.exceptions import MultipartParseError
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    import multipart
+    from multipart.exceptions import MultipartParseError
+    from multipart.multipart import parse_options_header
+
+from app.utils.exceptions import BadRequestException
+
+# 普通字段值的最大长度(字节)
+MAX_FIELD_SIZE = 64 * 1024
+
+
+class MultipartStream:
+    """
+    边接收边解析 multipart/form-data 请求体
+
+    文件字段的数据按网络分块交给调用方,不在内存或临时文件中缓存整个请求体,
+    调用方可以在写入过程中随时中止;普通字段的值收集到 fields 中。
+
+    用法:
+        upload = MultipartStream(request)
+        while (filename := await upload.next_file()) is not None:
+            async for chunk in upload.iter_file():
+                ...
+    """
+
+    def __init__(self, request: Request):
+        """
+        Args:
+            request: 请求对象,请求体尚未被读取
+        """
+        _, params = parse_options_header(request.headers.get("content-type", ""))
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise BadRequestException("请求必须是 multipart/form-data 格式")
+
+        self.fields: Dict[str, str] = {}
+        self._stream = request.stream().__aiter__()
+        self._parser = multipart.MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._field_name: Optional[str] = None
+        self._field_data = bytearray()
+        # 已解析出头部的文件: [文件名, 尚未取走的数据块, 是否已结束]
+        self._files: Deque[list] = deque()
+        self._current: Optional[list] = None
+        self._in_file = False
+        self._eof = False
+
+    # ---- 解析回调 ----
+
+    def _on_part_begin(self) -> None:
+        self._disposition = b""
+        self._field_name = None
+        self._field_data.clear()
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name")
+        if name is None:
+            raise BadRequestException("multipart 字段缺少 name")
+        self._field_name = name.decode("utf-8", errors="replace")
+        self._in_file = b"filename" in options
+        if self._in_file:
+            filename = options[b"filename"].decode("utf-8", errors="replace")
+            self._files.append([filename, [], False])
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._files[-1][1].append(data[start:end])
+            return
+        self._field_data += data[start:end]
+        if len(self._field_data) > MAX_FIELD_SIZE:
+            raise BadRequestException(f"字段 {self._field_name} 过长")
+
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self._in_file = False
+            self._files[-1][2] = True
+        elif self._field_name is not None:
+            self.fields[self._field_name] = self._field_data.decode("utf-8", errors="replace")
+
+    # ---- 读取 ----
+
+    async def _feed(self) -> bool:
+        """读取并解析下一块请求体,请求体已读完时返回 False"""
+        if self._eof:
+            return False
+        try:
+            chunk = await self._stream.__anext__()
+        except StopAsyncIteration:
+            chunk = b""
+        except ClientDisconnect:
+            raise BadRequestException("上传被客户端中断")
+        # 请求体格式错误(头部含非法字符、分隔符不完整等)属于客户端错误
+        try:
+            if not chunk:
+                self._eof = True
+                self._parser.finalize()
+                return False
+            self._parser.write(chunk)
+        except MultipartParseError:
+            raise BadRequestException("上传数据格式错误")
+        return True
+
+    async def next_file(self) -> Optional[str]:
+        """
+        读到下一个文件字段的头部为止
+
+        上一个文件未读完的数据会被跳过
+
+        Returns:
+            原始文件名,没有更多文件时返回 None
+        """
+        current = self._current
+        self._current = None
+        if current is not None:
+            # 一个网络分块里可能同时含有下一个文件,已解析的部分保留在队列中
+            current[1].clear()
+            while not current[2]:
+                if not await self._feed():
+                    return None
+                current[1].clear()
+            if self._files and self._files[0] is current:
+                self._files.popleft()
+
+        while not self._files:
+            if not await self._feed():
+                return None
+        self._current = self._files[0]
+        return self._current[0]
+
+    async def iter_file(self) -> AsyncIterator[bytes]:
+        """
+        逐块返回当前文件的数据
+
+        每次只缓存一个网络分块内的数据,内存占用与文件大小无关
+        """
+        current = self._current
+        if current is None:
+            return
+        chunks = current[1]
+        while True:
+            while chunks:
+                yield chunks.pop(0)
+            if current[2]:
+                return
+            if not await self._feed():
+                raise BadRequestException("上传数据不完整")
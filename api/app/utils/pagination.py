@@ -0,0 +1,43 @@
+# 分页游标工具
+import base64
+import json
+from datetime import date
+from typing import Tuple
+
+from app.utils.exceptions import BadRequestException
+
+
+def encode_cursor(event_date: date, event_id: int) -> str:
+    """
+    将 (日期, ID) 编码为不透明的分页游标
+
+    Args:
+        event_date: 当前页最后一条记录的日期
+        event_id: 当前页最后一条记录的ID
+
+    Returns:
+        URL 安全的游标字符串
+    """
+    payload = json.dumps({"d": event_date.isoformat(), "i": event_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    """
+    解析分页游标
+
+    Args:
+        cursor: encode_cursor 生成的游标字符串
+
+    Returns:
+        (日期, ID)
+
+    Raises:
+        BadRequestException: 游标格式无效
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return date.fromisoformat(payload["d"]), int(payload["i"])
+    except (ValueError, TypeError, KeyError, UnicodeError):
+        raise BadRequestException("无效的分页游标")
@@ -0,0 +1,171 @@
+# 会话令牌
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import Header
+
+from app.utils.exceptions import UnauthorizedException
+
+logger = logging.getLogger(__name__)
+
+# 令牌有效期(秒),从环境变量读取
+SESSION_TOKEN_TTL = int(os.getenv("SESSION_TOKEN_TTL", str(7 * 24 * 3600)))
+
+
+class SessionClaims(NamedTuple):
+    """令牌中携带的登录信息"""
+    user_id: int
+    open_id: str
+    expires_at: int  # 过期时间(Unix 时间戳,秒)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def parse_keys(value: str) -> Dict[str, bytes]:
+    """
+    解析签名密钥配置
+
+    格式为逗号分隔的 "密钥ID:密钥",第一个用于签发新令牌,
+    其余只用于验证。轮换时把新密钥加到最前面,旧密钥保留到
+    用它签发的令牌全部过期(一个有效期)后再删除
+
+    Args:
+        value: 如 "2:新密钥,1:旧密钥"
+
+    Returns:
+        {密钥ID: 密钥},按配置顺序
+    """
+    keys: Dict[str, bytes] = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        kid, sep, secret = item.partition(":")
+        if not sep or not kid or not secret or "." in kid:
+            raise ValueError(f"SESSION_TOKEN_KEYS 格式错误: {item!r},应为 密钥ID:密钥")
+        keys[kid] = secret.encode("utf-8")
+    return keys
+
+
+class SessionTokens:
+    """
+    HMAC 签名的会话令牌
+
+    格式为 密钥ID.载荷.签名,载荷是 [用户ID, openid, 过期时间] 的 JSON
+    (base64url 编码),签名是 HMAC-SHA256(密钥, "密钥ID.载荷")。
+    验证只需计算一次 HMAC,不访问数据库
+    """
+
+    def __init__(self, keys: Dict[str, bytes], ttl: int):
+        """
+        Args:
+            keys: {密钥ID: 密钥},第一个用于签发
+            ttl: 令牌有效期(秒)
+        """
+        if not keys:
+            raise ValueError("至少需要一个签名密钥")
+        self.keys = keys
+        self.signing_kid = next(iter(keys))
+        self.ttl = ttl
+
+    def _sign(self, kid: str, payload: str) -> str:
+        digest = hmac.new(self.keys[kid], f"{kid}.{payload}".encode("ascii"), hashlib.sha256).digest()
+        return _b64encode(digest)
+
+    def issue(self, user_id: int, open_id: str, now: Optional[float] = None) -> Tuple[str, int]:
+        """
+        签发令牌
+
+        Args:
+            user_id: 用户ID
+            open_id: 微信OpenID
+            now: 当前时间(Unix 时间戳),默认取系统时间
+
+        Returns:
+            (令牌, 过期时间戳)
+        """
+        expires_at = int(now if now is not None else time.time()) + self.ttl
+        payload = _b64encode(json.dumps([user_id, open_id, expires_at], separators=(",", ":")).encode("utf-8"))
+        kid = self.signing_kid
+        return f"{kid}.{payload}.{self._sign(kid, payload)}", expires_at
+
+    def verify(self, token: str, now: Optional[float] = None) -> Optional[SessionClaims]:
+        """
+        验证令牌
+
+        Args:
+            token: 令牌
+            now: 当前时间(Unix 时间戳),默认取系统时间
+
+        Returns:
+            登录信息,令牌无效、密钥已删除或已过期时返回 None
+        """
+        parts = token.split(".")
+        if len(parts) != 3:
+            return None
+        kid, payload, signature = parts
+        if kid not in self.keys:
+            return None
+        # 令牌来自请求头,可能包含任意字符,编码或解码失败都视为无效令牌
+        try:
+            expected = self._sign(kid, payload)
+            if not hmac.compare_digest(signature.encode("ascii"), expected.encode("ascii")):
+                return None
+            claims = json.loads(_b64decode(payload))
+        except (UnicodeError, ValueError, TypeError, binascii.Error):
+            return None
+        if not (
+            isinstance(claims, list)
+            and len(claims) == 3
+            and type(claims[0]) is int
+            and isinstance(claims[1], str)
+            and type(claims[2]) is int
+        ):
+            return None
+        user_id, open_id, expires_at = claims
+        if expires_at <= (now if now is not None else time.time()):
+            return None
+        return SessionClaims(user_id=user_id, open_id=open_id, expires_at=expires_at)
+
+
+def _load_keys() -> Dict[str, bytes]:
+    """从环境变量读取签名密钥,未配置时生成临时密钥"""
+    configured = os.getenv("SESSION_TOKEN_KEYS", "")
+    if configured.strip():
+        return parse_keys(configured)
+    logger.warning("未配置 SESSION_TOKEN_KEYS,使用临时密钥: 重启后已签发的令牌失效,多进程部署时互不通用")
+    return {"tmp": secrets.token_bytes(32)}
+
+
+# 全局实例
+session_tokens = SessionTokens(_load_keys(), SESSION_TOKEN_TTL)
+
+
+def get_current_session(authorization: Optional[str] = Header(None, description="Bearer 会话令牌")) -> SessionClaims:
+    """
+    验证请求头中的会话令牌(依赖项)
+
+    Raises:
+        UnauthorizedException: 未携带令牌,或令牌无效、已过期
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise UnauthorizedException("请先登录")
+    claims = session_tokens.verify(token.strip())
+    if claims is None:
+        raise UnauthorizedException("登录已过期,请重新登录")
+    return claims
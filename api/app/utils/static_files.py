@@ -0,0 +1,439 @@
+# 上传文件的静态文件服务
+import asyncio
+import mimetypes
+import os
+import re
+import stat
+from collections import OrderedDict
+from email.utils import formatdate, parsedate
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+# Python 3.11 之前的 mimetypes 不认识 .webp
+mimetypes.add_type("image/webp", ".webp")
+
+# 可能存在 WebP 版本的原图格式
+WEBP_SOURCE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif"}
+
+# 可能存在预压缩版本(.br/.gz)的文件格式,图片本身已压缩,不查找预压缩版本
+COMPRESSIBLE_EXTENSIONS = {".svg", ".txt", ".json", ".css", ".js", ".html"}
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# 按内容哈希命名的文件(ab/cd/<sha256>.<ext>,以及同目录下由它生成的缩略图和 WebP 版本)
+# 同一URL的内容不会变化,可以长期缓存
+CACHE_CONTROL = os.getenv("UPLOAD_CACHE_CONTROL", "public, max-age=31536000, immutable")
+# 其他文件(客服二维码等固定文件名、旧版 events/ thumbnails/ 下的文件)可能被原地覆盖,
+# 只短期缓存,过期后凭 ETag 重新验证
+MUTABLE_CACHE_CONTROL = os.getenv("UPLOAD_MUTABLE_CACHE_CONTROL", "public, max-age=300")
+
+# 内容哈希路径: 两级目录为哈希的前 4 位,可带缩略图宽度后缀(_400w)
+_HASHED_PATH = re.compile(r"^([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}(?:_\d+w)?\.[A-Za-z0-9]+$")
+
+# 小文件内存缓存: 总大小和单个文件大小上限(字节)
+MEMORY_CACHE_SIZE = int(os.getenv("UPLOAD_MEMORY_CACHE_SIZE", str(16 * 1024 * 1024)))
+MEMORY_CACHE_MAX_FILE = int(os.getenv("UPLOAD_MEMORY_CACHE_MAX_FILE", str(256 * 1024)))
+
+# nginx 内部 location 前缀(如 /_uploads/),设置后文件内容交给 nginx 发送,
+# 配置见仓库根目录的 nginx-uploads-accel.conf;为空时由应用自己发送
+ACCEL_REDIRECT_PREFIX = os.getenv("UPLOAD_ACCEL_REDIRECT", "")
+
+
+def webp_sibling(path: str) -> Optional[str]:
+    """
+    返回图片对应的 WebP 文件路径
+
+    Args:
+        path: 原图路径或URL
+
+    Returns:
+        同目录下同名的 .webp 路径,原图格式不支持时返回 None
+    """
+    root, ext = os.path.splitext(path)
+    if ext.lower() not in WEBP_SOURCE_EXTENSIONS:
+        return None
+    return root + ".webp"
+
+
+def cache_control(path: str) -> str:
+    """
+    返回上传文件的 Cache-Control
+
+    Args:
+        path: 请求的文件路径(相对上传目录)
+
+    Returns:
+        内容哈希路径返回长期缓存,其他路径返回短期缓存
+    """
+    if _HASHED_PATH.match(path.replace(os.sep, "/")):
+        return CACHE_CONTROL
+    return MUTABLE_CACHE_CONTROL
+
+
+def _explicitly_accepts(header: str, token: str) -> bool:
+    """判断 Accept 类请求头是否明确列出了 token 且 q 大于 0"""
+    for item in header.split(","):
+        value, _, params = item.partition(";")
+        if value.strip().lower() != token:
+            continue
+        for param in params.split(";"):
+            name, _, q = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    return float(q) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def accepts_webp(accept: str) -> bool:
+    """
+    判断客户端是否声明支持 WebP
+
+    只认明确列出的 image/webp;*/* 和 image/* 不算,不少旧客户端
+    会发送通配符但并不能解码 WebP
+
+    Args:
+        accept: Accept 请求头
+    """
+    return _explicitly_accepts(accept, "image/webp")
+
+
+class RangeNotSatisfiable(Exception):
+    """请求的字节范围超出文件大小"""
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析 Range 请求头
+
+    只支持单个字节范围;多段范围和无法识别的格式按规范忽略,返回完整文件
+
+    Args:
+        header: Range 请求头,如 bytes=0-1023、bytes=1024-、bytes=-500
+        size: 文件大小
+
+    Returns:
+        (起始位置, 结束位置),均包含在内;应返回完整文件时为 None
+
+    Raises:
+        RangeNotSatisfiable: 范围超出文件大小
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+        return None
+
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            # 结束位置在起始位置之前,语法无效,按 RFC 9110 忽略 Range
+            return None
+        # 先判断起始位置: bytes=N- 在 N 超出文件时结束位置会被当作 size - 1,
+        # 不能据此当作无效范围返回完整文件
+        if start >= size:
+            raise RangeNotSatisfiable()
+        end = int(last) if last else size - 1
+    else:
+        # bytes=-N 表示最后 N 个字节
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        start = max(size - length, 0)
+        end = size - 1
+
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def strong_etag(stat_result: os.stat_result) -> str:
+    """
+    由文件的 inode、修改时间和大小生成强 ETag
+
+    同一URL下的原图和 WebP 版本是不同的文件,ETag 也不同
+    """
+    return f'"{stat_result.st_ino:x}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+class MemoryCache:
+    """
+    小文件内存缓存
+
+    按最近使用顺序淘汰(LRU),总大小不超过上限。文件修改时间或大小
+    变化后缓存自动失效。只在事件循环中读写,不需要加锁
+    """
+
+    def __init__(self, max_size: int, max_file_size: int):
+        """
+        Args:
+            max_size: 缓存总大小上限(字节)
+            max_file_size: 可缓存的单个文件大小上限(字节)
+        """
+        self.max_size = max_size
+        self.max_file_size = max_file_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[str, Tuple[Tuple[int, int], bytes]]" = OrderedDict()
+
+    def get(self, path: str, stat_result: os.stat_result) -> Optional[bytes]:
+        """读取缓存,未缓存或文件已变化时返回 None"""
+        item = self._items.get(path)
+        if item is not None and item[0] == (stat_result.st_mtime_ns, stat_result.st_size):
+            self._items.move_to_end(path)
+            self.hits += 1
+            return item[1]
+        self._discard(path)
+        self.misses += 1
+        return None
+
+    def put(self, path: str, stat_result: os.stat_result, body: bytes) -> None:
+        """写入缓存,超出总大小时淘汰最久未使用的文件"""
+        if len(body) > self.max_file_size or len(body) > self.max_size:
+            return
+        self._discard(path)
+        self._items[path] = ((stat_result.st_mtime_ns, stat_result.st_size), body)
+        self.size += len(body)
+        while self.size > self.max_size:
+            _, (_, evicted) = self._items.popitem(last=False)
+            self.size -= len(evicted)
+
+    def _discard(self, path: str) -> None:
+        item = self._items.pop(path, None)
+        if item is not None:
+            self.size -= len(item[1])
+
+
+class FileRangeResponse(FileResponse):
+    """从文件的指定位置开始发送指定长度的内容"""
+
+    def __init__(
+        self,
+        path: str,
+        offset: int,
+        length: int,
+        status_code: int,
+        headers: Dict[str, str],
+        media_type: str
+    ):
+        super().__init__(path, status_code=status_code, headers=headers, media_type=media_type)
+        self.offset = offset
+        self.length = length
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.offset)
+            remaining = self.length
+            while True:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                remaining -= len(chunk)
+                more_body = remaining > 0 and bool(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                if not more_body:
+                    break
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+class UploadStaticFiles(StaticFiles):
+    """
+    上传文件服务
+
+    - 按内容哈希命名的文件带长期缓存头(Cache-Control: immutable),
+      其他文件只短期缓存;响应都带强 ETag,条件请求返回 304
+    - 支持单段 Range 请求(206/416)
+    - 请求 JPEG/PNG/GIF 时,如果客户端支持 WebP 且存在更小的 WebP 版本,
+      在同一URL下返回 WebP;文本类文件存在 .br/.gz 预压缩版本时按
+      Accept-Encoding 返回。这类响应都带 Vary,避免缓存把不支持的版本返回给客户端
+    - 轮播图等频繁访问的小文件缓存在内存中(LRU),不必每次读取磁盘
+    - 设置 accel_redirect_prefix 后,应用只做路径检查和版本选择,
+      通过 X-Accel-Redirect 让 nginx 用 sendfile 发送文件,
+      条件请求和 Range 也由 nginx 处理
+    """
+
+    def __init__(self, *args, accel_redirect_prefix: str = ACCEL_REDIRECT_PREFIX, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.accel_redirect_prefix = accel_redirect_prefix
+        self.memory_cache = MemoryCache(MEMORY_CACHE_SIZE, MEMORY_CACHE_MAX_FILE)
+
+    def _candidates(self, path: str, request_headers: Headers) -> Tuple[List[Tuple[str, Optional[str]]], List[str]]:
+        """
+        按优先级列出可返回的文件
+
+        Returns:
+            ([(文件路径, Content-Encoding)], Vary 请求头列表)
+        """
+        candidates = []
+        vary = []
+        webp_path = webp_sibling(path)
+        if webp_path is not None:
+            vary.append("Accept")
+            if accepts_webp(request_headers.get("accept", "")):
+                candidates.append((webp_path, None))
+        elif os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+            vary.append("Accept-Encoding")
+            accept_encoding = request_headers.get("accept-encoding", "")
+            for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+                if _explicitly_accepts(accept_encoding, encoding):
+                    candidates.append((path + suffix, encoding))
+        candidates.append((path, None))
+        return candidates, vary
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+
+        request_headers = Headers(scope=scope)
+        candidates, vary = self._candidates(path, request_headers)
+        for candidate, content_encoding in candidates:
+            try:
+                full_path, stat_result = await asyncio.to_thread(self.lookup_path, candidate)
+            except PermissionError:
+                raise HTTPException(status_code=401)
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                break
+        else:
+            raise HTTPException(status_code=404)
+
+        if self.accel_redirect_prefix:
+            return self.accel_redirect_response(path, candidate, content_encoding, vary)
+
+        headers = {
+            "cache-control": cache_control(path),
+            "etag": strong_etag(stat_result),
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+            "accept-ranges": "bytes",
+        }
+        if vary:
+            headers["vary"] = ", ".join(vary)
+        if self.is_not_modified(Headers(headers), request_headers):
+            return NotModifiedResponse(Headers(headers))
+        if content_encoding:
+            headers["content-encoding"] = content_encoding
+        return await self.file_body_response(full_path, stat_result, scope, headers)
+
+    def accel_redirect_response(
+        self,
+        requested: str,
+        path: str,
+        content_encoding: Optional[str],
+        vary: List[str]
+    ) -> Response:
+        """
+        返回 X-Accel-Redirect 响应,由 nginx 发送文件
+
+        nginx 会保留 Content-Type 和 Cache-Control;Vary 和 Content-Encoding
+        不会保留,分别通过 Vary 和 X-Upload-Content-Encoding 交给 nginx 配置加回
+
+        Args:
+            requested: 请求的文件(相对上传目录),决定缓存时长
+            path: 已选定的文件(相对上传目录)
+            content_encoding: 预压缩版本的编码
+            vary: Vary 请求头列表
+        """
+        location = self.accel_redirect_prefix.rstrip("/") + "/" + quote(path.replace(os.sep, "/"))
+        headers = {
+            "x-accel-redirect": location,
+            "cache-control": cache_control(requested),
+        }
+        if vary:
+            headers["vary"] = ", ".join(vary)
+        if content_encoding:
+            headers["x-upload-content-encoding"] = content_encoding
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        return Response(b"", headers=headers, media_type=media_type)
+
+    async def file_body_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        headers: Dict[str, str]
+    ) -> Response:
+        """
+        按 Range 请求头返回完整文件(200)或其中一段(206)
+
+        Args:
+            full_path: 文件路径
+            stat_result: 文件状态
+            scope: 请求 scope
+            headers: 已确定的响应头(缓存、ETag、Vary 等)
+        """
+        request_headers = Headers(scope=scope)
+        media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        size = stat_result.st_size
+        status_code = 200
+        start, end = 0, size - 1
+
+        range_header = request_headers.get("range")
+        if range_header and self._if_range_matches(request_headers, headers):
+            try:
+                byte_range = parse_range(range_header, size)
+            except RangeNotSatisfiable:
+                return Response(status_code=416, headers={
+                    "content-range": f"bytes */{size}",
+                    "accept-ranges": "bytes",
+                })
+            if byte_range is not None:
+                start, end = byte_range
+                status_code = 206
+                headers["content-range"] = f"bytes {start}-{end}/{size}"
+        headers["content-length"] = str(end - start + 1)
+
+        if scope["method"] == "HEAD":
+            return Response(b"", status_code=status_code, headers=headers, media_type=media_type)
+
+        if size <= self.memory_cache.max_file_size:
+            body = self.memory_cache.get(full_path, stat_result)
+            if body is None:
+                body = await asyncio.to_thread(_read_file, full_path)
+                # 读取期间文件被替换时不缓存,本次仍按读到的内容返回
+                if len(body) != size:
+                    return Response(body, headers=self._full_headers(headers, len(body)), media_type=media_type)
+                self.memory_cache.put(full_path, stat_result, body)
+            return Response(body[start:end + 1], status_code=status_code, headers=headers, media_type=media_type)
+
+        return FileRangeResponse(full_path, start, end - start + 1, status_code, headers, media_type)
+
+    @staticmethod
+    def _full_headers(headers: Dict[str, str], size: int) -> Dict[str, str]:
+        """去掉范围相关的响应头,改为返回完整内容"""
+        headers = {name: value for name, value in headers.items() if name != "content-range"}
+        headers["content-length"] = str(size)
+        return headers
+
+    @staticmethod
+    def _if_range_matches(request_headers: Headers, response_headers: Dict[str, str]) -> bool:
+        """
+        If-Range 条件是否满足(未携带时视为满足)
+
+        值可以是 ETag(强比较)或日期;不满足时忽略 Range 返回完整文件
+        """
+        if_range = request_headers.get("if-range")
+        if if_range is None:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            return if_range == response_headers["etag"]
+        return parsedate(if_range) == parsedate(response_headers["last-modified"])
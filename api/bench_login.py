@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+登录接口延迟测试脚本
+
+在本地启动模拟的微信接口(wechat_stub_server.py),在临时目录中启动应用,
+并发调用 POST /api/auth/login,统计延迟分布。同时对比每次新建 httpx 客户端
+与共享连接池调用微信接口的耗时。最后用同一个 code 同时发起数百次首次登录,
+检查全部成功且只创建了一个用户(有失败时退出码为 1)
+
+用法:
+    python bench_login.py                               # 默认 2000 次登录,并发 50
+    python bench_login.py --requests 5000 --concurrency 200 --latency-ms 50
+    python bench_login.py --race 500                    # 同一用户同时首次登录 500 次
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+import uvicorn
+
+from wechat_stub_server import create_app
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def start_stub(latency_ms: float) -> str:
+    """在后台线程中启动模拟的微信接口,返回地址"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(latency_ms), host="127.0.0.1", port=port, log_level="warning"
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def report(name: str, timings, elapsed: float, failures: int = 0):
+    """输出延迟分布(毫秒)和吞吐量"""
+    timings = sorted(timings)
+    quantiles = statistics.quantiles(timings, n=100)
+    print(
+        f"  {name:<20}{statistics.median(timings):>9.2f}ms{quantiles[94]:>9.2f}ms"
+        f"{quantiles[98]:>9.2f}ms{len(timings) / elapsed:>10.0f}/s{failures:>8}"
+    )
+
+
+async def run_concurrently(count: int, concurrency: int, call):
+    """以固定并发执行 count 次 call(i),返回 (每次耗时, 总耗时, 失败次数)"""
+    timings = []
+    failures = 0
+    next_index = iter(range(count))
+
+    async def worker():
+        nonlocal failures
+        for i in next_index:
+            start = time.perf_counter()
+            try:
+                await call(i)
+            except Exception:
+                failures += 1
+            timings.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return timings, time.perf_counter() - start, failures
+
+
+async def bench_wechat_calls(base_url: str, count: int, concurrency: int):
+    """对比每次新建客户端和共享客户端调用微信接口"""
+    from app.services.wechat_client import WeChatClient
+
+    async def fresh_client(i):
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{base_url}/sns/jscode2session", params={"js_code": f"code-{i}"})
+            response.raise_for_status()
+
+    shared = WeChatClient(base_url, 3, 5, concurrency, concurrency, 5)
+    shared.start()
+
+    async def shared_client(i):
+        await shared.get_json("/sns/jscode2session", {"js_code": f"code-{i}"})
+
+    try:
+        report("每次新建客户端", *await run_concurrently(count, concurrency, fresh_client))
+        report("共享连接池", *await run_concurrently(count, concurrency, shared_client))
+    finally:
+        await shared.aclose()
+
+
+async def bench_login(count: int, concurrency: int, users: int):
+    """并发调用登录接口"""
+    from main import app
+
+    async def login(i):
+        response = await client.post("/api/auth/login", json={"code": f"user-{i % users}"})
+        if response.status_code != 200:
+            raise RuntimeError(response.text)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            report("POST /api/auth/login", *await run_concurrently(count, concurrency, login))
+
+
+async def check_first_login_race(count: int) -> bool:
+    """同一用户同时首次登录 count 次,返回是否全部成功且只有一条用户记录"""
+    from sqlalchemy import func, select
+
+    from main import app
+    from app.models.user import User
+    from app.utils.database import SessionLocal
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            responses = await asyncio.gather(*(
+                client.post("/api/auth/login", json={"code": "race-first-login"}) for _ in range(count)
+            ))
+
+    failures = [response for response in responses if response.status_code != 200]
+    users = [response.json()["data"] for response in responses if response.status_code == 200]
+    user_ids = {user["id"] for user in users}
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(func.count()).select_from(User).where(User.open_id.in_({user["open_id"] for user in users}))
+        ).scalar()
+    finally:
+        db.close()
+    ok = not failures and len(user_ids) == 1 and rows == 1
+    print(f"\n同一用户同时首次登录 {count} 次: 失败 {len(failures)} 次,"
+          f"返回的用户ID {sorted(user_ids)},用户记录 {rows} 条 -> {'通过' if ok else '失败'}")
+    if failures:
+        print(f"  失败示例: {failures[0].status_code} {failures[0].text}")
+    return ok
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="登录接口延迟测试")
+    parser.add_argument("--requests", type=int, default=2000, help="请求次数")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发数")
+    parser.add_argument("--users", type=int, default=500, help="不同用户数(其余为重复登录)")
+    parser.add_argument("--latency-ms", type=float, default=20, help="模拟微信接口的响应延迟(毫秒)")
+    parser.add_argument("--race", type=int, default=300, help="同一用户同时首次登录的次数")
+    args = parser.parse_args()
+
+    base_url = start_stub(args.latency_ms)
+    with tempfile.TemporaryDirectory() as tmp:
+        # 在临时目录中使用独立的数据库和上传目录
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'data', 'bench.db')}"
+        os.environ["WECHAT_API_BASE"] = base_url
+        os.environ.setdefault("WECHAT_MAX_CONCURRENCY", str(args.concurrency))
+        os.chdir(tmp)
+        os.makedirs("uploads")
+
+        print("=" * 72)
+        print(f"登录延迟测试 (请求 {args.requests} 次,并发 {args.concurrency},"
+              f"微信接口延迟 {args.latency_ms:g}ms)")
+        print("=" * 72)
+        print(f"  {'':<20}{'p50':>11}{'p95':>11}{'p99':>11}{'吞吐量':>10}{'失败':>7}")
+        asyncio.run(bench_wechat_calls(base_url, args.requests, args.concurrency))
+        asyncio.run(bench_login(args.requests, args.concurrency, args.users))
+        ok = asyncio.run(check_first_login_race(args.race))
+        os.chdir(ROOT)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
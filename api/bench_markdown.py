@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Markdown 渲染回归检查与性能对比脚本
+
+对比旧版正则链 (legacy_markdown_to_html) 与当前的 markdown_to_html:
+- 回归语料: markdown_corpus.json 中每条输入的当前输出必须与记录一致
+- 等价性: 随机生成只含旧版语法的规范文档,两者输出必须完全相同
+- 健壮性: 随机生成含未闭合符号、嵌套和转义的文档,统计标签未正确配对的输出
+- 性能: 不同大小的文章以及病态输入的渲染耗时
+
+用法:
+    python bench_markdown.py            # 全部检查并输出性能对比
+    python bench_markdown.py --update   # 渲染规则有意变化后,重新生成回归语料
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import time
+from html.parser import HTMLParser
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.markdown_helper import markdown_to_html
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "markdown_corpus.json")
+CORPUS_SEED = 20260101
+CORPUS_SIZE = 200
+FUZZ_ROUNDS = 3000
+
+WORDS = ["比赛", "主队", "客队", "状态", "赛季", "进球", "防守", "Messi", "goal", "2025"]
+# 生成病态文档用的片段,包含各种未闭合和交错的符号
+FRAGMENTS = [
+    "*", "**", "***", "_", "__", "`", "``", "[", "]", "(", ")", "![", "](", "\\", "\\*",
+    "<", ">", "&", "&amp;", "# ", "- ", "1. ", "> ", "```", "---", " ", " ", "\n", "\n\n",
+    "比赛", "goal", "a_b", "x.png", "https://example.com/a_b",
+]
+
+
+def legacy_markdown_to_html(markdown_content: str) -> str:
+    """旧版实现: 多遍正则替换(仅用于对比)"""
+    if not markdown_content:
+        return ""
+    html = markdown_content.replace('\r\n', '\n')
+    html = re.sub(r'^### (.*?)$', r'<h3>\1</h3>', html, flags=re.MULTILINE)
+    html = re.sub(r'^## (.*?)$', r'<h2>\1</h2>', html, flags=re.MULTILINE)
+    html = re.sub(r'^# (.*?)$', r'<h1>\1</h1>', html, flags=re.MULTILINE)
+    html = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', html)
+    html = re.sub(r'(?<!\w)__(.+?)__(?!\w)', r'<strong>\1</strong>', html)
+    html = re.sub(r'\*(.*?)\*', r'<em>\1</em>', html)
+    html = re.sub(r'(?<!\w)_(.+?)_(?!\w)', r'<em>\1</em>', html)
+    html = re.sub(r'!\[(.*?)\]\((.*?)\)', r'<img src="\2" alt="\1" />', html)
+    html = re.sub(r'\[(.*?)\]\((.*?)\)', r'<a href="\2">\1</a>', html)
+    paragraphs = html.split('\n\n')
+    html_paragraphs = []
+    for p in paragraphs:
+        p = p.strip()
+        if p and not re.match(r'<h[1-6]>', p):
+            p = '<p>' + p.replace('\n', '<br />') + '</p>'
+        html_paragraphs.append(p)
+    return '\n'.join(html_paragraphs)
+
+
+class TagBalanceChecker(HTMLParser):
+    """检查渲染器生成的标签是否正确配对(原文中的 HTML 标签原样保留,不参与检查)"""
+
+    TAGS = {
+        "p", "h1", "h2", "h3", "h4", "h5", "h6", "strong", "em", "a",
+        "code", "pre", "ul", "ol", "li", "blockquote",
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.stack = []
+        self.ok = True
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.TAGS:
+            self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in self.TAGS:
+            return
+        if not self.stack or self.stack.pop() != tag:
+            self.ok = False
+
+
+def is_balanced(html: str) -> bool:
+    checker = TagBalanceChecker()
+    try:
+        checker.feed(html)
+        checker.close()
+    except AssertionError:
+        # 旧版会输出 <![ 这类无法解析的片段
+        return False
+    return checker.ok and not checker.stack
+
+
+def random_inline(rng: random.Random) -> str:
+    """只使用旧版支持的语法,且符号都正确闭合"""
+    word = rng.choice(WORDS)
+    k = rng.random()
+    if k < 0.1:
+        return f"**{word}**"
+    if k < 0.2:
+        return f"*{word}*"
+    if k < 0.25:
+        return f"_{word}_"
+    if k < 0.3:
+        return f"__{word}__"
+    if k < 0.35:
+        return f"[{word}](https://example.com/{rng.choice(WORDS)}_{rng.randint(1, 99)})"
+    if k < 0.4:
+        return f"![{word}](/uploads/events/20251229_1350{rng.randint(0, 99):02d}_ab.png)"
+    return word
+
+
+def random_wellformed(rng: random.Random) -> str:
+    """生成只含旧版语法的规范文档"""
+    blocks = []
+    for _ in range(rng.randint(1, 6)):
+        if rng.random() < 0.2:
+            words = " ".join(random_inline(rng) for _ in range(rng.randint(1, 3)))
+            blocks.append("#" * rng.randint(1, 3) + " " + words)
+        else:
+            lines = [
+                " ".join(random_inline(rng) for _ in range(rng.randint(1, 8)))
+                for _ in range(rng.randint(1, 3))
+            ]
+            blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def random_fuzz(rng: random.Random) -> str:
+    """由片段随机拼接的文档,覆盖未闭合、交错和转义的情况"""
+    return "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 40)))
+
+
+def build_corpus():
+    """生成回归语料: 规范文档和随机文档各占一半,记录当前输出"""
+    rng = random.Random(CORPUS_SEED)
+    corpus = []
+    for i in range(CORPUS_SIZE):
+        markdown = random_wellformed(rng) if i % 2 == 0 else random_fuzz(rng)
+        corpus.append({"markdown": markdown, "html": markdown_to_html(markdown)})
+    return corpus
+
+
+def check_corpus() -> bool:
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = json.load(f)
+    failures = [case for case in corpus if markdown_to_html(case["markdown"]) != case["html"]]
+    print(f"回归语料: {len(corpus) - len(failures)}/{len(corpus)} 通过")
+    for case in failures[:5]:
+        print(f"  输入: {case['markdown']!r}")
+        print(f"  期望: {case['html']!r}")
+        print(f"  实际: {markdown_to_html(case['markdown'])!r}")
+    return not failures
+
+
+def check_equivalence() -> bool:
+    rng = random.Random(1)
+    mismatches = 0
+    for _ in range(FUZZ_ROUNDS):
+        markdown = random_wellformed(rng)
+        if markdown_to_html(markdown) != legacy_markdown_to_html(markdown):
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"  不一致: {markdown!r}")
+    print(f"旧版语法等价性: {FUZZ_ROUNDS - mismatches}/{FUZZ_ROUNDS} 输出相同")
+    return mismatches == 0
+
+
+def check_robustness() -> bool:
+    rng = random.Random(2)
+    legacy_bad = current_bad = 0
+    for _ in range(FUZZ_ROUNDS):
+        markdown = random_fuzz(rng)
+        if not is_balanced(legacy_markdown_to_html(markdown)):
+            legacy_bad += 1
+        if not is_balanced(markdown_to_html(markdown)):
+            current_bad += 1
+            if current_bad <= 3:
+                print(f"  标签未配对: {markdown!r}")
+    print(f"随机文档标签未配对: 旧版 {legacy_bad}/{FUZZ_ROUNDS}, 当前 {current_bad}/{FUZZ_ROUNDS}")
+    return current_bad == 0
+
+
+def build_article(size: int) -> str:
+    """生成接近真实赛事正文的文章"""
+    rng = random.Random(size)
+    blocks = []
+    total = 0
+    while total < size:
+        k = rng.random()
+        if k < 0.1:
+            block = f"## 第{len(blocks)}节 比赛前瞻"
+        elif k < 0.2:
+            block = f"![图片](/uploads/events/20251229_135053_{len(blocks):04d}.png)"
+        elif k < 0.25:
+            block = "\n".join(f"- **{rng.choice(WORDS)}** 近期{rng.choice(WORDS)}表现稳定" for _ in range(3))
+        else:
+            block = (
+                "本场比赛双方实力接近，**主队**近期状态火热，*客队*核心球员伤愈复出。"
+                "详见[赛前分析](https://example.com/a)。历史交锋主队占优，预计比赛节奏较快。\n"
+                "防守端存在明显漏洞，中场控制力是胜负关键。"
+            )
+        blocks.append(block)
+        total += len(block) + 2
+    return "\n\n".join(blocks)
+
+
+def measure(func, text: str, repeat: int) -> float:
+    """返回多次运行中最快一次的耗时(毫秒)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run_benchmark():
+    print("\n性能对比 (取最快一次, 毫秒)")
+    print(f"{'输入':<24}{'大小':>10}{'旧版':>12}{'当前':>12}{'加速':>10}")
+    cases = [(f"文章 {size // 1000}KB", build_article(size), 30) for size in (2000, 10000, 50000)]
+    # 大量未闭合的方括号: 旧版每个 [ 都向后扫描整行,耗时与长度平方成正比
+    cases.append(("病态: 未闭合 [x] 10KB", "[x] " * 2500, 3))
+    cases.append(("病态: 未闭合 _x 10KB", " _x" * 3400, 3))
+    for name, text, repeat in cases:
+        legacy = measure(legacy_markdown_to_html, text, repeat)
+        current = measure(markdown_to_html, text, repeat)
+        print(f"{name:<24}{len(text):>10}{legacy:>12.2f}{current:>12.2f}{legacy / current:>9.1f}x")
+
+
+def main():
+    if "--update" in sys.argv:
+        corpus = build_corpus()
+        with open(CORPUS_PATH, "w", encoding="utf-8") as f:
+            json.dump(corpus, f, ensure_ascii=False, indent=1)
+            f.write("\n")
+        print(f"已写入 {len(corpus)} 条回归语料: {CORPUS_PATH}")
+        return
+
+    passed = all([check_corpus(), check_equivalence(), check_robustness()])
+    run_benchmark()
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
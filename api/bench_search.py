@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+关键词搜索性能对比脚本
+
+在临时 SQLite 数据库中生成指定数量的赛事,对比 LIKE 与 FTS5 查询耗时
+
+用法:
+    python bench_search.py                  # 默认 10000 100000 1000000 条
+    python bench_search.py 10000 50000      # 自定义数据量
+"""
+
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.search_service import tokenize_for_index, build_match_query
+
+TEAMS = [
+    "曼联", "利物浦", "切尔西", "阿森纳", "曼城", "热刺", "皇马", "巴萨",
+    "拜仁", "多特蒙德", "尤文图斯", "国际米兰", "AC米兰", "巴黎圣日耳曼",
+    "上海海港", "山东泰山", "北京国安", "成都蓉城", "广州队", "武汉三镇",
+]
+LEAGUES = ["英超", "西甲", "德甲", "意甲", "法甲", "中超", "欧冠", "亚冠"]
+PHRASES = [
+    "本场比赛双方实力接近", "主队近期状态火热", "客队核心球员伤愈复出",
+    "历史交锋主队占优", "预计比赛节奏较快", "防守端存在明显漏洞",
+    "中场控制力是胜负关键", "定位球可能成为突破口", "门将发挥稳定",
+]
+# 稀有关键词约出现在 0.1% 的赛事中,更接近真实搜索的选择性
+RARE_TEAM = "宝利联队"
+KEYWORDS = ["曼联", "利物浦 英超", "伤愈复出", RARE_TEAM, "不存在的球队"]
+REPEAT = 5
+
+
+def build_database(path: str, size: int) -> sqlite3.Connection:
+    """生成测试数据库"""
+    rng = random.Random(size)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE events (id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, "
+        "date DATE NOT NULL, content VARCHAR(50000))"
+    )
+    conn.execute("CREATE INDEX ix_events_date ON events (date)")
+    conn.execute("CREATE VIRTUAL TABLE events_fts USING fts5(title, content, tokenize = 'unicode61')")
+
+    batch = []
+    for i in range(1, size + 1):
+        home, away = rng.sample(TEAMS, 2)
+        if rng.random() < 0.001:
+            home = RARE_TEAM
+        title = f"{rng.choice(LEAGUES)} - {home} vs {away}"
+        content = "。".join(rng.choice(PHRASES) for _ in range(rng.randint(5, 20)))
+        day = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        batch.append((i, title, day, content))
+        if len(batch) >= 10000:
+            _insert(conn, batch)
+            batch = []
+    if batch:
+        _insert(conn, batch)
+    conn.commit()
+    return conn
+
+
+def _insert(conn: sqlite3.Connection, rows):
+    conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?)", rows)
+    conn.executemany(
+        "INSERT INTO events_fts(rowid, title, content) VALUES (?, ?, ?)",
+        [(r[0], tokenize_for_index(r[1]), tokenize_for_index(r[3])) for r in rows]
+    )
+
+
+def measure(conn: sqlite3.Connection, sql: str, params) -> float:
+    """返回多次执行的耗时中位数(毫秒)"""
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run(size: int):
+    """对指定数据量执行对比"""
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        conn = build_database(os.path.join(tmp, "bench.db"), size)
+        print(f"\n数据量 {size} 条 (生成耗时 {time.perf_counter() - start:.1f}s)")
+        print(f"  {'关键词':<12}{'LIKE 标题':>12}{'LIKE 标题+正文':>16}{'FTS5 按日期':>14}{'FTS5 按相关度':>16}")
+
+        for keyword in KEYWORDS:
+            terms = keyword.split()
+            like_title = " AND ".join("title LIKE ?" for _ in terms)
+            like_all = " AND ".join("(title LIKE ? OR content LIKE ?)" for _ in terms)
+            patterns = [f"%{t}%" for t in terms]
+
+            t_title = measure(
+                conn,
+                f"SELECT id FROM events WHERE {like_title} ORDER BY date DESC, id DESC LIMIT 20",
+                patterns
+            )
+            t_all = measure(
+                conn,
+                f"SELECT id FROM events WHERE {like_all} ORDER BY date DESC, id DESC LIMIT 20",
+                [p for p in patterns for _ in (0, 1)]
+            )
+            t_fts_date = measure(
+                conn,
+                "SELECT id FROM events WHERE id IN (SELECT rowid FROM events_fts WHERE events_fts MATCH ?) "
+                "ORDER BY date DESC, id DESC LIMIT 20",
+                [build_match_query(keyword)]
+            )
+            t_fts_rank = measure(
+                conn,
+                "SELECT rowid FROM events_fts WHERE events_fts MATCH ? "
+                "ORDER BY bm25(events_fts, 10.0, 1.0) LIMIT 20",
+                [build_match_query(keyword)]
+            )
+            print(
+                f"  {keyword:<12}{t_title:>10.2f}ms{t_all:>14.2f}ms"
+                f"{t_fts_date:>12.2f}ms{t_fts_rank:>14.2f}ms"
+            )
+        conn.close()
+
+
+def main():
+    """主函数"""
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    print("=" * 60)
+    print("关键词搜索性能对比 (LIKE vs FTS5)")
+    print("=" * 60)
+    for size in sizes:
+        run(size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
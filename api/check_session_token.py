@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+会话令牌校验检查脚本
+
+用临时密钥签发和篡改各种令牌,检查正常令牌能通过验证,
+而格式错误、包含非 ASCII 字符、签名有效但载荷结构不对的令牌
+都被拒绝(接口返回 401 而不是 500)。有失败时退出码为 1
+
+用法:
+    python check_session_token.py
+"""
+
+import json
+import os
+import sys
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils.error_handlers import base_exception_handler
+from app.utils.exceptions import BaseAPIException
+from app.utils.session_token import (
+    SessionClaims, SessionTokens, _b64encode, get_current_session, parse_keys, session_tokens
+)
+
+
+def signed(tokens: SessionTokens, claims) -> str:
+    """用有效签名包装任意载荷"""
+    kid = tokens.signing_kid
+    payload = _b64encode(json.dumps(claims).encode("utf-8"))
+    return f"{kid}.{payload}.{tokens._sign(kid, payload)}"
+
+
+def main():
+    """运行检查"""
+    tokens = SessionTokens(parse_keys("k1:secret"), 3600)
+    valid, _ = tokens.issue(7, "oid")
+    kid = tokens.signing_kid
+    payload = valid.split(".")[1]
+
+    invalid = {
+        "非 ASCII 签名": f"{kid}.{payload}.\xe9",
+        "非 ASCII 载荷": f"{kid}.\xe9.{tokens._sign(kid, payload)}",
+        "非 ASCII 密钥ID": f"\xe9.{payload}.x",
+        "段数不对": "a.b",
+        "签名错误": valid[:-2] + ("AA" if not valid.endswith("AA") else "BB"),
+        "载荷不是 JSON": f"{kid}.{_b64encode(b'not json')}.{tokens._sign(kid, _b64encode(b'not json'))}",
+        "载荷是对象": signed(tokens, {"user_id": 7}),
+        "载荷元素不足": signed(tokens, [7, "oid"]),
+        "用户ID类型错误": signed(tokens, ["7", "oid", 2 ** 40]),
+        "用户ID为布尔值": signed(tokens, [True, "oid", 2 ** 40]),
+        "openid 类型错误": signed(tokens, [7, None, 2 ** 40]),
+        "过期时间类型错误": signed(tokens, [7, "oid", "never"]),
+        "已过期": tokens.issue(7, "oid", now=0)[0],
+    }
+
+    failures = 0
+    claims = tokens.verify(valid)
+    if claims is None or (claims.user_id, claims.open_id) != (7, "oid"):
+        print("失败: 正常令牌未通过验证")
+        failures += 1
+    for name, token in invalid.items():
+        try:
+            result = tokens.verify(token)
+        except Exception as e:
+            print(f"失败: {name} 抛出异常 {type(e).__name__}: {e}")
+            failures += 1
+            continue
+        if result is not None:
+            print(f"失败: {name} 通过了验证")
+            failures += 1
+
+    # 通过依赖项访问接口时应返回 401
+    app = FastAPI()
+    app.add_exception_handler(BaseAPIException, base_exception_handler)
+
+    @app.get("/me")
+    def me(session: SessionClaims = Depends(get_current_session)):
+        return {"user_id": session.user_id}
+
+    client = TestClient(app, raise_server_exceptions=False)
+    kid = session_tokens.signing_kid
+    for name, header in {
+        "非 ASCII 签名": f"Bearer {kid}.abc.\xe9",
+        "非 ASCII 载荷": f"Bearer {kid}.\xe9.abc",
+        "载荷结构错误": f"Bearer {signed(session_tokens, [1, 2, 3])}",
+    }.items():
+        status = client.get("/me", headers={"Authorization": header.encode("latin-1")}).status_code
+        if status != 401:
+            print(f"失败: 请求头 {name} 返回 {status}")
+            failures += 1
+
+    print(f"检查完成,失败 {failures} 项" if failures else "检查通过")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
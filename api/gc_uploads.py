@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+清理未使用的上传图片
+
+删除没有被赛事、轮播图或客服配置引用的图片记录和文件(含缩略图、WebP 版本),
+以及中断上传留下的临时文件。建议通过 cron 定期执行,例如每天凌晨:
+
+    0 3 * * * cd /app && python gc_uploads.py
+
+用法:
+    python gc_uploads.py                # 清理
+    python gc_uploads.py --dry-run      # 只统计,不删除
+    python gc_uploads.py --rebuild      # 先按现有数据重建引用表
+    python gc_uploads.py --grace-hours 48
+"""
+
+import argparse
+import sys
+import os
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.database import engine, init_db, SessionLocal
+from app.services.image_reference_service import ImageReferenceService
+
+UPLOAD_DIR = Path("uploads")
+
+
+def format_size(size: int) -> str:
+    """格式化字节数"""
+    return f"{size / 1024 / 1024:.2f}MB"
+
+
+def main():
+    """清理未使用的上传图片"""
+    parser = argparse.ArgumentParser(description="清理未使用的上传图片")
+    parser.add_argument("--dry-run", action="store_true", help="只统计,不删除")
+    parser.add_argument("--rebuild", action="store_true", help="清理前按现有数据重建引用表")
+    parser.add_argument("--grace-hours", type=float, default=24, help="最近多少小时内的上传不清理(默认 24)")
+    parser.add_argument("--batch-size", type=int, default=500, help="每批删除的记录数(默认 500)")
+    args = parser.parse_args()
+    
+    if not UPLOAD_DIR.is_dir():
+        print(f"✗ 上传目录不存在: {UPLOAD_DIR.resolve()}")
+        return 1
+    
+    print("正在清理未使用的上传图片..." if not args.dry_run else "正在统计未使用的上传图片(不删除)...")
+    
+    try:
+        init_db()
+        
+        if args.rebuild:
+            with engine.begin() as conn:
+                count = ImageReferenceService.rebuild(conn)
+            print(f"✓ 引用表重建完成,共 {count} 条引用")
+        else:
+            ImageReferenceService.ensure_index(engine)
+        
+        db = SessionLocal()
+        try:
+            result = ImageReferenceService.collect_garbage(
+                db,
+                UPLOAD_DIR,
+                grace_seconds=args.grace_hours * 3600,
+                batch_size=args.batch_size,
+                dry_run=args.dry_run
+            )
+        finally:
+            db.close()
+        
+        action = "可删除" if args.dry_run else "已删除"
+        print(f"✓ {action} {result['rows']} 条图片记录、{result['files']} 个文件,"
+              f"释放 {format_size(result['bytes'])}")
+        
+        print("上传目录占用:")
+        for name, size in sorted(ImageReferenceService.disk_usage(UPLOAD_DIR).items()):
+            print(f"  {name:<20} {format_size(size)}")
+    except Exception as e:
+        print(f"✗ 清理失败: {e}")
+        return 1
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
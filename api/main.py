@@ -1,9 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.staticfiles import StaticFiles
 from sqlalchemy.exc import SQLAlchemyError
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 from dotenv import load_dotenv
 import os
@@ -19,9 +19,20 @@ from app.routes import config
 from app.routes import admin as admin_routes
 from app.routes import upload
 from app.routes import banners
+from app.routes import jobs
 from app.utils.database import init_db, engine
 from app.admin import setup_admin
+from app.services.search_service import SearchService
+from app.services.view_count_service import view_count_buffer
+from app.services.unique_viewer_service import unique_viewer_tracker
+from app.services.last_login_service import last_login_buffer
+from app.services.image_service import ImageService
+from app.services.image_reference_service import ImageReferenceService
+from app.services.chunked_upload_service import ChunkedUploadService
+from app.services.job_queue import job_queue
+from app.services.wechat_client import wechat_client
 from app.utils.exceptions import BaseAPIException
+from app.utils.static_files import UploadStaticFiles
 from app.utils.error_handlers import (
     base_exception_handler,
     validation_exception_handler,
@@ -48,6 +59,15 @@ async def lifespan(app: FastAPI):
     init_db()
     logger.info("数据库初始化完成")
     
+    # 确保全文搜索索引存在(旧数据库首次启动时自动回填)
+    if SearchService.ensure_index(engine):
+        logger.info("全文搜索索引初始化完成")
+    
+    # 旧数据库首次启动时回填图片引用表
+    backfilled = ImageReferenceService.ensure_index(engine)
+    if backfilled is not None:
+        logger.info(f"图片引用表回填完成,共 {backfilled} 条引用")
+    
     # 确保数据和上传目录存在
     data_dir = Path("data")
     data_dir.mkdir(exist_ok=True)
@@ -61,8 +81,31 @@ async def lifespan(app: FastAPI):
     (upload_dir / "customer-service").mkdir(exist_ok=True)
     logger.info("上传目录初始化完成")
     
+    # 创建共享的微信接口客户端(连接池)
+    wechat_client.start()
+    
+    # 启动浏览量、独立访客和最后登录时间的定期写回任务、后台任务队列
+    # (上次关闭前未完成的任务会继续执行),以及过期分块上传会话的清理
+    background_tasks = [
+        asyncio.create_task(view_count_buffer.run()),
+        asyncio.create_task(unique_viewer_tracker.run()),
+        asyncio.create_task(last_login_buffer.run()),
+        asyncio.create_task(job_queue.run()),
+        asyncio.create_task(ChunkedUploadService.run(upload_dir)),
+    ]
+    
     yield
     # 关闭时执行
+    for task in background_tasks:
+        task.cancel()
+    flushed = await asyncio.to_thread(view_count_buffer.flush)
+    logger.info(f"浏览量缓冲已写回 {flushed} 次浏览")
+    await asyncio.to_thread(unique_viewer_tracker.flush)
+    logger.info("独立访客数据已写回")
+    flushed = await asyncio.to_thread(last_login_buffer.flush)
+    logger.info(f"最后登录时间已写回 {flushed} 个用户")
+    await asyncio.to_thread(ImageService.shutdown)
+    await wechat_client.aclose()
     logger.info("应用关闭")
 
 
@@ -97,9 +140,10 @@ app.include_router(config.router, prefix="/api/config", tags=["系统配置"])
 app.include_router(admin_routes.router, prefix="/api/admin", tags=["后台管理"])
 app.include_router(upload.router, prefix="/api/upload", tags=["文件上传"])
 app.include_router(banners.router, prefix="/api/banners", tags=["顶部滚动栏"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["后台任务"])
 
-# 挂载静态文件目录（上传的图片）
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# 挂载静态文件目录（上传的图片）,支持 JPEG/PNG 按 Accept 返回 WebP
+app.mount("/uploads", UploadStaticFiles(directory="uploads"), name="uploads")
 
 # 设置后台管理界面
 setup_admin(app, engine)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+重建赛事全文搜索索引脚本
+
+用于已有数据库首次启用全文搜索,或索引与数据不一致时手动重建
+"""
+
+import sys
+import os
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.database import engine, init_db
+from app.services.search_service import SearchService
+
+
+def main():
+    """重建全文搜索索引"""
+    print("正在重建全文搜索索引...")
+    
+    try:
+        init_db()
+        
+        if not SearchService.ensure_index(engine):
+            print("✗ 当前数据库不支持 FTS5,关键词搜索将使用 LIKE")
+            return 1
+        
+        count = SearchService.rebuild(engine)
+        print(f"✓ 全文搜索索引重建完成,共索引 {count} 条赛事")
+    except Exception as e:
+        print(f"✗ 重建失败: {e}")
+        return 1
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+赛事内容预渲染回填脚本
+
+为尚未预渲染或渲染版本过旧的赛事生成 content_html
+
+用法:
+    python render_event_content.py          # 只渲染缺失或版本过旧的赛事
+    python render_event_content.py --all    # 重新渲染全部赛事
+"""
+
+import sys
+import os
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import or_, select, text
+from sqlalchemy.orm import Session
+
+from app.utils.database import engine, init_db
+from app.utils.markdown_helper import RENDER_VERSION
+from app.services.event_service import EventService
+from app.models import Event
+
+# 每批处理的赛事数量
+BATCH_SIZE = 200
+
+
+def main():
+    """回填预渲染的内容 HTML"""
+    render_all = "--all" in sys.argv[1:]
+    print(f"正在预渲染赛事内容 (渲染版本 {RENDER_VERSION})...")
+    
+    try:
+        init_db()
+        
+        count = 0
+        last_id = 0
+        while True:
+            stmt = select(Event.id, Event.content).where(Event.id > last_id)
+            if not render_all:
+                stmt = stmt.where(or_(
+                    Event.content_render_version.is_(None),
+                    Event.content_render_version < RENDER_VERSION
+                ))
+            
+            with engine.begin() as conn:
+                rows = conn.execute(stmt.order_by(Event.id).limit(BATCH_SIZE)).fetchall()
+                if not rows:
+                    break
+                
+                # 图片尺寸和占位图通过同一连接查询
+                db = Session(bind=conn)
+                
+                # 直接执行 SQL,不触发 updated_at 自动更新
+                conn.execute(
+                    text(
+                        "UPDATE events SET content_html = :content_html, "
+                        "content_render_version = :version WHERE id = :id"
+                    ),
+                    [
+                        {
+                            "id": row.id,
+                            "content_html": EventService.render_content(db, row.content),
+                            "version": RENDER_VERSION
+                        }
+                        for row in rows
+                    ]
+                )
+            
+            count += len(rows)
+            last_id = rows[-1].id
+            print(f"  已渲染 {count} 条")
+        
+        print(f"✓ 预渲染完成,共处理 {count} 条赛事")
+    except Exception as e:
+        print(f"✗ 预渲染失败: {e}")
+        return 1
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本地模拟的微信 jscode2session 接口
+
+用于测试和压测登录流程,不需要真实的 AppID 和微信服务器。
+同一个 code 总是返回同一个 openid;code 为 invalid 时返回微信的错误码
+
+用法:
+    python wechat_stub_server.py                        # 监听 127.0.0.1:8081
+    python wechat_stub_server.py --latency-ms 80        # 模拟微信接口的响应延迟
+    WECHAT_API_BASE=http://127.0.0.1:8081 python main.py
+"""
+
+import argparse
+import asyncio
+import hashlib
+import sys
+
+from fastapi import FastAPI
+
+
+def create_app(latency_ms: float = 0) -> FastAPI:
+    """
+    创建模拟服务
+
+    Args:
+        latency_ms: 每个请求的模拟延迟(毫秒)
+    """
+    app = FastAPI(title="微信接口模拟服务")
+    app.state.requests = 0
+
+    @app.get("/sns/jscode2session")
+    async def jscode2session(appid: str = "", secret: str = "", js_code: str = "", grant_type: str = ""):
+        app.state.requests += 1
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if not js_code or js_code == "invalid":
+            return {"errcode": 40029, "errmsg": "invalid code"}
+        digest = hashlib.sha256(js_code.encode("utf-8")).hexdigest()
+        return {"openid": f"stub_{digest[:24]}", "session_key": digest[24:48]}
+
+    return app
+
+
+def main():
+    """启动模拟服务"""
+    parser = argparse.ArgumentParser(description="本地模拟的微信 jscode2session 接口")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8081, help="监听端口")
+    parser.add_argument("--latency-ms", type=float, default=0, help="模拟响应延迟(毫秒)")
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(args.latency_ms), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,12 @@
 import { View, Image, Text } from '@tarojs/components'
 import Taro from '@tarojs/taro'
-import { IEvent } from '../../types'
+import { IEventSummary } from '../../types'
 import { getImageUrl } from '../../utils/request'
 import './index.scss'
 
 interface EventCardProps {
-  event: IEvent
-  onClick?: (event: IEvent) => void
+  event: IEventSummary
+  onClick?: (event: IEventSummary) => void
 }
 
 /**
@@ -42,16 +42,25 @@ export default function EventCard({ event, onClick }: EventCardProps) {
     return count.toString()
   }
 
+  // 图片加载前先显示主色和低质量占位图
+  const meta = event.cover_meta
+  const placeholderStyle = meta?.placeholder
+    ? { background: `${meta.dominant_color} url(${meta.placeholder}) center / cover no-repeat` }
+    : meta?.dominant_color
+      ? { backgroundColor: meta.dominant_color }
+      : undefined
+
   return (
     <View className='event-card' onClick={handleClick}>
       {/* 缩略图 */}
-      <View className='event-card__image-wrapper'>
+      <View className='event-card__image-wrapper' style={placeholderStyle}>
         {event.cover_image ? (
           <Image
             className='event-card__image'
             src={getImageUrl(event.cover_image)}
             mode='aspectFill'
             lazyLoad
+            webp
           />
         ) : (
           <View className='event-card__placeholder'>
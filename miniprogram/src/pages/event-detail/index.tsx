@@ -4,7 +4,7 @@ import Taro, { useLoad, useRouter } from '@tarojs/taro'
 import { eventService, configService } from '../../services'
 import { IEvent, ICustomerService } from '../../types'
 import { getImageUrl } from '../../utils/request'
-import { parseMarkdown } from '../../utils/markdown'
+import { parseMarkdown, resolveRenderedHtml } from '../../utils/markdown'
 import './index.scss'
 
 export default function EventDetail() {
@@ -29,10 +29,8 @@ export default function EventDetail() {
       setEvent(eventData)
       setCustomerService(csData)
 
-      // 增加浏览量
-      eventService.increaseViewCount(id).catch(err => {
-        console.error('增加浏览量失败:', err)
-      })
+      // 上报浏览量
+      eventService.reportViews([id])
     } catch (err: any) {
       console.error('加载赛事详情失败:', err)
       setError(err.message || '加载失败')
@@ -106,7 +104,11 @@ export default function EventDetail() {
           </View>
 
           {/* 赛事内容 */}
-          {event.content && (
+          {event.content_html ? (
+            <View className='event-detail__body'>
+              <RichText nodes={resolveRenderedHtml(event.content_html)} />
+            </View>
+          ) : event.content && (
             <View className='event-detail__body'>
               <RichText nodes={parseMarkdown(event.content)} />
             </View>
@@ -3,16 +3,18 @@ import { useState, useCallback } from 'react'
 import Taro, { useLoad, usePullDownRefresh } from '@tarojs/taro'
 import { EventCard } from '../../components'
 import { eventService, bannerService } from '../../services'
-import { IEvent, IBanner } from '../../types'
+import { IEventSummary, IBanner } from '../../types'
 import { getImageUrl } from '../../utils/request'
 import './index.scss'
 
 export default function Index() {
-  const [events, setEvents] = useState<IEvent[]>([])
+  const [events, setEvents] = useState<IEventSummary[]>([])
   const [banners, setBanners] = useState<IBanner[]>([])
   const [loading, setLoading] = useState(false)
   const [isEmpty, setIsEmpty] = useState(false)
   const [error, setError] = useState('')
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   // 加载轮播图
   const loadBanners = useCallback(async () => {
@@ -37,16 +39,39 @@ export default function Index() {
       })
       
       setEvents(result.items)
+      setNextCursor(result.next_cursor || null)
       setIsEmpty(result.items.length === 0)
     } catch (err: any) {
       console.error('加载赛事列表失败:', err)
       setError(err.message || '加载失败')
       setEvents([])
+      setNextCursor(null)
     } finally {
       setLoading(false)
     }
   }, [])
 
+  // 滚动到底部时按游标加载下一页
+  const loadMoreEvents = useCallback(async () => {
+    if (!nextCursor || loadingMore) return
+
+    try {
+      setLoadingMore(true)
+
+      const result = await eventService.getEvents({
+        page_size: 20,
+        cursor: nextCursor
+      })
+
+      setEvents(prev => [...prev, ...result.items])
+      setNextCursor(result.next_cursor || null)
+    } catch (err: any) {
+      console.error('加载更多赛事失败:', err)
+    } finally {
+      setLoadingMore(false)
+    }
+  }, [nextCursor, loadingMore])
+
   // 页面加载时获取数据
   useLoad(() => {
     console.log('首页加载')
@@ -113,6 +138,7 @@ export default function Index() {
                   className='index__banner-image'
                   src={getImageUrl(banner.image_url)}
                   mode='aspectFill'
+                  webp
                 />
               </View>
             </SwiperItem>
@@ -125,6 +151,7 @@ export default function Index() {
         className='index__content'
         scrollY
         enableBackToTop
+        onScrollToLower={loadMoreEvents}
       >
         {loading && events.length === 0 ? (
           renderLoading()
@@ -137,6 +164,7 @@ export default function Index() {
             {events.map(event => (
               <EventCard key={event.id} event={event} />
             ))}
+            {loadingMore && renderLoading()}
           </View>
         )}
       </ScrollView>
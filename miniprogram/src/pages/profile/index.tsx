@@ -117,7 +117,7 @@ export default function Profile() {
     }
 
     try {
-      const updatedUser = await authService.updateNickname(userInfo.open_id, trimmedNickname)
+      const updatedUser = await authService.updateNickname(trimmedNickname)
       setUserInfo(updatedUser)
       setIsEditingNickname(false)
       
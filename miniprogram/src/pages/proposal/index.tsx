@@ -3,11 +3,11 @@ import { useState, useCallback } from 'react'
 import Taro, { useLoad, usePullDownRefresh } from '@tarojs/taro'
 import { EventCard, SearchBar } from '../../components'
 import { eventService } from '../../services'
-import { IEvent } from '../../types'
+import { IEventSummary } from '../../types'
 import './index.scss'
 
 export default function Proposal() {
-  const [events, setEvents] = useState<IEvent[]>([])
+  const [events, setEvents] = useState<IEventSummary[]>([])
   const [loading, setLoading] = useState(false)
   const [isEmpty, setIsEmpty] = useState(false)
   const [error, setError] = useState('')
@@ -1,6 +1,6 @@
 import Taro from '@tarojs/taro'
-import { post, get, put } from '../utils/request'
-import { IUserInfo, IWxLoginRequest } from '../types'
+import { post, get, put, SESSION_TOKEN_KEY } from '../utils/request'
+import { ILoginResult, IUserInfo, IWxLoginRequest } from '../types'
 
 /**
  * 用户认证服务
@@ -31,9 +31,10 @@ class AuthService {
         avatar_url: userProfile?.avatarUrl
       }
 
-      const userInfo = await post<IUserInfo>('/api/auth/login', loginData, true)
+      const { token, token_expires_at, ...userInfo } = await post<ILoginResult>('/api/auth/login', loginData, true)
 
-      // 3. 保存用户信息到本地
+      // 3. 保存会话令牌和用户信息到本地
+      Taro.setStorageSync(SESSION_TOKEN_KEY, token)
       this.saveUserInfo(userInfo)
 
       return userInfo
@@ -44,23 +45,21 @@ class AuthService {
   }
 
   /**
-   * 获取用户信息
-   * @param openId 用户 openId
+   * 获取当前登录用户的信息(通过会话令牌识别用户)
    * @returns 用户信息
    */
-  async getUserInfo(openId: string): Promise<IUserInfo> {
-    return get<IUserInfo>('/api/auth/user', { open_id: openId })
+  async getUserInfo(): Promise<IUserInfo> {
+    return get<IUserInfo>('/api/auth/user')
   }
 
   /**
-   * 修改用户昵称
-   * @param openId 用户 openId
+   * 修改当前登录用户的昵称
    * @param nickName 新昵称
    * @returns 更新后的用户信息
    */
-  async updateNickname(openId: string, nickName: string): Promise<IUserInfo> {
+  async updateNickname(nickName: string): Promise<IUserInfo> {
     const userInfo = await put<IUserInfo>(
-      `/api/auth/user/nickname?open_id=${openId}&nick_name=${encodeURIComponent(nickName)}`,
+      `/api/auth/user/nickname?nick_name=${encodeURIComponent(nickName)}`,
       null,
       true
     )
@@ -137,6 +136,7 @@ class AuthService {
     try {
       Taro.removeStorageSync(this.USER_INFO_KEY)
       Taro.removeStorageSync(this.OPEN_ID_KEY)
+      Taro.removeStorageSync(SESSION_TOKEN_KEY)
     } catch (error) {
       console.error('清除用户信息失败:', error)
     }
@@ -147,7 +147,7 @@ class AuthService {
    * @returns 是否已登录
    */
   isLoggedIn(): boolean {
-    return !!this.getLocalOpenId()
+    return !!this.getLocalOpenId() && !!Taro.getStorageSync(SESSION_TOKEN_KEY)
   }
 }
 
@@ -1,5 +1,6 @@
-import { get, post } from '../utils/request'
-import { IEvent, IPaginatedResponse, IEventListQuery } from '../types'
+import Taro from '@tarojs/taro'
+import { get, post, beacon } from '../utils/request'
+import { IEvent, IEventSummary, IPaginatedResponse, IEventListQuery } from '../types'
 
 /**
  * 赛事服务
@@ -10,13 +11,17 @@ class EventService {
    * @param params 查询参数
    * @returns 赛事列表和分页信息
    */
-  async getEvents(params: IEventListQuery = {}): Promise<IPaginatedResponse<IEvent>> {
-    const { page = 1, page_size = 10, keyword } = params
+  async getEvents(params: IEventListQuery = {}): Promise<IPaginatedResponse<IEventSummary>> {
+    const { page = 1, page_size = 10, keyword, cursor, include_total = false } = params
     
-    return get<IPaginatedResponse<IEvent>>('/api/events', {
-      page,
+    // 传入 cursor 时使用游标分页,深层分页开销与第一页相同
+    // 列表只依赖 has_more,默认不请求总数以省去 COUNT 查询
+    return get<IPaginatedResponse<IEventSummary>>('/api/events', {
+      page: cursor ? undefined : page,
       page_size,
-      keyword
+      keyword,
+      cursor,
+      include_total
     })
   }
 
@@ -26,7 +31,8 @@ class EventService {
    * @returns 赛事详情
    */
   async getEventDetail(id: number): Promise<IEvent> {
-    return get<IEvent>(`/api/events/${id}`, undefined, true)
+    // 优先使用服务端预渲染的 content_html,不再重复下载 Markdown 原文
+    return get<IEvent>(`/api/events/${id}`, { include_content: false }, true)
   }
 
   /**
@@ -37,6 +43,37 @@ class EventService {
   async increaseViewCount(id: number): Promise<IEvent> {
     return post<IEvent>(`/api/events/${id}/view`)
   }
+
+  /**
+   * 上报赛事浏览
+   * 服务端返回 204 无响应体,不会重复传输赛事内容
+   * @param ids 浏览的赛事ID列表
+   */
+  reportViews(ids: number[]): void {
+    if (ids.length === 0) return
+    beacon('/api/events/views', { event_ids: ids, viewer_id: this.getViewerId() })
+  }
+
+  /**
+   * 获取访客标识,用于统计独立访客
+   * 已登录时使用 openId,否则使用本地生成并持久化的客户端ID
+   */
+  private getViewerId(): string {
+    try {
+      const openId = Taro.getStorageSync('openId')
+      if (openId) return openId
+
+      let clientId = Taro.getStorageSync('clientId')
+      if (!clientId) {
+        clientId = `${Date.now().toString(36)}${Math.random().toString(36).slice(2, 10)}`
+        Taro.setStorageSync('clientId', clientId)
+      }
+      return clientId
+    } catch (error) {
+      console.error('获取访客标识失败:', error)
+      return ''
+    }
+  }
 }
 
 export default new EventService()
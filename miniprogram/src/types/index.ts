@@ -11,10 +11,13 @@ export interface IApiResponse<T = any> {
 // 分页响应类型
 export interface IPaginatedResponse<T> {
   items: T[]
-  total: number
+  // 未请求总数时为空;total_source 为 cached 时可能略滞后
+  total?: number | null
+  total_source?: 'exact' | 'cached' | null
   page: number
   page_size: number
   has_more: boolean
+  next_cursor?: string | null
 }
 
 // 赛事类型
@@ -23,12 +26,34 @@ export interface IEvent {
   title: string
   date: string
   content?: string
+  content_html?: string
   cover_image?: string
   view_count: number
+  unique_viewers?: number
   created_at: string
   updated_at: string
 }
 
+// 图片尺寸、主色和占位图
+export interface IImageMeta {
+  width: number
+  height: number
+  dominant_color?: string | null
+  placeholder?: string | null
+}
+
+// 赛事列表项类型(不包含 content)
+export interface IEventSummary {
+  id: number
+  title: string
+  date: string
+  cover_image?: string
+  cover_meta?: IImageMeta | null
+  view_count: number
+  unique_viewers?: number
+  updated_at: string
+}
+
 // 用户信息类型
 export interface IUserInfo {
   id: number
@@ -39,6 +64,12 @@ export interface IUserInfo {
   last_login_at: string
 }
 
+// 登录结果类型(用户信息 + 会话令牌)
+export interface ILoginResult extends IUserInfo {
+  token: string
+  token_expires_at: string
+}
+
 // 客服配置类型
 export interface ICustomerService {
   id: number
@@ -71,4 +102,6 @@ export interface IEventListQuery {
   page?: number
   page_size?: number
   keyword?: string
+  cursor?: string
+  include_total?: boolean
 }
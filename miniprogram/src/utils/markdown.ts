@@ -1,5 +1,5 @@
 import { marked } from 'marked'
-import { getImageUrl } from './request'
+import { getImageUrl, API_BASE_URL } from './request'
 
 /**
  * 将 Markdown 内容转换为 HTML
@@ -32,6 +32,15 @@ export function parseMarkdown(markdown: string): string {
   return html
 }
 
+/**
+ * 处理服务端预渲染的 HTML
+ * 服务端已完成 Markdown 解析和图片样式,这里只需把相对路径的图片补全为完整 URL
+ */
+export function resolveRenderedHtml(html: string): string {
+  if (!html) return ''
+  return html.split('src="/').join(`src="${API_BASE_URL}/`)
+}
+
 /**
  * 从 Markdown 内容中提取第一张图片的 URL
  */
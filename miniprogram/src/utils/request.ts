@@ -36,6 +36,11 @@ export function getImageUrl(path: string): string {
  */
 export { BASE_URL as API_BASE_URL }
 
+/**
+ * 本地存储中会话令牌的 key(登录时由 authService 保存)
+ */
+export const SESSION_TOKEN_KEY = 'sessionToken'
+
 // 请求配置接口
 interface RequestConfig {
   url: string
@@ -68,6 +73,9 @@ export async function request<T = any>(config: RequestConfig): Promise<T> {
   }
 
   try {
+    // 已登录时携带会话令牌
+    const token = Taro.getStorageSync(SESSION_TOKEN_KEY)
+
     // 发起请求
     const response = await Taro.request({
       url: `${BASE_URL}${url}`,
@@ -75,6 +83,7 @@ export async function request<T = any>(config: RequestConfig): Promise<T> {
       data,
       header: {
         'Content-Type': 'application/json',
+        ...(token ? { Authorization: `Bearer ${token}` } : {}),
         ...header
       },
       timeout: 10000
@@ -192,3 +201,21 @@ export function del<T = any>(url: string, showLoading = false): Promise<T> {
     showLoading
   })
 }
+
+/**
+ * 上报请求(不关心响应)
+ * 用于浏览量等统计上报,失败时只记录日志,不弹出错误提示
+ */
+export function beacon(url: string, data?: any): void {
+  Taro.request({
+    url: `${BASE_URL}${url}`,
+    method: 'POST',
+    data,
+    header: {
+      'Content-Type': 'application/json'
+    },
+    timeout: 10000
+  }).catch(error => {
+    console.error('上报失败:', error)
+  })
+}